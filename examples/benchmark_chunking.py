@@ -0,0 +1,87 @@
+"""
+Benchmark the spaCy and regex sentence splitter backends on the sample texts,
+comparing throughput and how often they agree on sentence boundaries and chunks.
+"""
+import logging
+import time
+from pathlib import Path
+from typing import List, Set, Tuple
+
+from musiol_rag.core.chunking import TextChunker
+from musiol_rag.core.segmentation import RegexSentenceSplitter, SpacySentenceSplitter
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("rag_chunking_benchmark")
+
+REPEATS = 20
+
+def boundary_offsets(text: str, sentences: List[str]) -> Set[int]:
+    """Character offsets in text where each sentence ends."""
+    offsets = set()
+    position = 0
+    for sentence in sentences:
+        if not sentence:
+            continue
+        start = text.find(sentence, position)
+        if start < 0:
+            continue
+        position = start + len(sentence)
+        offsets.add(position)
+    return offsets
+
+def time_splitter(name: str, create, texts: List[str]) -> Tuple[List[List[str]], float]:
+    """Measure load time and throughput of a splitter; return its sentences for the texts."""
+    start = time.perf_counter()
+    splitter = create()
+    load_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        sentences = list(splitter.split_many(texts))
+    elapsed = time.perf_counter() - start
+    
+    chars = sum(len(text) for text in texts) * REPEATS
+    logger.info(f"{name}: load {load_time:.3f} s, {len(texts) * REPEATS / elapsed:.1f} docs/s, "
+                f"{chars / elapsed / 1e6:.2f} M chars/s")
+    return sentences, elapsed
+
+def main():
+    texts = [
+        path.read_text(encoding='utf-8')
+        for path in sorted(Path('examples/texts').glob('*.txt'))
+    ]
+    texts = [text for text in texts if text.strip()]
+    
+    spacy_sentences, spacy_time = time_splitter("spacy", SpacySentenceSplitter, texts)
+    regex_sentences, regex_time = time_splitter("regex", RegexSentenceSplitter, texts)
+    logger.info(f"Speedup of regex over spacy: {spacy_time / regex_time:.1f}x")
+    
+    # Boundary agreement, treating spaCy as the reference
+    matched = reference = predicted = 0
+    for text, expected, actual in zip(texts, spacy_sentences, regex_sentences):
+        expected_offsets = boundary_offsets(text, expected)
+        actual_offsets = boundary_offsets(text, actual)
+        matched += len(expected_offsets & actual_offsets)
+        reference += len(expected_offsets)
+        predicted += len(actual_offsets)
+    precision = matched / predicted if predicted else 0.0
+    recall = matched / reference if reference else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    logger.info(f"Boundary agreement: precision {precision:.3f}, recall {recall:.3f}, F1 {f1:.3f}")
+    
+    # Chunk agreement under identical packing
+    spacy_chunker = TextChunker(splitter=SpacySentenceSplitter())
+    regex_chunker = TextChunker(splitter=RegexSentenceSplitter())
+    same = total = 0
+    for spacy_chunks, regex_chunks in zip(spacy_chunker.create_chunks_many(texts),
+                                          regex_chunker.create_chunks_many(texts)):
+        same += len(set(spacy_chunks) & set(regex_chunks))
+        total += max(len(spacy_chunks), len(regex_chunks))
+    logger.info(f"Identical chunks: {same}/{total} ({same / total:.1%})")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,106 @@
+"""
+Benchmark FAISS compression and re-ranking settings on the sample texts,
+reporting index memory, recall@k against an exact flat search and query latency.
+
+The chunks are stored in PostgreSQL and embedded once; every configuration
+is then built from the persisted embeddings.
+"""
+import asyncio
+import getpass
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from musiol_rag.core.chunking import TextChunker
+from musiol_rag.core.embeddings import EmbeddingModel
+from musiol_rag.core.retrieval import FAISSRetriever
+from musiol_rag.database.postgresql import PostgreSQLDatabase
+from musiol_rag.config import settings
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("rag_compression_benchmark")
+
+K = 10
+NUM_QUERIES = 200
+
+# (index_type, compression, pretransform, rerank oversample) combinations to compare
+CONFIGURATIONS = [
+    ("flat", "none", None, 1),
+    ("flat", "fp16", None, 1),
+    ("flat", "int8", None, 1),
+    ("flat", "pq", None, 1),
+    ("flat", "pq", None, 4),
+    ("flat", "fp16", "pca", 1),
+    ("flat", "pq", "opq", 1),
+    ("hnsw", "none", None, 1),
+    ("hnsw", "int8", None, 1),
+    ("ivf_flat", "int8", None, 1),
+    ("ivf_pq", "none", None, 1),
+    ("ivf_pq", "none", None, 4),
+    ("ivf_pq", "none", "opq", 1),
+]
+
+async def main():
+    username = getpass.getuser()
+    connection_string = os.environ.get(
+        "DATABASE_URL",
+        f"postgresql://{username}@localhost/rag_test"  # Use system username
+    )
+    db = await PostgreSQLDatabase.from_connection_string(connection_string)
+    embedding_model = EmbeddingModel()
+    
+    # Store the sample texts once; later runs reuse the chunks and their embeddings
+    metadata = await db.get_metadata()
+    if not metadata["chunk_count"]:
+        texts = [path.read_text(encoding='utf-8') for path in sorted(Path('examples/texts').glob('*.txt'))]
+        chunker = TextChunker(max_chunk_size=settings.chunk_size)
+        await db.add_texts_bulk(list(zip(texts, chunker.create_chunks_many(texts))))
+    
+    # Chunks double as queries, spread evenly over the corpus
+    chunks = await db.get_chunks()
+    queries = chunks[::max(1, len(chunks) // NUM_QUERIES)][:NUM_QUERIES]
+    logger.info(f"{len(chunks)} chunks, {len(queries)} queries, k={K}")
+    
+    with tempfile.TemporaryDirectory() as index_dir:
+        for index_type, compression, pretransform, oversample in CONFIGURATIONS:
+            name = f"{index_type}/{compression}" + (f"+{pretransform}" if pretransform else "")
+            if oversample > 1:
+                name += f" rerank x{oversample}"
+            retriever = FAISSRetriever(
+                embedding_model,
+                os.path.join(index_dir, "".join(c if c.isalnum() else "_" for c in name)),
+                index_type=index_type,
+                compression=compression,
+                pretransform=pretransform,
+                oversample=oversample
+            )
+            try:
+                start = time.perf_counter()
+                await retriever.rebuild_index(db)
+                build_time = time.perf_counter() - start
+                
+                footprint = retriever.memory_footprint()
+                recall = await retriever.measure_recall(db, queries, k=K)
+                
+                start = time.perf_counter()
+                await retriever.get_relevant_texts_batch(queries, db, k=K)
+                query_time = time.perf_counter() - start
+                
+                logger.info(
+                    f"{name:30} {footprint['bytes_per_vector']:8.1f} B/vector "
+                    f"({footprint['compression_ratio']:.1f}x), recall@{K} {recall:.3f}, "
+                    f"{query_time / len(queries) * 1000:.2f} ms/query, build {build_time:.2f} s"
+                )
+            except (RuntimeError, ValueError) as e:
+                logger.warning(f"{name}: {str(e)}")
+            finally:
+                retriever.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,51 @@
+"""
+Benchmark embedding throughput on the chunks of the sample texts for
+different batch sizes and encoder process counts.
+
+Reports texts per second for each configuration, which helps to choose
+embedding_batch_size, embedding_num_workers and the ingestion workers.
+"""
+import logging
+import os
+from pathlib import Path
+
+from musiol_rag.core.chunking import TextChunker
+from musiol_rag.core.embeddings import EmbeddingModel
+from musiol_rag.config import settings
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("rag_embedding_benchmark")
+
+BATCH_SIZES = [16, 64, 256]
+WORKER_COUNTS = [1, 2, os.cpu_count() or 1]
+
+def main():
+    texts = [path.read_text(encoding='utf-8') for path in sorted(Path('examples/texts').glob('*.txt'))]
+    chunker = TextChunker(max_chunk_size=settings.chunk_size)
+    chunks = [chunk for document_chunks in chunker.create_chunks_many(texts) for chunk in document_chunks]
+    logger.info(f"{len(chunks)} chunks")
+    
+    for num_workers in sorted(set(WORKER_COUNTS)):
+        for batch_size in BATCH_SIZES:
+            model = EmbeddingModel(batch_size=batch_size, num_workers=num_workers)
+            try:
+                # Warm-up run starts the worker processes and loads the model
+                model.encode(chunks)
+                model.texts_encoded = model.batches_encoded = 0
+                model.encode_seconds = 0.0
+                
+                model.encode(chunks)
+                stats = model.stats()
+                logger.info(
+                    f"workers {num_workers:2}, batch size {batch_size:4}: "
+                    f"{stats['texts_per_second']:8.1f} texts/s ({stats['batches']} batches)"
+                )
+            finally:
+                model.close()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,78 @@
+"""
+Benchmark ingestion of the sample texts: sequential add_text calls followed
+by an index build, against the concurrent IngestionPipeline.
+
+Both runs start from an empty database and index.
+"""
+import asyncio
+import getpass
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from musiol_rag.core.chunking import TextChunker
+from musiol_rag.core.embeddings import EmbeddingModel
+from musiol_rag.core.pipeline import IngestionPipeline
+from musiol_rag.core.retrieval import FAISSRetriever
+from musiol_rag.database.postgresql import PostgreSQLDatabase
+from musiol_rag.config import settings
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("rag_ingestion_benchmark")
+
+TEXTS_DIR = "examples/texts"
+
+async def main():
+    username = getpass.getuser()
+    connection_string = os.environ.get(
+        "DATABASE_URL",
+        f"postgresql://{username}@localhost/rag_test"  # Use system username
+    )
+    db = await PostgreSQLDatabase.from_connection_string(connection_string)
+    embedding_model = EmbeddingModel()
+    chunker = TextChunker(max_chunk_size=settings.chunk_size)
+    paths = sorted(Path(TEXTS_DIR).glob('*.txt'))
+    
+    with tempfile.TemporaryDirectory() as index_dir:
+        # Sequential: one document at a time, then build the index
+        await db.clear()
+        retriever = FAISSRetriever(embedding_model, os.path.join(index_dir, "sequential"))
+        try:
+            start = time.perf_counter()
+            for path in paths:
+                text = path.read_text(encoding='utf-8')
+                await db.add_text(text, chunker.create_chunks(text), metadata={"source": str(path)})
+            await retriever.rebuild_index(db)
+            sequential_time = time.perf_counter() - start
+        finally:
+            retriever.close()
+        chunk_count = (await db.get_metadata())["chunk_count"]
+        logger.info(f"sequential: {len(paths)} documents, {chunk_count} chunks in {sequential_time:.2f} s")
+        
+        # Pipelined: all stages run concurrently
+        await db.clear()
+        retriever = FAISSRetriever(embedding_model, os.path.join(index_dir, "pipelined"))
+        try:
+            stats = await IngestionPipeline(chunker, db, retriever).run(TEXTS_DIR)
+        finally:
+            retriever.close()
+        logger.info(
+            f"pipelined: {stats['documents']} documents in {stats['elapsed_seconds']:.2f} s "
+            f"({sequential_time / stats['elapsed_seconds']:.2f}x)"
+        )
+        for name, stage in stats["stages"].items():
+            logger.info(
+                f"  {name:6} {stage['workers']} workers, {stage['items']:6} items in {stage['batches']:4} batches, "
+                f"busy {stage['busy_seconds']:.2f} s, {stage['items_per_second']:.1f} items/s, "
+                f"max queue depth {stage['max_queue_depth']}"
+            )
+        logger.info(f"database counters (both runs): {db.ingest_stats()}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""
+Compare the ONNX Runtime embedding backend (fp32 and int8 quantized) with
+the PyTorch SentenceTransformer on the chunks of the sample texts.
+
+Checks that the ONNX embeddings agree with the PyTorch ones (cosine
+similarity of each pair of vectors) and reports single-query latency and
+bulk throughput. Exits with status 1 if the agreement is below threshold.
+"""
+import logging
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from musiol_rag.core.chunking import TextChunker
+from musiol_rag.core.embeddings import EmbeddingModel
+from musiol_rag.config import settings
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("rag_onnx_benchmark")
+
+NUM_QUERIES = 200
+
+# Minimum mean cosine similarity to the PyTorch embeddings
+PARITY_THRESHOLDS = {"onnx": 0.9999, "onnx int8": 0.98}
+
+def cosine_agreement(reference: np.ndarray, embeddings: np.ndarray) -> np.ndarray:
+    """Cosine similarity between corresponding rows of two embedding matrices."""
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return (reference * embeddings).sum(axis=1)
+
+def measure(model: EmbeddingModel, chunks, queries):
+    """Encode all chunks and each query on its own, returning embeddings and timings."""
+    model.encode_single(queries[0])  # Load (and on first use export) the model
+    
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        model.encode_single(query)
+        latencies.append(time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    embeddings = model.encode(chunks)
+    throughput = len(chunks) / (time.perf_counter() - start)
+    return embeddings, np.array(latencies) * 1000, throughput
+
+def format_timings(name: str, latencies: np.ndarray, throughput: float) -> str:
+    return (
+        f"{name:10} query latency p50 {np.percentile(latencies, 50):6.2f} ms, "
+        f"p95 {np.percentile(latencies, 95):6.2f} ms, {throughput:8.1f} texts/s"
+    )
+
+def main():
+    texts = [path.read_text(encoding='utf-8') for path in sorted(Path('examples/texts').glob('*.txt'))]
+    chunker = TextChunker(max_chunk_size=settings.chunk_size)
+    chunks = [chunk for document_chunks in chunker.create_chunks_many(texts) for chunk in document_chunks]
+    queries = chunks[::max(1, len(chunks) // NUM_QUERIES)][:NUM_QUERIES]
+    logger.info(f"{len(chunks)} chunks, {len(queries)} single queries")
+    
+    reference, latencies, throughput = measure(EmbeddingModel(backend="torch"), chunks, queries)
+    logger.info(format_timings("torch", latencies, throughput))
+    
+    passed = True
+    for name, quantize in [("onnx", False), ("onnx int8", True)]:
+        try:
+            embeddings, latencies, throughput = measure(EmbeddingModel(backend="onnx", quantize=quantize), chunks, queries)
+        except RuntimeError as e:
+            logger.warning(f"{name}: {str(e)}")
+            passed = False
+            continue
+        
+        agreement = cosine_agreement(reference, embeddings)
+        ok = agreement.mean() >= PARITY_THRESHOLDS[name]
+        passed = passed and ok
+        logger.info(
+            f"{format_timings(name, latencies, throughput)}, "
+            f"cosine to torch mean {agreement.mean():.5f} min {agreement.min():.5f} "
+            f"({'ok' if ok else 'BELOW ' + str(PARITY_THRESHOLDS[name])})"
+        )
+    
+    sys.exit(0 if passed else 1)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
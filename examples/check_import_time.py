@@ -0,0 +1,78 @@
+"""
+Import-time regression check.
+
+Imports every musiol_rag module in a fresh interpreter, without DATABASE_URL
+set, and fails if a heavy dependency gets imported eagerly or the imports
+exceed the time budget. Run it from the repository root:
+
+    PYTHONPATH=src python examples/check_import_time.py
+"""
+import json
+import os
+import subprocess
+import sys
+
+# Dependencies that must only be imported when first used
+HEAVY_MODULES = ["torch", "sentence_transformers", "transformers", "faiss", "spacy", "onnxruntime"]
+
+MODULES = [
+    "musiol_rag.config",
+    "musiol_rag.core.batching",
+    "musiol_rag.core.cache",
+    "musiol_rag.core.chunking",
+    "musiol_rag.core.embedding_cache",
+    "musiol_rag.core.embeddings",
+    "musiol_rag.core.onnx_backend",
+    "musiol_rag.core.pipeline",
+    "musiol_rag.core.rag",
+    "musiol_rag.core.retrieval",
+    "musiol_rag.core.segmentation",
+    "musiol_rag.core.sharding",
+    "musiol_rag.core.textstore",
+    "musiol_rag.core.vectorstore",
+    "musiol_rag.database.postgresql",
+]
+
+# Wall-clock budget for importing all of the above, in seconds
+BUDGET_SECONDS = float(os.environ.get("IMPORT_TIME_BUDGET", "1.5"))
+
+PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+for name in {MODULES!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": elapsed,
+    "loaded": [name for name in {HEAVY_MODULES!r} if name in sys.modules],
+}}))
+"""
+
+def main() -> int:
+    env = {key: value for key, value in os.environ.items() if key != "DATABASE_URL"}
+    completed = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if completed.returncode != 0:
+        print(f"FAIL: importing musiol_rag failed:\n{completed.stderr}")
+        return 1
+    
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    print(f"Imported {len(MODULES)} modules in {result['seconds']:.3f} s (budget {BUDGET_SECONDS:.1f} s)")
+    
+    failed = False
+    if result["loaded"]:
+        print(f"FAIL: heavy modules imported eagerly: {', '.join(result['loaded'])}")
+        failed = True
+    if result["seconds"] > BUDGET_SECONDS:
+        print("FAIL: import time over budget")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -46,10 +46,10 @@ def create_text_chunks(texts: List[str], chunk_size: int = None, overlap: int =
     # Initialize chunker with specified chunk size
     chunker = TextChunker(max_chunk_size=chunk_size)
     
-    # Process each text and combine chunks
+    # Process all texts in one nlp.pipe stream and combine chunks
     chunks = []
-    for text in texts:
-        chunks.extend(chunker.create_chunks(text))
+    for document_chunks in chunker.create_chunks_many(texts):
+        chunks.extend(document_chunks)
     
     return chunks
 
@@ -81,16 +81,10 @@ def inspect_query_vector(query: str, embedding_model: EmbeddingModel):
     logger.info(query_vector[0][:10])
     return query_vector
 
-async def find_closest_vectors(query: str, embedding_model: EmbeddingModel, db: PostgreSQLDatabase, k: int = 4) -> Tuple[List[str], List[float]]:
+async def find_closest_vectors(query: str, retriever: FAISSRetriever, db: PostgreSQLDatabase, k: int = 4) -> Tuple[List[str], List[float]]:
     """Step 5: Find k closest vectors using FAISS."""
     print_separator("STEP 5: Closest Vectors")
     
-    # Initialize FAISS retriever with mandatory index path
-    retriever = FAISSRetriever(embedding_model, settings.faiss_index_path)
-    
-    # Update the index with our chunks
-    await retriever.update_index(db)
-    
     # Get relevant texts and their distances
     relevant_texts, distances = await retriever.get_relevant_texts(query, db, k=k)
     
@@ -133,10 +127,10 @@ async def main():
             with open(text_file, 'r', encoding='utf-8') as file:
                 sample_texts.append(file.read())
         
-        # Process and store each document with its chunks
-        for text in sample_texts:
-            chunks = create_text_chunks([text])  # Create chunks for this document
-            await db.add_text(text, chunks)  # Store both full text and chunks
+        # Chunk all documents in one pipelined pass and store them with their chunks in bulk
+        chunker = TextChunker(max_chunk_size=settings.chunk_size)
+        documents = list(zip(sample_texts, chunker.create_chunks_many(sample_texts)))
+        await db.add_texts_bulk(documents)  # Store both full texts and chunks
         
         # Step 1: Show original texts
         await inspect_original_texts(db)
@@ -149,6 +143,11 @@ async def main():
         chunk_vectors = embedding_model.encode(chunks)
         inspect_chunk_vectors(chunk_vectors, chunks)
         
+        # Initialize FAISS retriever once; reuse the saved index if it still matches the database
+        retriever = FAISSRetriever(embedding_model, settings.faiss_index_path)
+        status = await retriever.warm_start(db)
+        logger.info(f"FAISS index {status}")
+        
         start_time = time.time()  # Start timing    
 
         # Step 4: Create and show query vector
@@ -171,7 +170,7 @@ async def main():
                 query_vector = inspect_query_vector(query, embedding_model)
                 
                 # Step 5: Find closest vectors using FAISS
-                closest_chunks, distances = await find_closest_vectors(query, embedding_model, db)
+                closest_chunks, distances = await find_closest_vectors(query, retriever, db)
                 
                 # Step 6: Show closest chunks with distances
                 show_closest_chunks(closest_chunks, distances)
@@ -0,0 +1,36 @@
+"""
+Deferred imports for heavy optional dependencies.
+"""
+import importlib
+import sys
+import types
+
+class LazyModule(types.ModuleType):
+    """
+    Module placeholder that imports the real module on first attribute access.
+    
+    Lets modules refer to heavy dependencies such as faiss at module level
+    while only paying their import cost when they are actually used.
+    """
+    
+    def _load(self) -> types.ModuleType:
+        module = importlib.import_module(self.__name__)
+        # Copy the real module's namespace so later lookups bypass __getattr__
+        self.__dict__.update(module.__dict__)
+        return module
+    
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+def lazy_import(name: str) -> types.ModuleType:
+    """
+    Get a module that is imported on first use.
+    
+    Args:
+        name: Fully qualified module name
+        
+    Returns:
+        The already-imported module, or a LazyModule placeholder for it
+    """
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
\ No newline at end of file
@@ -7,20 +7,89 @@ from typing import Optional
 class Settings(BaseSettings):
     # Embedding settings
     embedding_model: str = "all-MiniLM-L6-v2"
+    embedding_batch_size: int = 64  # Texts per encode batch; texts are length-sorted so each batch pads little
+    embedding_num_workers: int = 1  # Encoder processes; above 1, large encodes are sharded over a pool of model replicas
+    embedding_backend: str = "torch"  # torch (SentenceTransformer) or onnx (ONNX Runtime export, CPU)
+    onnx_model_dir: str = "onnx_models"  # Exported ONNX models, one subdirectory per model
+    onnx_quantize: bool = False  # onnx backend: run the int8 dynamically quantized model
+    onnx_num_threads: Optional[int] = None  # onnx backend: intra-op threads per session, None for ONNX Runtime's default
+    embedding_cache_dir: str = "embedding_cache"  # CachedEmbeddingProvider: directory of the on-disk cache, one file per model
+    embedding_cache_max_entries: int = 1000000  # Cached vectors per model before the least recently used are evicted
     
     # Retrieval settings
     top_k: int = 3
     chunk_size: int = 200
     chunk_overlap: int = 50
+    chunking_backend: str = "spacy"  # Sentence splitter: spacy or regex
+    
+    # Query batching settings: concurrent queries are coalesced into one encode+search call
+    retrieval_max_batch_size: int = 32
+    retrieval_max_wait_ms: float = 0.0  # Extra time a batch waits for more queries; 0 dispatches immediately
+    
+    # Query cache settings
+    query_cache_max_entries: int = 1024
+    query_cache_max_bytes: Optional[int] = None  # Approximate cap on cached results, None for no limit
+    query_cache_ttl: Optional[float] = None  # Seconds before an entry expires, None to never expire
+    semantic_cache_enabled: bool = False  # Answer near-duplicate queries from cached results
+    semantic_cache_threshold: float = 0.95  # Minimum cosine similarity of query vectors for a semantic hit
+    semantic_cache_max_entries: int = 1024
+    semantic_cache_verify_rate: float = 0.0  # Fraction of semantic hits searched anyway to count false hits
     
     # Database settings
     database_url: str
     
     # FAISS settings
     faiss_index_path: str = "faiss_index.bin"
+    faiss_index_type: str = "flat"  # flat, hnsw, ivf_flat or ivf_pq
+    faiss_metric: str = "l2"  # l2 or cosine (inner product on normalized vectors)
+    faiss_nlist: int = 100  # IVF: number of inverted lists
+    faiss_nprobe: int = 8  # IVF: lists visited per query
+    faiss_hnsw_m: int = 32  # HNSW: neighbours per node
+    faiss_hnsw_ef_search: int = 64  # HNSW: search beam width
+    faiss_hnsw_compact_ratio: float = 0.2  # HNSW: share of deleted (tombstoned) vectors that triggers a rebuild
+    faiss_pq_m: int = 8  # IVF-PQ: sub-quantizers, must divide the embedding dimension
+    faiss_train_sample_size: int = 50000  # Max vectors used to train IVF indexes
+    faiss_compression: str = "none"  # Vector encoding: none, fp16, int8 (scalar quantization) or pq
+    faiss_pretransform: Optional[str] = None  # Dimensionality reduction trained at build time: pca or opq
+    faiss_pretransform_dim: Optional[int] = None  # Pre-transform output dimension (defaults to half the embedding dimension)
+    faiss_mmap: bool = False  # Memory-map the saved index read-only instead of loading it into RAM
+    rerank_oversample: int = 1  # Re-rank k * oversample index candidates exactly from full-precision vectors (1 disables)
+    faiss_num_shards: int = 4  # ShardedRetriever: number of sub-indexes chunks are partitioned into
+    filter_brute_force_threshold: int = 2000  # Filtered searches matching at most this many chunks are scored exhaustively
+    index_build_batch_size: int = 1000  # Chunks streamed, encoded and added per batch when building the index
 
+    # Ingestion pipeline settings (IngestionPipeline): workers and batch sizes per stage
+    ingest_queue_size: int = 1024  # Items that may wait in front of each stage before upstream stages block
+    ingest_chunk_workers: int = 1  # Above 1, chunking runs in that many processes
+    ingest_chunk_batch_size: int = 8  # Documents
+    ingest_store_workers: int = 2
+    ingest_store_batch_size: int = 64  # Documents
+    ingest_embed_workers: int = 2
+    ingest_embed_batch_size: int = 256  # Chunks
+    
     class Config:
         env_file = ".env"
 
-# Create global settings instance
-settings = Settings() 
\ No newline at end of file
+_settings: Optional[Settings] = None
+
+def get_settings() -> Settings:
+    """
+    Get the global settings, reading the environment on first call.
+    
+    Returns:
+        Settings instance
+    """
+    global _settings
+    if _settings is None:
+        _settings = Settings()
+    return _settings
+
+class _LazySettings:
+    """Proxy for the global settings that defers Settings() until an attribute is read."""
+    
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+# Global settings instance, resolved on first use so importing the package
+# does not require DATABASE_URL
+settings = _LazySettings() 
\ No newline at end of file
@@ -0,0 +1,163 @@
+"""
+Dynamic micro-batching of concurrent requests onto a worker executor.
+"""
+from concurrent.futures import Executor
+from typing import Any, Callable, List, Optional, Tuple
+import asyncio
+from ..config import settings
+
+class MicroBatcher:
+    """
+    Coalesces concurrent requests into batched calls run off the event loop.
+    
+    Requests submitted while a batch is being processed queue up and are
+    dispatched together as the next batch, so a lone request is processed
+    immediately while concurrent requests share one call. An optional wait
+    window lets a batch collect more requests before it is dispatched.
+    """
+    
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], List[Any]],
+        executor: Optional[Executor] = None,
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None
+    ):
+        """
+        Initialize the batcher.
+        
+        Args:
+            process_batch: Blocking function mapping a list of items to a list of
+                results of the same length; runs on the executor
+            executor: Executor to run batches on (defaults to the event loop's default executor)
+            max_batch_size: Maximum items per batch (defaults to settings.retrieval_max_batch_size)
+            max_wait_ms: How long a batch waits for more items before dispatch
+                (defaults to settings.retrieval_max_wait_ms)
+        """
+        self.process_batch = process_batch
+        self.executor = executor
+        self.max_batch_size = max_batch_size or settings.retrieval_max_batch_size
+        self.max_wait_ms = settings.retrieval_max_wait_ms if max_wait_ms is None else max_wait_ms
+        if self.max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional["asyncio.Queue[Tuple[Any, asyncio.Future]]"] = None
+        self._worker: Optional[asyncio.Task] = None
+        # Futures of the batch being processed, failed by close()
+        self._in_flight: List[asyncio.Future] = []
+        
+        self.batches = 0
+        self.items = 0
+    
+    def _ensure_worker(self) -> None:
+        """
+        Start the collector task if it is not running.
+        
+        The collector exits once the queue is drained, so no task lingers
+        between bursts of requests or after the batcher is discarded.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = None
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+    
+    async def submit(self, item: Any) -> Any:
+        """
+        Submit one item and wait for its result.
+        
+        Args:
+            item: Item to process
+        
+        Returns:
+            The result produced for this item
+        
+        Raises:
+            Exception: Whatever process_batch raised for the batch containing the item
+        """
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._queue.put_nowait((item, future))
+        return await future
+    
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future]]:
+        """Take the next queued item, then gather whatever else arrives within the wait window."""
+        batch = [self._queue.get_nowait()]
+        deadline = self._loop.time() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+    
+    async def _run(self) -> None:
+        """Collector loop: dispatch batches one at a time until the queue is empty."""
+        while not self._queue.empty():
+            batch = [(item, future) for item, future in await self._collect() if not future.done()]
+            if not batch:
+                continue
+            
+            self.batches += 1
+            self.items += len(batch)
+            self._in_flight = [future for _, future in batch]
+            try:
+                results = await self._loop.run_in_executor(
+                    self.executor, self.process_batch, [item for item, _ in batch]
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                self._in_flight = []
+            
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+    
+    def close(self) -> None:
+        """
+        Stop the collector task and fail every request that has no result yet.
+        
+        Callers waiting on queued or in-flight requests get a RuntimeError
+        instead of waiting forever. May be called from any thread.
+        """
+        if self._loop is None or self._loop.is_closed():
+            self._worker = None
+            return
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop or not self._loop.is_running():
+            self._shutdown()
+        else:
+            self._loop.call_soon_threadsafe(self._shutdown)
+    
+    def _shutdown(self) -> None:
+        """Cancel the collector and fail pending futures, on the event loop's thread."""
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+        self._worker = None
+        
+        pending = self._in_flight
+        self._in_flight = []
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait()[1])
+        error = RuntimeError("The query batcher was closed")
+        for future in pending:
+            if not future.done():
+                future.set_exception(error)
\ No newline at end of file
@@ -0,0 +1,506 @@
+"""
+Bounded query result cache for retrievers.
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+import random
+import sys
+import threading
+import time
+import unicodedata
+import numpy as np
+from ..config import settings
+
+class _CacheEntry:
+    """A cached search result for one query, valid for any k up to ``k``."""
+    __slots__ = ("k", "chunks", "distances", "size", "expires_at")
+    
+    def __init__(self, k: int, chunks: List[str], distances: List[float], size: int, expires_at: Optional[float]):
+        self.k = k
+        self.chunks = chunks
+        self.distances = distances
+        self.size = size
+        self.expires_at = expires_at
+
+class QueryCache:
+    """
+    LRU cache of (chunks, distances) search results with optional size and age limits.
+    
+    Results are stored per query together with the k they were searched with,
+    so a cached larger-k result also answers any smaller-k request for the
+    same query by slicing, without another search.
+    """
+    
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize the cache.
+        
+        Args:
+            max_entries: Maximum number of cached queries (defaults to settings.query_cache_max_entries)
+            max_bytes: Approximate upper bound on cached result size in bytes
+                (defaults to settings.query_cache_max_bytes; None means unbounded)
+            ttl: Seconds after which an entry expires (defaults to settings.query_cache_ttl;
+                None means entries never expire)
+            clock: Time source, monotonic by default
+        """
+        self.max_entries = settings.query_cache_max_entries if max_entries is None else max_entries
+        self.max_bytes = settings.query_cache_max_bytes if max_bytes is None else max_bytes
+        self.ttl = settings.query_cache_ttl if ttl is None else ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, _CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._generation = 0
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    @property
+    def generation(self) -> int:
+        """
+        Counter bumped by every clear() and invalidation.
+        
+        Callers read it before searching and pass it to put(), so a result
+        searched before the indexed chunks changed is not stored afterwards.
+        """
+        return self._generation
+    
+    @staticmethod
+    def _estimate_size(key: Hashable, chunks: List[str], distances: List[float]) -> int:
+        """Approximate memory held by an entry."""
+        return (
+            sys.getsizeof(key)
+            + sum(sys.getsizeof(chunk) for chunk in chunks)
+            + 32 * len(distances)
+        )
+    
+    def get(self, key: Hashable, k: int) -> Optional[Tuple[List[str], List[float]]]:
+        """
+        Look up a cached result.
+        
+        Args:
+            key: Query cache key
+            k: Number of results requested
+        
+        Returns:
+            Tuple of (chunks, distances) truncated to k, or None on a miss
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at is not None and entry.expires_at <= self._clock():
+            self._remove(key)
+            self.expirations += 1
+            entry = None
+        
+        if entry is None or entry.k < k:
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.chunks[:k], entry.distances[:k]
+    
+    def put(
+        self,
+        key: Hashable,
+        k: int,
+        result: Tuple[List[str], List[float]],
+        generation: Optional[int] = None
+    ) -> None:
+        """
+        Store a search result.
+        
+        Args:
+            key: Query cache key
+            k: Number of results the search was run with
+            result: Tuple of (chunks, distances)
+            generation: Value of generation when the search started; the result
+                is dropped if the cache was cleared or invalidated since
+        """
+        if self.max_entries <= 0:
+            return
+        if generation is not None and generation != self._generation:
+            return
+        
+        existing = self._entries.get(key)
+        if existing is not None and existing.k >= k:
+            self._entries.move_to_end(key)
+            return
+        
+        chunks, distances = list(result[0]), list(result[1])
+        size = self._estimate_size(key, chunks, distances)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        
+        if existing is not None:
+            self._remove(key)
+        expires_at = self._clock() + self.ttl if self.ttl is not None else None
+        self._entries[key] = _CacheEntry(k, chunks, distances, size, expires_at)
+        self._bytes += size
+        
+        # Evict least recently used entries until both limits hold
+        while len(self._entries) > self.max_entries or (
+            self.max_bytes is not None and self._bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+    
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+    
+    def invalidate_texts(self, texts: Iterable[str]) -> int:
+        """
+        Drop cached results that contain any of the given chunk texts.
+        
+        Used when chunks are removed from the index, so only the results that
+        could return them are discarded.
+        
+        Args:
+            texts: Texts of the removed chunks
+        
+        Returns:
+            Number of entries dropped
+        """
+        texts = set(texts)
+        if not texts:
+            return 0
+        # Searches still in flight may have seen the removed chunks
+        self._generation += 1
+        stale = [key for key, entry in self._entries.items() if not texts.isdisjoint(entry.chunks)]
+        for key in stale:
+            self._remove(key)
+        self.invalidations += len(stale)
+        return len(stale)
+    
+    def clear(self) -> None:
+        """Drop all cached results. Counters are kept."""
+        self._generation += 1
+        self._entries.clear()
+        self._bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+        
+        Returns:
+            Dictionary with entry count, approximate bytes and hit/miss/eviction counters
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+class SemanticQueryCache:
+    """
+    Second-level cache that answers near-duplicate queries by embedding similarity.
+    
+    Query texts are normalized (Unicode NFKC, case-folded, whitespace
+    collapsed, trailing punctuation dropped) and their vectors cached, so
+    spelling variants of a query are encoded once. Every searched query's
+    vector is kept with its result in a small in-memory matrix; a new query
+    whose vector has a cosine similarity of at least the threshold with a
+    cached one, for the same filter scope and at least the same k, gets that
+    cached result without a search.
+    
+    A similar query is not always an equivalent one. A fraction of hits
+    (verify_rate) is therefore searched anyway and compared with the cached
+    result; hits whose chunks differ are counted as false hits, which shows
+    whether the threshold is too loose.
+    """
+    
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        verify_rate: Optional[float] = None,
+        sample: Callable[[], float] = random.random
+    ):
+        """
+        Initialize the cache.
+        
+        Args:
+            threshold: Minimum cosine similarity between query vectors for a hit
+                (defaults to settings.semantic_cache_threshold)
+            max_entries: Maximum number of cached results, and of cached query
+                vectors (defaults to settings.semantic_cache_max_entries)
+            verify_rate: Fraction of hits that are searched anyway to detect false
+                hits (defaults to settings.semantic_cache_verify_rate)
+            sample: Source of uniform random numbers in [0, 1) for verification
+        """
+        self.threshold = settings.semantic_cache_threshold if threshold is None else threshold
+        self.max_entries = settings.semantic_cache_max_entries if max_entries is None else max_entries
+        self.verify_rate = settings.semantic_cache_verify_rate if verify_rate is None else verify_rate
+        self._sample = sample
+        self._lock = threading.Lock()
+        
+        # Query vectors by normalized text
+        self._vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        
+        # Answered queries: unit vectors in a preallocated matrix, one result per row
+        self._matrix: Optional[np.ndarray] = None
+        self._entries: List[Optional[_CacheEntry]] = []
+        self._scopes: List[Hashable] = []
+        self._last_used = np.zeros(0, dtype=np.int64)
+        self._tick = 0
+        self._generation = 0
+        
+        self.hits = 0
+        self.misses = 0
+        self.vector_hits = 0
+        self.vector_misses = 0
+        self.verified = 0
+        self.false_hits = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Normalize a query text for the query vector cache."""
+        text = " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+        return text.rstrip("?!.").rstrip() or text
+    
+    @property
+    def generation(self) -> int:
+        """Counter bumped by every clear() and invalidation; results searched before either are not stored."""
+        return self._generation
+    
+    def encode(self, queries: List[str], encode: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Get query vectors, encoding only normalized texts without a cached vector.
+        
+        Args:
+            queries: Query texts
+            encode: Function encoding a list of texts, e.g. EmbeddingModel.encode
+        
+        Returns:
+            Array of query vectors, one row per query
+        """
+        keys = [self.normalize(query) for query in queries]
+        with self._lock:
+            cached = [self._vectors.get(key) for key in keys]
+        
+        # Encode each missing normalized text once, from its first spelling
+        missing: Dict[str, int] = {}
+        for row, (key, vector) in enumerate(zip(keys, cached)):
+            if vector is None and key not in missing:
+                missing[key] = row
+        encoded = encode([queries[row] for row in missing.values()]) if missing else None
+        
+        with self._lock:
+            self.vector_hits += len(keys) - sum(vector is None for vector in cached)
+            self.vector_misses += sum(vector is None for vector in cached)
+            for key, vector in zip(keys, cached):
+                if vector is not None and key in self._vectors:
+                    self._vectors.move_to_end(key)
+            for position, key in enumerate(missing):
+                self._vectors[key] = encoded[position]
+            while len(self._vectors) > self.max_entries:
+                self._vectors.popitem(last=False)
+        
+        positions = {key: position for position, key in enumerate(missing)}
+        return np.stack([
+            vector if vector is not None else encoded[positions[key]]
+            for key, vector in zip(keys, cached)
+        ])
+    
+    @staticmethod
+    def _unit(vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+    
+    def lookup(
+        self,
+        vector: np.ndarray,
+        k: int,
+        scope: Hashable = None
+    ) -> Tuple[Optional[Tuple[List[str], List[float]]], bool]:
+        """
+        Find the cached result of the most similar earlier query.
+        
+        Args:
+            vector: Query vector
+            k: Number of results requested
+            scope: Cache scope of the query, e.g. its filter; only entries of the
+                same scope match
+        
+        Returns:
+            Tuple of (result, verify): the cached (chunks, distances) truncated
+            to k, or None on a miss, and whether the caller should search anyway
+            and report the outcome with verify()
+        """
+        with self._lock:
+            if self._matrix is None or self.max_entries <= 0:
+                self.misses += 1
+                return None, False
+            
+            similarities = self._matrix @ self._unit(vector)
+            for row in np.argsort(-similarities).tolist():
+                if similarities[row] < self.threshold:
+                    break
+                entry = self._entries[row]
+                if entry is None or entry.k < k or self._scopes[row] != scope:
+                    continue
+                self.hits += 1
+                self._tick += 1
+                self._last_used[row] = self._tick
+                return (entry.chunks[:k], entry.distances[:k]), self._sample() < self.verify_rate
+            
+            self.misses += 1
+            return None, False
+    
+    def verify(self, cached: Tuple[List[str], List[float]], searched: Tuple[List[str], List[float]]) -> bool:
+        """
+        Compare a cached hit with the result of actually searching the query.
+        
+        Args:
+            cached: Result returned by lookup()
+            searched: Result of the search
+        
+        Returns:
+            True if the cached result returned the same chunks
+        """
+        agrees = set(cached[0]) == set(searched[0][:len(cached[0])])
+        with self._lock:
+            self.verified += 1
+            if not agrees:
+                self.false_hits += 1
+        return agrees
+    
+    def put(
+        self,
+        vector: np.ndarray,
+        k: int,
+        result: Tuple[List[str], List[float]],
+        scope: Hashable = None,
+        generation: Optional[int] = None
+    ) -> None:
+        """
+        Store the result of a searched query.
+        
+        Args:
+            vector: Query vector
+            k: Number of results the search was run with
+            result: Tuple of (chunks, distances)
+            scope: Cache scope of the query
+            generation: Value of generation when the search started; the result
+                is dropped if the cache was cleared since
+        """
+        if self.max_entries <= 0:
+            return
+        vector = self._unit(vector)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+                self._entries = [None] * self.max_entries
+                self._scopes = [None] * self.max_entries
+                self._last_used = np.zeros(self.max_entries, dtype=np.int64)
+            
+            # Replace the entry of the same query, else take a free slot or evict the least recently used
+            similarities = self._matrix @ vector
+            same = [
+                row for row in np.nonzero(similarities >= 1.0 - 1e-6)[0].tolist()
+                if self._entries[row] is not None and self._scopes[row] == scope
+            ]
+            self._tick += 1
+            if same:
+                row = same[0]
+                if self._entries[row].k > k:
+                    self._last_used[row] = self._tick
+                    return
+            else:
+                row = int(np.argmin(self._last_used))
+                if self._entries[row] is not None:
+                    self.evictions += 1
+            self._matrix[row] = vector
+            self._entries[row] = _CacheEntry(k, list(result[0]), list(result[1]), 0, None)
+            self._scopes[row] = scope
+            self._last_used[row] = self._tick
+    
+    def _drop(self, row: int) -> None:
+        self._matrix[row] = 0.0
+        self._entries[row] = None
+        self._scopes[row] = None
+        self._last_used[row] = 0
+    
+    def invalidate_texts(self, texts: Iterable[str]) -> int:
+        """
+        Drop cached results that contain any of the given chunk texts.
+        
+        Args:
+            texts: Texts of the removed chunks
+        
+        Returns:
+            Number of entries dropped
+        """
+        texts = set(texts)
+        if not texts:
+            return 0
+        with self._lock:
+            # Searches still in flight may have seen the removed chunks
+            self._generation += 1
+            stale = [
+                row for row, entry in enumerate(self._entries)
+                if entry is not None and not texts.isdisjoint(entry.chunks)
+            ]
+            for row in stale:
+                self._drop(row)
+            self.invalidations += len(stale)
+        return len(stale)
+    
+    def clear(self) -> None:
+        """Drop all cached results, keeping the query vectors. Counters are kept."""
+        with self._lock:
+            self._generation += 1
+            for row, entry in enumerate(self._entries):
+                if entry is not None:
+                    self._drop(row)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+        
+        Returns:
+            Dictionary with entry and query vector counts, hit/miss counters and
+            hit rate of results and of query vectors, evictions, invalidations,
+            and the verified hits, false hits and false hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            vector_lookups = self.vector_hits + self.vector_misses
+            return {
+                "entries": sum(entry is not None for entry in self._entries),
+                "query_vectors": len(self._vectors),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "vector_hits": self.vector_hits,
+                "vector_misses": self.vector_misses,
+                "vector_hit_rate": self.vector_hits / vector_lookups if vector_lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "verified": self.verified,
+                "false_hits": self.false_hits,
+                "false_hit_rate": self.false_hits / self.verified if self.verified else 0.0,
+            }
\ No newline at end of file
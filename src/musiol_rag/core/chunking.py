@@ -1,27 +1,63 @@
 """
 Text chunking module with intelligent sentence boundary detection.
 """
-from typing import List, Optional
-import spacy
+from collections import deque
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
 from ..config import settings
+from .segmentation import SentenceSplitter, create_splitter
+
+class ChunkDiff:
+    """
+    Result of TextChunker.rechunk: the new chunks of a document and how they
+    relate to its previous chunks, by position in each list.
+    """
+    
+    def __init__(
+        self,
+        chunks: List[str],
+        kept: List[Tuple[int, int]],
+        added: List[int],
+        removed: List[int]
+    ):
+        """
+        Args:
+            chunks: The new chunks, in document order
+            kept: (previous_index, new_index) pairs of unchanged chunks
+            added: Indexes into chunks of chunks that need embedding
+            removed: Indexes into the previous chunks of chunks that are gone
+        """
+        self.chunks = chunks
+        self.kept = kept
+        self.added = added
+        self.removed = removed
+    
+    def __repr__(self) -> str:
+        return f"ChunkDiff(kept={len(self.kept)}, added={self.added}, removed={self.removed})"
 
 class TextChunker:
     """
-    Intelligent text chunker that uses spaCy for sentence boundary detection.
-    This ensures that chunks preserve semantic context by respecting sentence boundaries.
+    Intelligent text chunker that uses sentence boundary detection (spaCy or a
+    fast rule-based splitter). This ensures that chunks preserve semantic
+    context by respecting sentence boundaries.
     """
     
-    def __init__(self, model: str = "en_core_web_sm", max_chunk_size: Optional[int] = None):
+    def __init__(
+        self,
+        model: str = "en_core_web_sm",
+        max_chunk_size: Optional[int] = None,
+        backend: Optional[str] = None,
+        splitter: Optional[SentenceSplitter] = None
+    ):
         """
         Initialize the text chunker.
         
         Args:
             model: spaCy model to use for sentence detection
             max_chunk_size: Maximum size of a chunk in characters (defaults to settings.chunk_size)
+            backend: Sentence splitter backend, "spacy" or "regex" (defaults to settings.chunking_backend)
+            splitter: Custom sentence splitter; overrides backend and model
         """
-        self.nlp = spacy.load(model, disable=["ner", "tagger", "parser", "attribute_ruler", "lemmatizer"])
-        # Only enable sentence segmentation for better performance
-        self.nlp.enable_pipe("senter")
+        self.splitter = splitter or create_splitter(backend or settings.chunking_backend, model)
         self.max_chunk_size = max_chunk_size or settings.chunk_size
         
     def create_chunks(self, text: str) -> List[str]:
@@ -34,15 +70,115 @@ class TextChunker:
         Returns:
             List of text chunks that respect sentence boundaries
         """
-        # Process the text with spaCy
-        doc = self.nlp(text)
+        return self._pack_sentences(self.splitter.split(text))
+        
+    def create_chunks_many(
+        self,
+        texts: Iterable[str],
+        n_process: int = 1,
+        batch_size: int = 64
+    ) -> Iterator[List[str]]:
+        """
+        Create chunks for many texts in one stream (spaCy's nlp.pipe for the spaCy backend).
+        
+        Texts are consumed lazily and chunks are yielded one document at a
+        time, so large corpora never have to be held in memory at once.
+        
+        Args:
+            texts: Iterable of input texts
+            n_process: Number of worker processes (-1 uses all CPU cores)
+            batch_size: Number of texts sent to a worker at a time
+        
+        Yields:
+            List of text chunks for each input text, in input order
+        """
+        for sentences in self.splitter.split_many(texts, n_process=n_process, batch_size=batch_size):
+            yield self._pack_sentences(sentences)
+    
+    def rechunk(self, text: str, previous_chunks: List[str]) -> ChunkDiff:
+        """
+        Re-chunk an edited text, keeping the chunks of unchanged regions.
+        
+        The new sentence stream is aligned with the previous chunks: wherever
+        consecutive sentences reproduce a previous chunk exactly, that chunk
+        is kept with its boundaries, so an edit does not shift the chunks
+        after it. Only the sentences between kept chunks are packed into new
+        chunks, and only those need to be embedded and indexed.
+        
+        Args:
+            text: The edited document text
+            previous_chunks: The document's current chunks, in order
+        
+        Returns:
+            ChunkDiff with the new chunks and the kept, added and removed indexes
+        """
+        sentences = list(self.splitter.split(text))
+        available: Dict[str, Deque[int]] = {}
+        for index, chunk in enumerate(previous_chunks):
+            available.setdefault(chunk, deque()).append(index)
+        
+        chunks: List[str] = []
+        pending: List[str] = []
+        position = 0
+        while position < len(sentences):
+            end = self._match_previous_chunk(sentences, position, available)
+            if end is None:
+                pending.append(sentences[position])
+                position += 1
+                continue
+            chunks.extend(self._pack_sentences(pending))
+            pending = []
+            chunks.append(" ".join(sentences[position:end]))
+            position = end
+        chunks.extend(self._pack_sentences(pending))
+        
+        # Claim previous chunks in order; packed text identical to a previous chunk is kept too
+        kept = []
+        added = []
+        for new_index, chunk in enumerate(chunks):
+            if available.get(chunk):
+                kept.append((available[chunk].popleft(), new_index))
+            else:
+                added.append(new_index)
+        removed = sorted(index for indexes in available.values() for index in indexes)
+        return ChunkDiff(chunks, kept, added, removed)
+    
+    def _match_previous_chunk(
+        self, sentences: List[str], start: int, available: Dict[str, Deque[int]]
+    ) -> Optional[int]:
+        """
+        Find the longest run of sentences from start that reproduces an available previous chunk.
         
+        Returns:
+            End position of the run (exclusive), or None if no run matches
+        """
+        best = None
+        run = []
+        length = -1
+        for end in range(start, len(sentences)):
+            length += len(sentences[end]) + 1
+            if length > self.max_chunk_size:
+                break
+            run.append(sentences[end])
+            if available.get(" ".join(run)):
+                best = end + 1
+        return best
+    
+    def _pack_sentences(self, sentences: Iterable[str]) -> List[str]:
+        """
+        Pack sentences into chunks of at most max_chunk_size characters.
+        
+        Args:
+            sentences: Stripped sentence texts in document order
+        
+        Returns:
+            List of text chunks that respect sentence boundaries
+        """
         chunks = []
         current_chunk = []
         current_length = 0
         
-        for sent in doc.sents:
-            sent_text = sent.text.strip()
+        for sent_text in sentences:
             sent_length = len(sent_text)
             
             # If a single sentence is longer than max_chunk_size,
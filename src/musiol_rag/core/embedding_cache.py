@@ -0,0 +1,391 @@
+"""
+Persistent on-disk embedding cache shared by the processes of one host.
+"""
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import numpy as np
+from ..config import settings
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: appends are only serialized between the threads of one process
+    fcntl = None
+
+_MAGIC = b"MRECH001"
+_HEADER = struct.Struct("<8sQ")
+_KEY_BYTES = 16
+
+# Share of max_entries kept when the cache is compacted
+_KEEP_FRACTION = 0.75
+
+def text_key(name: str, text: str) -> bytes:
+    """Cache key of a text embedded by the named model: a truncated SHA-256 digest."""
+    return hashlib.sha256(f"{name}\0{text}".encode("utf-8")).digest()[:_KEY_BYTES]
+
+class EmbeddingCache:
+    """
+    Append-only store of float32 vectors keyed by text hash, in one memory-mapped file.
+    
+    File layout: an 8-byte magic and the dimension ``d``, then fixed-size
+    records of a 16-byte key followed by ``d`` float32 values. New vectors
+    are appended under an exclusive lock on ``<path>.lock``, so several
+    processes can share the file; each keeps a key -> row index that it
+    extends with the records others appended. A torn record left by a crash
+    is ignored and overwritten by the next append. File locking needs
+    fcntl; without it (on Windows) appends are serialized only within the
+    process, and the file must not be shared by several processes.
+    
+    When an append would exceed max_entries, the cache is compacted: the
+    entries this process used most recently and then the newest remaining
+    ones are rewritten to a temporary file that atomically replaces the old
+    one, and other processes reload it on their next access.
+    """
+    
+    def __init__(self, path: str, max_entries: Optional[int] = None):
+        """
+        Initialize the cache, mapping the file at path if it exists.
+        
+        Args:
+            path: Path of the cache file
+            max_entries: Maximum number of cached vectors (defaults to settings.embedding_cache_max_entries)
+        """
+        self.path = path
+        self.max_entries = max_entries or settings.embedding_cache_max_entries
+        self.dimension: Optional[int] = None
+        self._lock = threading.RLock()
+        self._file = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._records: Optional[np.ndarray] = None
+        self._rows: Dict[bytes, int] = {}
+        self._indexed = 0
+        self._recent: "OrderedDict[bytes, None]" = OrderedDict()
+        self._inode = None
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.refresh()
+    
+    def _record_dtype(self) -> np.dtype:
+        return np.dtype([("key", f"V{_KEY_BYTES}"), ("vector", "<f4", (self.dimension,))])
+    
+    def refresh(self) -> None:
+        """Index records appended by other processes, or reload the file if it was replaced."""
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return
+            if stat.st_size < _HEADER.size:
+                return
+            
+            if stat.st_ino != self._inode:
+                self._close_mapping()
+                self._rows = {}
+                self._indexed = 0
+                self._inode = stat.st_ino
+            record_size = self._record_dtype().itemsize if self.dimension is not None else None
+            if record_size is not None and self._records is not None:
+                if (stat.st_size - _HEADER.size) // record_size == len(self._records):
+                    return
+            
+            self._close_mapping()
+            self._file = open(self.path, "rb")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, dimension = _HEADER.unpack_from(self._mmap, 0)
+            if magic != _MAGIC:
+                raise RuntimeError(f"{self.path} is not an embedding cache file")
+            self.dimension = dimension
+            
+            dtype = self._record_dtype()
+            count = (len(self._mmap) - _HEADER.size) // dtype.itemsize
+            self._records = np.frombuffer(self._mmap, dtype=dtype, count=count, offset=_HEADER.size)
+            
+            # Index only the rows not seen before
+            keys = self._records["key"][self._indexed:].tobytes()
+            self._rows.update(
+                (keys[offset:offset + _KEY_BYTES], row)
+                for row, offset in enumerate(range(0, len(keys), _KEY_BYTES), self._indexed)
+            )
+            self._indexed = count
+    
+    def _close_mapping(self) -> None:
+        # numpy views must be dropped before the mmap can be closed
+        self._records = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Still referenced elsewhere; it is released with the last view
+                pass
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def close(self) -> None:
+        """Release the file mapping."""
+        with self._lock:
+            self._close_mapping()
+            self._inode = None
+            self._rows = {}
+            self._indexed = 0
+    
+    def __len__(self) -> int:
+        return len(self._rows)
+    
+    def get_many(self, keys: List[bytes]) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """
+        Look up the vectors of several keys.
+        
+        Args:
+            keys: Keys from text_key()
+        
+        Returns:
+            Tuple of (vectors, found): a float32 array with one row per key
+            (zeros for misses), or None while the cache is empty and its
+            dimension unknown, and a boolean array marking the hits
+        """
+        with self._lock:
+            self.refresh()
+            rows = np.array([self._rows.get(key, -1) for key in keys], dtype=np.int64)
+            found = rows >= 0
+            hits = int(found.sum())
+            self.hits += hits
+            self.misses += len(keys) - hits
+            if self.dimension is None:
+                return None, found
+            
+            vectors = np.zeros((len(keys), self.dimension), dtype=np.float32)
+            if hits:
+                vectors[found] = self._records["vector"][rows[found]]
+                for key, hit in zip(keys, found.tolist()):
+                    if hit:
+                        self._touch(key)
+            return vectors, found
+    
+    def _touch(self, key: bytes) -> None:
+        self._recent[key] = None
+        self._recent.move_to_end(key)
+        if len(self._recent) > self.max_entries:
+            self._recent.popitem(last=False)
+    
+    def add(self, keys: Iterable[bytes], vectors: np.ndarray) -> None:
+        """
+        Append vectors for keys that are not cached yet.
+        
+        Args:
+            keys: Keys from text_key()
+            vectors: Array of shape (len(keys), dimension)
+        
+        Raises:
+            ValueError: If the vectors do not match the cache's dimension
+        """
+        keys = list(keys)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock, self._file_lock():
+            self.refresh()
+            if self.dimension is None:
+                self.dimension = vectors.shape[1]
+                self._replace([], np.empty((0, self.dimension), dtype=np.float32))
+            elif vectors.shape[1] != self.dimension:
+                raise ValueError(
+                    f"Cannot cache {vectors.shape[1]}-dimensional vectors in {self.path}, "
+                    f"which holds {self.dimension}-dimensional ones"
+                )
+            
+            new_rows = {}
+            for row, key in enumerate(keys):
+                if key not in self._rows and key not in new_rows:
+                    new_rows[key] = row
+            if not new_rows:
+                return
+            if len(self._rows) + len(new_rows) > self.max_entries:
+                self._compact(max(0, int(self.max_entries * _KEEP_FRACTION) - len(new_rows)))
+            
+            dtype = self._record_dtype()
+            records = np.empty(len(new_rows), dtype=dtype)
+            records["key"] = np.frombuffer(b"".join(new_rows), dtype=f"V{_KEY_BYTES}")
+            records["vector"] = vectors[list(new_rows.values())]
+            with open(self.path, "r+b") as f:
+                # Drop a torn record a crashed writer may have left behind
+                size = _HEADER.size + len(self._records) * dtype.itemsize
+                f.truncate(size)
+                f.seek(size)
+                f.write(records.tobytes())
+            for key in new_rows:
+                self._touch(key)
+            self.refresh()
+    
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Hold the exclusive lock on <path>.lock that serializes appends across processes."""
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _compact(self, keep: int) -> None:
+        """Rewrite the file with at most keep entries, preferring recently used, then newer ones."""
+        kept_keys = [key for key in reversed(self._recent) if key in self._rows][:keep]
+        kept = set(kept_keys)
+        for key in sorted(self._rows, key=self._rows.get, reverse=True):
+            if len(kept_keys) >= keep:
+                break
+            if key not in kept:
+                kept_keys.append(key)
+        
+        # Oldest first, so append order keeps reflecting recency
+        kept_keys.reverse()
+        rows = np.array([self._rows[key] for key in kept_keys], dtype=np.int64)
+        vectors = self._records["vector"][rows] if len(rows) else np.empty((0, self.dimension), dtype=np.float32)
+        self.evictions += len(self._rows) - len(kept_keys)
+        
+        self._replace(kept_keys, vectors)
+        self._recent = OrderedDict((key, None) for key in self._recent if key in self._rows)
+    
+    def _replace(self, keys: List[bytes], vectors: np.ndarray) -> None:
+        """Atomically replace the file with the given entries and reload it."""
+        records = np.empty(len(keys), dtype=self._record_dtype())
+        if keys:
+            records["key"] = np.frombuffer(b"".join(keys), dtype=f"V{_KEY_BYTES}")
+            records["vector"] = vectors
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, self.dimension))
+            f.write(records.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.refresh()
+    
+    def stats(self) -> Dict[str, object]:
+        """
+        Get cache statistics.
+        
+        Returns:
+            Dictionary with entries, bytes on disk, hits, misses, hit rate and evictions
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            record_size = self._record_dtype().itemsize if self.dimension is not None else 0
+            return {
+                "entries": len(self._rows),
+                "bytes": _HEADER.size + len(self._rows) * record_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+class CachedEmbeddingProvider:
+    """
+    Embedding provider that serves repeated texts from a persistent EmbeddingCache.
+    
+    Wraps any provider with encode()/encode_single(). A batch is looked up in
+    the cache at once and only its distinct misses are passed to the wrapped
+    provider, whose results are appended to the cache. Other attributes
+    (model_name, dimension, stats(), ...) are forwarded to the provider, so
+    the wrapper can be used wherever the provider is.
+    """
+    
+    def __init__(self, provider, cache_dir: Optional[str] = None, max_entries: Optional[int] = None):
+        """
+        Initialize the cached provider.
+        
+        Args:
+            provider: The embedding provider to wrap
+            cache_dir: Directory of the cache files, one per model
+                (defaults to settings.embedding_cache_dir)
+            max_entries: Maximum number of cached vectors per model
+                (defaults to settings.embedding_cache_max_entries)
+        """
+        self.provider = provider
+        self.name = getattr(provider, "embedding_name", None) or getattr(provider, "model_name", type(provider).__name__)
+        file_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in self.name)
+        self.cache = EmbeddingCache(
+            os.path.join(cache_dir or settings.embedding_cache_dir, f"{file_name}.emb"),
+            max_entries=max_entries
+        )
+    
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode texts, taking cached embeddings where available.
+        
+        Args:
+            texts: List of texts to encode
+        
+        Returns:
+            numpy array of embeddings
+        
+        Raises:
+            ValueError: If texts is empty or a text to encode is invalid
+            RuntimeError: If encoding fails
+        """
+        if not texts:
+            raise ValueError("Cannot encode empty text list")
+        
+        keys = [text_key(self.name, text) for text in texts]
+        vectors, found = self.cache.get_many(keys)
+        if found.all():
+            return vectors
+        
+        # Encode each missing text once, however often it occurs in the batch
+        missing: Dict[bytes, int] = {}
+        for row, (key, hit) in enumerate(zip(keys, found.tolist())):
+            if not hit and key not in missing:
+                missing[key] = row
+        encoded = np.asarray(self.provider.encode([texts[row] for row in missing.values()]), dtype=np.float32)
+        self.cache.add(missing, encoded)
+        
+        if vectors is None:
+            vectors = np.zeros((len(texts), encoded.shape[1]), dtype=np.float32)
+        positions = {key: position for position, key in enumerate(missing)}
+        for row, (key, hit) in enumerate(zip(keys, found.tolist())):
+            if not hit:
+                vectors[row] = encoded[positions[key]]
+        return vectors
+    
+    def encode_single(self, text: str) -> np.ndarray:
+        """
+        Encode a single text, taking the cached embedding if available.
+        
+        Args:
+            text: Text to encode
+        
+        Returns:
+            numpy array of shape (1, dimension)
+        """
+        if not isinstance(text, str) or not text.strip():
+            raise ValueError("Text must be a non-empty string")
+        return self.encode([text])
+    
+    def cache_stats(self) -> Dict[str, object]:
+        """Get hit/miss/eviction statistics of the embedding cache."""
+        return self.cache.stats()
+    
+    def close(self) -> None:
+        """Release the cache file and close the wrapped provider if it can be closed."""
+        self.cache.close()
+        close = getattr(self.provider, "close", None)
+        if close is not None:
+            close()
+    
+    def __getattr__(self, name: str):
+        return getattr(self.provider, name)
\ No newline at end of file
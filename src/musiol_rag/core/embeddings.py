@@ -1,25 +1,112 @@
 """
 Embeddings handler for text encoding.
 """
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+import multiprocessing
+import threading
+import time
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from ..config import settings
 
+BACKENDS = ("torch", "onnx")
+
+# Model replica of an encode pool worker process, loaded by _init_worker
+_worker_model = None
+
+def _load_model(model_name: str, backend: str, quantize: bool):
+    if backend == "onnx":
+        from .onnx_backend import load_onnx_encoder
+        return load_onnx_encoder(model_name, quantize=quantize)
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+def _init_worker(model_name: str, backend: str, quantize: bool) -> None:
+    global _worker_model
+    _worker_model = _load_model(model_name, backend, quantize)
+
+def _encode_in_worker(texts: List[str]) -> np.ndarray:
+    return _worker_model.encode(texts, batch_size=len(texts), convert_to_numpy=True)
+
 class EmbeddingModel:
-    def __init__(self, model_name: str = None):
+    def __init__(
+        self,
+        model_name: str = None,
+        batch_size: Optional[int] = None,
+        num_workers: Optional[int] = None,
+        backend: Optional[str] = None,
+        quantize: Optional[bool] = None
+    ):
         """
         Initialize the embedding model.
         
+        The SentenceTransformer (and with it torch) is only imported and loaded
+        on first use, so constructing the model is cheap.
+        
+        Args:
+            model_name: SentenceTransformer model (defaults to settings.embedding_model)
+            batch_size: Texts encoded per batch (defaults to settings.embedding_batch_size)
+            num_workers: Encoder processes (defaults to settings.embedding_num_workers);
+                above 1, encodes spanning several batches are sharded over a
+                pool of model replicas in separate processes
+            backend: "torch" runs the SentenceTransformer, "onnx" an ONNX export of
+                it with ONNX Runtime on CPU (defaults to settings.embedding_backend)
+            quantize: With the onnx backend, run the int8 dynamically quantized
+                model (defaults to settings.onnx_quantize)
+        """
+        self.model_name = model_name or settings.embedding_model
+        self.batch_size = batch_size or settings.embedding_batch_size
+        self.num_workers = num_workers or settings.embedding_num_workers
+        self.backend = backend or settings.embedding_backend
+        self.quantize = settings.onnx_quantize if quantize is None else quantize
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown embedding backend {self.backend!r}, expected one of {BACKENDS}")
+        if self.quantize and self.backend != "onnx":
+            raise ValueError("Quantization requires the onnx embedding backend")
+        if self.batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if self.num_workers < 1:
+            raise ValueError("num_workers must be at least 1")
+        self._model = None
+        self._dimension = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # Separate from _lock so stats are not blocked while the model loads
+        self._model_lock = threading.Lock()
+        
+        self.texts_encoded = 0
+        self.batches_encoded = 0
+        self.encode_seconds = 0.0
+    
+    @property
+    def embedding_name(self) -> str:
+        """
+        Name the embeddings are stored and indexed under.
+        
+        The model name, marked for the quantized backend, whose vectors differ
+        slightly from the original model's; the unquantized ONNX export
+        reproduces the original vectors and shares its name.
+        """
+        return f"{self.model_name}:int8" if self.quantize else self.model_name
+    
+    @property
+    def model(self):
+        """
+        Get the underlying SentenceTransformer (or ONNX encoder), loading it on first access.
+        
+        Threads using the model concurrently for the first time load it once.
+        
         Raises:
             RuntimeError: If model initialization fails
         """
-        try:
-            self.model_name = model_name or settings.embedding_model
-            self.model = SentenceTransformer(self.model_name)
-            self._dimension = None
-        except Exception as e:
-            raise RuntimeError(f"Failed to initialize embedding model {self.model_name}: {str(e)}")
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    try:
+                        self._model = _load_model(self.model_name, self.backend, self.quantize)
+                    except Exception as e:
+                        raise RuntimeError(f"Failed to initialize embedding model {self.model_name}: {str(e)}")
+        return self._model
 
     @property
     def dimension(self) -> int:
@@ -36,10 +123,40 @@ class EmbeddingModel:
                 raise RuntimeError(f"Failed to get embedding dimension: {str(e)}")
         return self._dimension
 
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Start the pool of encoder processes on first use, each loading its own model replica."""
+        with self._lock:
+            if self._pool is None:
+                if self.backend == "onnx":
+                    # Export once here rather than in every worker at the same time
+                    from .onnx_backend import prepare_onnx_model
+                    prepare_onnx_model(self.model_name, quantize=self.quantize)
+                
+                # Forking a process that has loaded torch can deadlock; start clean interpreters
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.num_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.model_name, self.backend, self.quantize)
+                )
+            return self._pool
+    
+    def close(self) -> None:
+        """Shut down the encoder process pool, if one was started."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+    
     def encode(self, texts: List[str]) -> np.ndarray:
         """
         Encode a list of texts into embeddings.
         
+        Texts are sorted by length and encoded in batches of batch_size, so
+        each batch pads its texts to a similar length; the embeddings are
+        returned in input order. With several workers, the batches are
+        distributed over the process pool, longest first.
+        
         Args:
             texts: List of texts to encode
             
@@ -53,13 +170,33 @@ class EmbeddingModel:
         if not texts:
             raise ValueError("Cannot encode empty text list")
             
-        if any(not isinstance(t, str) or not t.strip() for t in texts):
+        if not all(isinstance(t, str) and t and not t.isspace() for t in texts):
             raise ValueError("All texts must be non-empty strings")
             
+        started = time.perf_counter()
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        batches = [order[start:start + self.batch_size] for start in range(0, len(texts), self.batch_size)]
+        batch_texts = [[texts[i] for i in batch] for batch in batches]
+        
         try:
-            return self.model.encode(texts, convert_to_numpy=True)
+            if self.num_workers > 1 and len(batches) > 1:
+                results = self._get_pool().map(_encode_in_worker, batch_texts)
+            else:
+                results = (
+                    self.model.encode(batch, batch_size=len(batch), convert_to_numpy=True)
+                    for batch in batch_texts
+                )
+            
+            embeddings = None
+            for batch, vectors in zip(batches, results):
+                if embeddings is None:
+                    embeddings = np.empty((len(texts), vectors.shape[1]), dtype=vectors.dtype)
+                embeddings[batch] = vectors
         except Exception as e:
             raise RuntimeError(f"Failed to encode texts: {str(e)}")
+        
+        self._record(len(texts), len(batches), time.perf_counter() - started)
+        return embeddings
 
     def encode_single(self, text: str) -> np.ndarray:
         """
@@ -78,7 +215,37 @@ class EmbeddingModel:
         if not isinstance(text, str) or not text.strip():
             raise ValueError("Text must be a non-empty string")
             
+        started = time.perf_counter()
         try:
-            return self.model.encode(text, convert_to_numpy=True).reshape(1, -1)
+            embedding = self.model.encode(text, convert_to_numpy=True).reshape(1, -1)
         except Exception as e:
-            raise RuntimeError(f"Failed to encode text: {str(e)}") 
\ No newline at end of file
+            raise RuntimeError(f"Failed to encode text: {str(e)}")
+        self._record(1, 1, time.perf_counter() - started)
+        return embedding
+    
+    def _record(self, texts: int, batches: int, seconds: float) -> None:
+        with self._lock:
+            self.texts_encoded += texts
+            self.batches_encoded += batches
+            self.encode_seconds += seconds
+    
+    def stats(self) -> Dict[str, object]:
+        """
+        Get encoding throughput statistics.
+        
+        Returns:
+            Dictionary with the texts and batches encoded, the seconds spent
+            encoding, the resulting texts per second, and the batch size,
+            worker count and backend in use
+        """
+        with self._lock:
+            return {
+                "texts": self.texts_encoded,
+                "batches": self.batches_encoded,
+                "seconds": self.encode_seconds,
+                "texts_per_second": self.texts_encoded / self.encode_seconds if self.encode_seconds > 0 else 0.0,
+                "batch_size": self.batch_size,
+                "workers": self.num_workers,
+                "backend": self.backend,
+                "quantized": self.quantize,
+            }
\ No newline at end of file
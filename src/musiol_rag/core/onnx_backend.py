@@ -0,0 +1,268 @@
+"""
+ONNX Runtime backend for sentence embedding models on CPU.
+"""
+from typing import List, Optional, Union
+import json
+import os
+import numpy as np
+from ..config import settings
+
+_CONFIG_FILE = "musiol_onnx.json"
+_MODEL_FILE = "model.onnx"
+_QUANTIZED_MODEL_FILE = "model.int8.onnx"
+
+def model_directory(model_name: str, onnx_dir: Optional[str] = None) -> str:
+    """
+    Get the directory an exported model is stored in.
+    
+    Args:
+        model_name: SentenceTransformer model name
+        onnx_dir: Base directory for exported models (defaults to settings.onnx_model_dir)
+    
+    Returns:
+        Path of the model's export directory
+    """
+    return os.path.join(onnx_dir or settings.onnx_model_dir, model_name.replace("/", "__"))
+
+def export_onnx(model_name: str, output_dir: str, quantize: bool = False) -> str:
+    """
+    Export a SentenceTransformer model to ONNX.
+    
+    The transformer is exported with dynamic batch and sequence axes and
+    returns its token embeddings; pooling and normalization are applied by
+    ONNXEncoder. The tokenizer and a small config file are saved next to it,
+    so serving only needs onnxruntime and the tokenizer, not torch. With
+    quantize, an int8 copy with dynamically quantized weights is written too.
+    
+    Args:
+        model_name: SentenceTransformer model name
+        output_dir: Directory to write the export to
+        quantize: Also write the int8 quantized model
+    
+    Returns:
+        The output directory
+    
+    Raises:
+        ValueError: If the model uses modules other than mean pooling and normalization
+        RuntimeError: If the export fails
+    """
+    try:
+        import torch
+        from sentence_transformers import SentenceTransformer
+        from sentence_transformers.models import Normalize, Pooling, Transformer
+    except ImportError as e:
+        raise RuntimeError(f"Exporting to ONNX requires sentence-transformers and torch: {str(e)}")
+    
+    model = SentenceTransformer(model_name, device="cpu")
+    modules = list(model)
+    if not modules or not isinstance(modules[0], Transformer):
+        raise ValueError(f"Model {model_name} does not start with a transformer module")
+    for module in modules[1:]:
+        if isinstance(module, Pooling):
+            if module.get_pooling_mode_str() != "mean":
+                raise ValueError(f"Model {model_name} uses {module.get_pooling_mode_str()} pooling; only mean pooling is supported")
+        elif not isinstance(module, Normalize):
+            raise ValueError(f"Model {model_name} has an unsupported {type(module).__name__} module")
+    
+    transformer = modules[0]
+    tokenizer = transformer.tokenizer
+    auto_model = transformer.auto_model.eval()
+    
+    sample = tokenizer(["ONNX export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["token_embeddings"]}
+    
+    class _TokenEmbeddings(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = auto_model
+        
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs)))[0]
+    
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        model_path = os.path.join(output_dir, _MODEL_FILE)
+        with torch.no_grad():
+            torch.onnx.export(
+                _TokenEmbeddings(),
+                tuple(sample[name] for name in input_names),
+                model_path,
+                input_names=input_names,
+                output_names=["token_embeddings"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+                do_constant_folding=True
+            )
+        tokenizer.save_pretrained(output_dir)
+        
+        config = {
+            "model_name": model_name,
+            "dimension": model.get_sentence_embedding_dimension(),
+            "max_seq_length": model.max_seq_length,
+            "normalize": any(isinstance(module, Normalize) for module in modules),
+            "input_names": input_names,
+        }
+        with open(os.path.join(output_dir, _CONFIG_FILE), "w") as f:
+            json.dump(config, f, indent=2)
+    except Exception as e:
+        raise RuntimeError(f"Failed to export {model_name} to ONNX: {str(e)}")
+    
+    if quantize:
+        quantize_onnx(output_dir)
+    return output_dir
+
+def quantize_onnx(model_dir: str) -> str:
+    """
+    Write an int8 copy of an exported model with dynamically quantized weights.
+    
+    Weights of the linear layers are stored as int8 and activations are
+    quantized on the fly, which needs no calibration data.
+    
+    Args:
+        model_dir: Directory written by export_onnx
+    
+    Returns:
+        Path of the quantized model
+    
+    Raises:
+        RuntimeError: If quantization fails
+    """
+    quantized_path = os.path.join(model_dir, _QUANTIZED_MODEL_FILE)
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(os.path.join(model_dir, _MODEL_FILE), quantized_path, weight_type=QuantType.QInt8)
+    except Exception as e:
+        raise RuntimeError(f"Failed to quantize ONNX model in {model_dir}: {str(e)}")
+    return quantized_path
+
+class ONNXEncoder:
+    """
+    Sentence encoder running an exported model with ONNX Runtime on CPU.
+    
+    Mirrors the parts of the SentenceTransformer interface EmbeddingModel
+    uses: tokenization with the original tokenizer and sequence length, mean
+    pooling over the attention mask and, if the original model normalizes,
+    L2 normalization.
+    """
+    
+    def __init__(self, model_dir: str, quantized: bool = False, num_threads: Optional[int] = None):
+        """
+        Load an exported model.
+        
+        Args:
+            model_dir: Directory written by export_onnx
+            quantized: Run the int8 quantized model
+            num_threads: ONNX Runtime intra-op threads (defaults to settings.onnx_num_threads;
+                None lets ONNX Runtime decide)
+        
+        Raises:
+            RuntimeError: If onnxruntime or transformers is missing or the model cannot be loaded
+        """
+        try:
+            import onnxruntime
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise RuntimeError(f"The onnx embedding backend requires onnxruntime and transformers: {str(e)}")
+        
+        try:
+            with open(os.path.join(model_dir, _CONFIG_FILE)) as f:
+                config = json.load(f)
+            self.dimension = config["dimension"]
+            self.max_seq_length = config["max_seq_length"]
+            self.normalize = config["normalize"]
+            self.input_names = config["input_names"]
+            
+            options = onnxruntime.SessionOptions()
+            options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+            num_threads = num_threads or settings.onnx_num_threads
+            if num_threads:
+                options.intra_op_num_threads = num_threads
+            model_path = os.path.join(model_dir, _QUANTIZED_MODEL_FILE if quantized else _MODEL_FILE)
+            self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+            self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        except Exception as e:
+            raise RuntimeError(f"Failed to load ONNX model from {model_dir}: {str(e)}")
+    
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+    
+    def encode(self, texts: Union[str, List[str]], batch_size: int = 32, convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        """
+        Encode texts like SentenceTransformer.encode.
+        
+        Args:
+            texts: A text or list of texts
+            batch_size: Texts per inference call
+        
+        Returns:
+            float32 array of shape (len(texts), dimension), or (dimension,) for a single text
+        """
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+        
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            token_embeddings = self.session.run(
+                None, {name: encoded[name].astype(np.int64) for name in self.input_names}
+            )[0]
+            
+            # Mean over the real tokens, as the SentenceTransformer pooling layer does
+            mask = encoded["attention_mask"][:, :, None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            if self.normalize:
+                pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+            embeddings[start:start + len(pooled)] = pooled
+        
+        return embeddings[0] if single else embeddings
+
+def prepare_onnx_model(model_name: str, quantize: bool = False, onnx_dir: Optional[str] = None) -> str:
+    """
+    Export (and quantize) a model unless its export already exists.
+    
+    Args:
+        model_name: SentenceTransformer model name
+        quantize: Make sure the int8 quantized model exists too
+        onnx_dir: Base directory for exported models (defaults to settings.onnx_model_dir)
+    
+    Returns:
+        The model's export directory
+    """
+    model_dir = model_directory(model_name, onnx_dir)
+    if not (
+        os.path.exists(os.path.join(model_dir, _CONFIG_FILE))
+        and os.path.exists(os.path.join(model_dir, _MODEL_FILE))
+    ):
+        export_onnx(model_name, model_dir, quantize=quantize)
+    elif quantize and not os.path.exists(os.path.join(model_dir, _QUANTIZED_MODEL_FILE)):
+        quantize_onnx(model_dir)
+    return model_dir
+
+def load_onnx_encoder(
+    model_name: str,
+    quantize: bool = False,
+    onnx_dir: Optional[str] = None,
+    num_threads: Optional[int] = None
+) -> ONNXEncoder:
+    """
+    Load a model's ONNX export, exporting it first if it does not exist yet.
+    
+    Args:
+        model_name: SentenceTransformer model name
+        quantize: Run the int8 quantized model
+        onnx_dir: Base directory for exported models (defaults to settings.onnx_model_dir)
+        num_threads: ONNX Runtime intra-op threads (defaults to settings.onnx_num_threads)
+    
+    Returns:
+        The encoder
+    """
+    model_dir = prepare_onnx_model(model_name, quantize=quantize, onnx_dir=onnx_dir)
+    return ONNXEncoder(model_dir, quantized=quantize, num_threads=num_threads)
\ No newline at end of file
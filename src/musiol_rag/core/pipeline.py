@@ -0,0 +1,349 @@
+"""
+Pipelined concurrent ingestion: chunk -> store -> embed -> index.
+"""
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+import asyncio
+import functools
+import multiprocessing
+import os
+import time
+import numpy as np
+from ..database.postgresql import PostgreSQLDatabase
+from .chunking import TextChunker
+from .retrieval import FAISSRetriever
+from ..config import settings
+
+STAGES = ("chunk", "store", "embed", "index")
+
+# End-of-stream marker; each worker of a stage consumes exactly one
+_DONE = object()
+
+Source = Union[str, os.PathLike, Iterable[Any], AsyncIterable[Any]]
+
+# Chunker of a chunk stage worker process, set by _init_chunk_worker
+_worker_chunker: Optional[TextChunker] = None
+
+def _init_chunk_worker(chunker: TextChunker) -> None:
+    global _worker_chunker
+    _worker_chunker = chunker
+
+def _load_and_chunk_in_worker(items: List[Any]) -> List[Tuple[str, List[str], Dict[str, Any]]]:
+    return _load_and_chunk(_worker_chunker, items)
+
+def _load_and_chunk(chunker: TextChunker, items: List[Any]) -> List[Tuple[str, List[str], Dict[str, Any]]]:
+    """Read file items and chunk all documents of a batch in one stream."""
+    documents = []
+    for item in items:
+        if isinstance(item, tuple):
+            text, metadata = item
+        else:
+            path = Path(item)
+            text = path.read_text(encoding="utf-8")
+            metadata = {"source": str(path)}
+        documents.append((text, metadata or {}))
+    
+    chunks = chunker.create_chunks_many([text for text, _ in documents])
+    return [
+        (text, document_chunks, metadata)
+        for (text, metadata), document_chunks in zip(documents, chunks)
+    ]
+
+class _Stage:
+    """Workers that take batches from a bounded input queue and feed the next stage."""
+    
+    def __init__(self, name: str, workers: int, batch_size: int, queue_size: int):
+        if workers < 1:
+            raise ValueError(f"{name} stage needs at least one worker")
+        if batch_size < 1:
+            raise ValueError(f"{name} stage batch size must be at least 1")
+        self.name = name
+        self.workers = workers
+        self.batch_size = batch_size
+        self.queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=queue_size)
+        self.running = workers
+        
+        self.items = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+        self.max_queue_depth = 0
+    
+    async def put(self, item: Any) -> None:
+        """Queue an item, waiting while the queue is full (backpressure)."""
+        await self.queue.put(item)
+        self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+    
+    async def finish(self) -> None:
+        """Signal end of input to every worker."""
+        for _ in range(self.workers):
+            await self.queue.put(_DONE)
+    
+    async def next_batch(self) -> Tuple[List[Any], bool]:
+        """
+        Wait for an item, then take whatever else is queued up to batch_size.
+        
+        Returns:
+            Tuple of (batch, done); done is set once this worker's end marker was taken
+        """
+        batch = []
+        item = await self.queue.get()
+        while item is not _DONE:
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                return batch, False
+            try:
+                item = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return batch, False
+        return batch, True
+    
+    def stats(self, elapsed: float) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "batch_size": self.batch_size,
+            "items": self.items,
+            "batches": self.batches,
+            "busy_seconds": self.busy_seconds,
+            "items_per_second": self.items / elapsed if elapsed > 0 else 0.0,
+            "queue_depth": self.queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+class IngestionPipeline:
+    """
+    Streams documents through chunking, storage, embedding and indexing concurrently.
+    
+    The stages are connected by bounded asyncio queues, so a slow stage
+    applies backpressure instead of letting work pile up in memory, and each
+    stage runs several workers that take items in batches. While one batch
+    is being encoded, the next is being written to PostgreSQL and the one
+    after that chunked, keeping the CPU, the model and the database busy at
+    the same time:
+    
+    - chunk: read files and split documents into chunks (a worker thread, or
+      one process per worker, each with its own copy of the chunker)
+    - store: insert documents and chunks with COPY, returning the new chunk IDs
+    - embed: look up or encode embeddings and persist new ones (one thread
+      per worker, so batches are encoded concurrently; the model releases
+      the GIL during inference, and with embedding_num_workers above 1 the
+      concurrent batches keep its process pool busy)
+    - index: add the vectors to the FAISS index
+    """
+    
+    def __init__(
+        self,
+        chunker: TextChunker,
+        database: PostgreSQLDatabase,
+        retriever: FAISSRetriever,
+        workers: Optional[Dict[str, int]] = None,
+        batch_sizes: Optional[Dict[str, int]] = None,
+        queue_size: Optional[int] = None
+    ):
+        """
+        Initialize the pipeline.
+        
+        Args:
+            chunker: Chunker for document texts
+            database: Database to store documents, chunks and embeddings in
+            retriever: Retriever whose index receives the chunks
+            workers: Worker count per stage name ("chunk", "store", "embed");
+                missing stages use settings.ingest_<stage>_workers. The index
+                stage always has one worker. Chunking is CPU-bound, so more than
+                one chunk worker runs in a process pool (started with spawn; call
+                run() under an ``if __name__ == "__main__":`` guard).
+            batch_sizes: Batch size per stage name; missing stages use
+                settings.ingest_<stage>_batch_size (the index stage uses the
+                embed batch size)
+            queue_size: Capacity of the queue in front of each stage, in items
+                (defaults to settings.ingest_queue_size)
+        """
+        workers = workers or {}
+        batch_sizes = batch_sizes or {}
+        unknown = (set(workers) | set(batch_sizes)) - set(STAGES)
+        if unknown:
+            raise ValueError(f"Unknown pipeline stages {sorted(unknown)}, expected some of {STAGES}")
+        
+        self.chunker = chunker
+        self.database = database
+        self.retriever = retriever
+        self.queue_size = queue_size or settings.ingest_queue_size
+        self.workers = {
+            "chunk": workers.get("chunk", settings.ingest_chunk_workers),
+            "store": workers.get("store", settings.ingest_store_workers),
+            "embed": workers.get("embed", settings.ingest_embed_workers),
+            "index": 1,
+        }
+        self.batch_sizes = {
+            "chunk": batch_sizes.get("chunk", settings.ingest_chunk_batch_size),
+            "store": batch_sizes.get("store", settings.ingest_store_batch_size),
+            "embed": batch_sizes.get("embed", settings.ingest_embed_batch_size),
+        }
+        self.batch_sizes["index"] = batch_sizes.get("index", self.batch_sizes["embed"])
+        
+        self._stages: Dict[str, _Stage] = {}
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self.documents = 0
+    
+    async def run(self, source: Source, pattern: str = "*.txt") -> Dict[str, Any]:
+        """
+        Ingest all documents from a source and save the index.
+        
+        Args:
+            source: A directory (files matching pattern are ingested in name
+                order), or an iterable / async iterable of items that are
+                either file paths or (text, metadata) tuples. Files are stored
+                with metadata {"source": "<path>"}.
+            pattern: Glob pattern for files when source is a directory
+        
+        Returns:
+            Pipeline statistics, see stats()
+        
+        Raises:
+            RuntimeError: If a stage fails; the other stages are cancelled
+        """
+        self._stages = {
+            name: _Stage(name, self.workers[name], self.batch_sizes[name], self.queue_size)
+            for name in STAGES
+        }
+        self.documents = 0
+        self._started = time.perf_counter()
+        self._finished = None
+        
+        executor = self._chunk_executor()
+        # Encoding on the retriever's single worker thread would serialize the embed workers
+        embed_executor = ThreadPoolExecutor(max_workers=self.workers["embed"], thread_name_prefix="ingest-embed")
+        processors: Dict[str, Callable[[List[Any]], Awaitable[List[Any]]]] = {
+            "chunk": functools.partial(self._chunk, executor),
+            "store": self._store,
+            "embed": functools.partial(self._embed, embed_executor),
+            "index": self._index,
+        }
+        tasks = [asyncio.ensure_future(self._feed(source, pattern))]
+        for position, name in enumerate(STAGES):
+            next_stage = self._stages[STAGES[position + 1]] if position + 1 < len(STAGES) else None
+            tasks.extend(
+                asyncio.ensure_future(self._work(self._stages[name], processors[name], next_stage))
+                for _ in range(self.workers[name])
+            )
+        
+        try:
+            await asyncio.gather(*tasks)
+            await self.retriever.save()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            executor.shutdown(wait=False)
+            embed_executor.shutdown(wait=False)
+            self._finished = time.perf_counter()
+        return self.stats()
+    
+    def _chunk_executor(self) -> Executor:
+        """
+        Create the executor that chunking runs on, off the event loop.
+        
+        Chunking holds the GIL, and spaCy pipelines are not safe to share
+        between threads, so a single worker uses one thread and several
+        workers use processes that each load their own sentence splitter.
+        """
+        if self.workers["chunk"] == 1:
+            return ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-chunk")
+        # Forking a process that has loaded torch can deadlock; start clean interpreters
+        return ProcessPoolExecutor(
+            max_workers=self.workers["chunk"],
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_chunk_worker,
+            initargs=(self.chunker,)
+        )
+    
+    async def _feed(self, source: Source, pattern: str) -> None:
+        """Put the source's items into the chunk stage's queue."""
+        stage = self._stages["chunk"]
+        if isinstance(source, (str, os.PathLike)):
+            directory = Path(source)
+            if not directory.is_dir():
+                raise RuntimeError(f"Ingestion source {directory} is not a directory")
+            source = sorted(directory.glob(pattern))
+        
+        if hasattr(source, "__aiter__"):
+            async for item in source:
+                await stage.put(item)
+        else:
+            for item in source:
+                await stage.put(item)
+        await stage.finish()
+    
+    async def _work(
+        self,
+        stage: _Stage,
+        process: Callable[[List[Any]], Awaitable[List[Any]]],
+        next_stage: Optional[_Stage]
+    ) -> None:
+        """Worker loop: process batches until the end marker, then hand over downstream."""
+        done = False
+        while not done:
+            batch, done = await stage.next_batch()
+            if not batch:
+                continue
+            
+            started = time.perf_counter()
+            try:
+                results = await process(batch)
+            except Exception as e:
+                raise RuntimeError(f"Ingestion failed in {stage.name} stage: {str(e)}")
+            stage.busy_seconds += time.perf_counter() - started
+            stage.items += len(batch)
+            stage.batches += 1
+            
+            if next_stage is not None:
+                for result in results:
+                    await next_stage.put(result)
+        
+        # The last worker of a stage to finish ends the next stage's input
+        stage.running -= 1
+        if stage.running == 0 and next_stage is not None:
+            await next_stage.finish()
+    
+    async def _chunk(self, executor: Executor, items: List[Any]) -> List[Tuple[str, List[str], Dict[str, Any]]]:
+        loop = asyncio.get_running_loop()
+        if isinstance(executor, ProcessPoolExecutor):
+            return await loop.run_in_executor(executor, _load_and_chunk_in_worker, items)
+        return await loop.run_in_executor(executor, _load_and_chunk, self.chunker, items)
+    
+    async def _store(self, documents: List[Tuple[str, List[str], Dict[str, Any]]]) -> List[Tuple[int, str]]:
+        _, chunks = await self.database.add_texts_bulk_with_chunks(documents)
+        self.documents += len(documents)
+        return chunks
+    
+    async def _embed(
+        self, executor: Executor, chunks: List[Tuple[int, str]]
+    ) -> List[Tuple[Tuple[int, str], np.ndarray]]:
+        embeddings = await self.retriever.embed_chunks(self.database, chunks, executor)
+        return list(zip(chunks, embeddings))
+    
+    async def _index(self, items: List[Tuple[Tuple[int, str], np.ndarray]]) -> List[Any]:
+        await self.retriever.add_chunks([chunk for chunk, _ in items], np.stack([vector for _, vector in items]))
+        return []
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get throughput statistics of the current or last run.
+        
+        Returns:
+            Dictionary with the documents read, elapsed seconds, and per stage
+            its workers, batch size, items and batches processed, busy seconds,
+            items per second over the run, and current and maximum queue depth,
+            plus the embedding model's encoding statistics
+        """
+        if self._started is None:
+            elapsed = 0.0
+        else:
+            elapsed = (self._finished or time.perf_counter()) - self._started
+        return {
+            "documents": self.documents,
+            "elapsed_seconds": elapsed,
+            "stages": {name: stage.stats(elapsed) for name, stage in self._stages.items()},
+            "embedding": self.retriever.embedding_model.stats(),
+        }
\ No newline at end of file
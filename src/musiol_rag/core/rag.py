@@ -2,8 +2,9 @@
 RAG (Retrieval-Augmented Generation) wrapper class.
 Provides a clean interface for integrating RAG functionality into larger projects.
 """
-from typing import List, Optional, Protocol
+from typing import Any, Dict, Iterable, List, Optional, Protocol, Tuple
 import numpy as np
+from ..database.base import ChunkFilter
 
 class EmbeddingProvider(Protocol):
     """Protocol for embedding providers."""
@@ -17,8 +18,26 @@ class EmbeddingProvider(Protocol):
 
 class DatabaseProvider(Protocol):
     """Protocol for database providers."""
-    async def add_text(self, text: str) -> None:
-        """Add a text to the database."""
+    async def add_text(self, text: str, metadata: Optional[dict] = None) -> None:
+        """Add a text with optional metadata to the database."""
+        ...
+    
+    async def add_texts_bulk(self, documents: List[Tuple[str, Optional[List[str]]]]) -> List[int]:
+        """Add many (text, chunks) documents to the database in bulk."""
+        ...
+    
+    async def delete_document(self, document_id: int) -> List[int]:
+        """Delete a document and return the IDs of its deleted chunks."""
+        ...
+    
+    async def upsert_document(
+        self,
+        document_id: int,
+        text: str,
+        chunks: Optional[List[str]] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Tuple[List[int], List[int]]:
+        """Insert or replace a document and return its (removed, added) chunk IDs."""
         ...
     
     async def get_texts(self) -> List[str]:
@@ -31,18 +50,33 @@ class DatabaseProvider(Protocol):
 
 class RetrieverProvider(Protocol):
     """Protocol for retriever providers."""
-    async def update_index(self, database: DatabaseProvider) -> None:
+    async def update_index(self, database: DatabaseProvider, after_id: Optional[int] = None) -> None:
         """Update the retrieval index."""
         ...
     
+    async def remove_chunks(self, database: DatabaseProvider, chunk_ids: Iterable[int]) -> int:
+        """Remove chunks from the retrieval index by ID."""
+        ...
+    
     async def get_relevant_texts(
         self, 
         query: str, 
         database: DatabaseProvider,
-        k: Optional[int] = None
+        k: Optional[int] = None,
+        chunk_filter: Optional[ChunkFilter] = None
     ) -> List[str]:
         """Get relevant texts for a query."""
         ...
+    
+    async def get_relevant_texts_batch(
+        self,
+        queries: List[str],
+        database: DatabaseProvider,
+        k: Optional[int] = None,
+        chunk_filter: Optional[ChunkFilter] = None
+    ) -> List[List[str]]:
+        """Get relevant texts for several queries in one batch."""
+        ...
 
 class RAGWrapper:
     """
@@ -68,14 +102,15 @@ class RAGWrapper:
         self.database_provider = database_provider
         self.retriever_provider = retriever_provider
     
-    async def add_document(self, text: str) -> None:
+    async def add_document(self, text: str, metadata: Optional[dict] = None) -> None:
         """
         Add a document to the RAG system.
         
         Args:
             text: The text to add
+            metadata: JSON-serializable metadata to filter queries by (optional)
         """
-        await self.database_provider.add_text(text)
+        await self.database_provider.add_text(text, metadata=metadata)
         await self.retriever_provider.update_index(self.database_provider)
     
     async def add_documents(self, texts: List[str]) -> None:
@@ -85,17 +120,60 @@ class RAGWrapper:
         Args:
             texts: List of texts to add
         """
-        for text in texts:
-            await self.database_provider.add_text(text)
+        await self.database_provider.add_texts_bulk([(text, None) for text in texts])
         await self.retriever_provider.update_index(self.database_provider)
     
-    async def query(self, query: str, k: Optional[int] = None) -> List[str]:
+    async def delete_document(self, document_id: int) -> None:
+        """
+        Delete a document from the RAG system.
+        
+        Only the document's chunks are removed from the index; nothing is rebuilt.
+        
+        Args:
+            document_id: ID of the document to delete
+        """
+        removed_ids = await self.database_provider.delete_document(document_id)
+        await self.retriever_provider.remove_chunks(self.database_provider, removed_ids)
+    
+    async def upsert_document(
+        self,
+        document_id: int,
+        text: str,
+        chunks: Optional[List[str]] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Add a document under a given ID, or replace an existing one.
+        
+        Only the document's changed chunks are removed from and added to the
+        index; chunks with unchanged text keep their IDs and vectors. Pass
+        chunks from TextChunker.rechunk to keep the chunk boundaries of
+        unchanged regions stable.
+        
+        Args:
+            document_id: ID of the document
+            text: The full document text
+            chunks: The document's chunks (optional)
+            metadata: New metadata (optional; existing metadata is kept otherwise)
+        """
+        removed_ids, added_ids = await self.database_provider.upsert_document(
+            document_id, text, chunks=chunks, metadata=metadata
+        )
+        await self.retriever_provider.remove_chunks(self.database_provider, removed_ids)
+        if added_ids:
+            # New chunk IDs come from the sequence, so only chunks after them need indexing
+            await self.retriever_provider.update_index(self.database_provider, after_id=min(added_ids) - 1)
+    
+    async def query(
+        self, query: str, k: Optional[int] = None, chunk_filter: Optional[ChunkFilter] = None
+    ) -> List[str]:
         """
         Query the RAG system for relevant texts.
         
         Args:
             query: The query text
             k: Number of results to return (optional)
+            chunk_filter: Restrict results to matching documents (optional)
             
         Returns:
             List of relevant texts
@@ -103,7 +181,32 @@ class RAGWrapper:
         return await self.retriever_provider.get_relevant_texts(
             query, 
             self.database_provider,
-            k=k
+            k=k,
+            chunk_filter=chunk_filter
+        )
+    
+    async def query_batch(
+        self, queries: List[str], k: Optional[int] = None, chunk_filter: Optional[ChunkFilter] = None
+    ) -> List[List[str]]:
+        """
+        Query the RAG system with several queries at once.
+        
+        All queries are encoded in one batch and searched together, which is
+        much cheaper than calling query() once per query.
+        
+        Args:
+            queries: The query texts
+            k: Number of results to return per query (optional)
+            chunk_filter: Restrict results to matching documents (optional)
+        
+        Returns:
+            List of relevant texts for each query, in input order
+        """
+        return await self.retriever_provider.get_relevant_texts_batch(
+            queries,
+            self.database_provider,
+            k=k,
+            chunk_filter=chunk_filter
         )
     
     async def clear(self) -> None:
@@ -1,78 +1,1000 @@
 """
 FAISS-based retrieval system.
 """
-from typing import List, Tuple
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
 import numpy as np
-import faiss
+import asyncio
+import functools
+import json
 import os
-from ..database.base import BaseDatabase
+from .._lazy import lazy_import
+from ..database.base import BaseDatabase, ChunkFilter, chunk_checksum
+from .batching import MicroBatcher
+from .cache import QueryCache, SemanticQueryCache
 from .embeddings import EmbeddingModel
+from .textstore import TextStore
+from .vectorstore import VectorStore
 from ..config import settings
 
+faiss = lazy_import("faiss")
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+METRICS = ("l2", "cosine")
+COMPRESSIONS = ("none", "fp16", "int8", "pq")
+PRETRANSFORMS = ("pca", "opq")
+
+# Manifest values assumed for indexes saved before a setting existed
+_LEGACY_META = {"compression": "none", "pretransform": None, "pretransform_dim": None}
+
+def _get_index_ids(index: "faiss.Index") -> np.ndarray:
+    """
+    Get the external IDs stored in an index.
+    
+    Args:
+        index: An ID-mapped index or an IVF index carrying its own IDs
+    
+    Returns:
+        int64 array of IDs
+    """
+    if hasattr(index, "id_map"):
+        return faiss.vector_to_array(index.id_map)
+    
+    ivf = faiss.extract_index_ivf(index)
+    invlists = ivf.invlists
+    ids = [
+        faiss.rev_swig_ptr(invlists.get_ids(list_no), invlists.list_size(list_no)).copy()
+        for list_no in range(invlists.nlist)
+        if invlists.list_size(list_no) > 0
+    ]
+    return np.concatenate(ids) if ids else np.empty(0, dtype=np.int64)
+
+def _is_flat(index: "faiss.Index") -> bool:
+    """Check whether an (ID-mapped) index is an exact flat index."""
+    if hasattr(index, "id_map"):
+        index = faiss.downcast_index(index.index)
+    return isinstance(index, faiss.IndexFlat)
+
+def _cache_key(query: str, chunk_filter: Optional[ChunkFilter]) -> Hashable:
+    """Cache key of a query; filtered queries are cached separately per filter."""
+    return query if chunk_filter is None else (query, chunk_filter.cache_key())
+
+def _merge_results(
+    shard_results: List[Tuple[np.ndarray, np.ndarray, List[Optional[str]]]],
+    num_queries: int,
+    k: int
+) -> List[Tuple[List[str], List[float]]]:
+    """
+    Merge (distances, chunk_ids, texts) search results into the top-k per query.
+    
+    Args:
+        shard_results: One result per searched index; texts are flattened row by row
+        num_queries: Number of queries searched
+        k: Number of results to keep per query
+    
+    Returns:
+        List of (relevant_chunks, distances) tuples, one per query
+    """
+    distances = np.hstack([result[0].reshape(num_queries, -1) for result in shard_results])
+    indices = np.hstack([result[1].reshape(num_queries, -1) for result in shard_results])
+    
+    # Texts come flattened per index; lay them out in the same columns as the IDs
+    texts = np.empty(indices.shape, dtype=object)
+    column = 0
+    for shard_distances, _, shard_texts in shard_results:
+        width = shard_distances.size // num_queries if num_queries else 0
+        texts[:, column:column + width] = np.array(shard_texts, dtype=object).reshape(num_queries, width)
+        column += width
+    present = (indices >= 0) & np.vectorize(lambda text: text is not None, otypes=[bool])(texts)
+    
+    # Lower distances rank first in both metrics (cosine is reported as a distance)
+    order_key = np.where(present, distances, np.inf)
+    top = np.argsort(order_key, axis=1, kind="stable")[:, :k]
+    
+    results = []
+    for row, columns in enumerate(top):
+        relevant_chunks = []
+        relevant_distances = []
+        for col in columns:
+            if not present[row, col]:
+                break
+            relevant_chunks.append(texts[row, col])
+            relevant_distances.append(distances[row, col])
+        results.append((relevant_chunks, relevant_distances))
+    return results
+
 class FAISSRetriever:
-    def __init__(self, embedding_model: EmbeddingModel, index_path: str):
+    def __init__(
+        self,
+        embedding_model: EmbeddingModel,
+        index_path: str,
+        index_type: Optional[str] = None,
+        metric: Optional[str] = None,
+        nlist: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        hnsw_m: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        pq_m: Optional[int] = None,
+        compression: Optional[str] = None,
+        pretransform: Optional[str] = None,
+        pretransform_dim: Optional[int] = None,
+        mmap: Optional[bool] = None,
+        oversample: Optional[int] = None,
+        cache: Optional[QueryCache] = None,
+        semantic_cache: Optional[SemanticQueryCache] = None,
+        serve_queries: bool = True
+    ):
         """
         Initialize the FAISS retriever.
         
+        The index is keyed on the ``chunks.id`` primary key, so chunks can be
+        added and removed without re-embedding the corpus. Encoding and index
+        access run on a dedicated worker thread so they never block the event
+        loop, and concurrent queries are micro-batched into shared encode and
+        search calls.
+        
         Args:
             embedding_model: The embedding model to use
             index_path: Path where the FAISS index will be saved/loaded
+            index_type: One of "flat", "hnsw", "ivf_flat" or "ivf_pq" (defaults to settings.faiss_index_type)
+            metric: "l2" or "cosine" (defaults to settings.faiss_metric)
+            nlist: Number of IVF lists (defaults to settings.faiss_nlist)
+            nprobe: Number of IVF lists searched per query (defaults to settings.faiss_nprobe)
+            hnsw_m: HNSW neighbours per node (defaults to settings.faiss_hnsw_m)
+            ef_search: HNSW search beam width (defaults to settings.faiss_hnsw_ef_search)
+            pq_m: Number of PQ sub-quantizers (defaults to settings.faiss_pq_m)
+            compression: Vector encoding: "none", "fp16", "int8" (scalar quantization)
+                or "pq" (defaults to settings.faiss_compression)
+            pretransform: Optional dimensionality reduction trained at build time,
+                "pca" or "opq" (defaults to settings.faiss_pretransform)
+            pretransform_dim: Output dimension of the pre-transform
+                (defaults to settings.faiss_pretransform_dim, or half the embedding dimension)
+            mmap: Memory-map a saved index read-only instead of reading it into RAM
+                (defaults to settings.faiss_mmap); it is loaded into RAM on first update
+            oversample: Fetch k * oversample candidates from the index and re-rank them
+                exactly against full-precision vectors; 1 disables re-ranking
+                (defaults to settings.rerank_oversample)
+            cache: Query result cache (defaults to a QueryCache configured from settings)
+            semantic_cache: Second-level cache answering near-duplicate queries (defaults
+                to a SemanticQueryCache configured from settings if
+                settings.semantic_cache_enabled, else none)
+            serve_queries: Set up the query caches and micro-batcher used by
+                get_relevant_texts(); the shards of a ShardedRetriever, which
+                caches and batches queries itself, are created without them
         """
         if not index_path:
             raise ValueError("index_path must be provided for FAISS index storage")
             
+        self.index_type = index_type or settings.faiss_index_type
+        self.metric = metric or settings.faiss_metric
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"index_type must be one of {INDEX_TYPES}, got {self.index_type!r}")
+        if self.metric not in METRICS:
+            raise ValueError(f"metric must be one of {METRICS}, got {self.metric!r}")
+        
+        self.nlist = nlist or settings.faiss_nlist
+        self.nprobe = nprobe or settings.faiss_nprobe
+        self.hnsw_m = hnsw_m or settings.faiss_hnsw_m
+        self.ef_search = ef_search or settings.faiss_hnsw_ef_search
+        self.pq_m = pq_m or settings.faiss_pq_m
+        
+        self.compression = compression or settings.faiss_compression
+        self.pretransform = pretransform or settings.faiss_pretransform
+        if self.compression not in COMPRESSIONS:
+            raise ValueError(f"compression must be one of {COMPRESSIONS}, got {self.compression!r}")
+        if self.pretransform is not None and self.pretransform not in PRETRANSFORMS:
+            raise ValueError(f"pretransform must be one of {PRETRANSFORMS} or None, got {self.pretransform!r}")
+        if self.index_type == "ivf_pq" and self.compression not in ("none", "pq"):
+            raise ValueError("ivf_pq indexes are always product-quantized; use compression='none'")
+        
+        self.pretransform_dim = None
+        if self.pretransform is not None:
+            self.pretransform_dim = (
+                pretransform_dim or settings.faiss_pretransform_dim or embedding_model.dimension // 2
+            )
+            if not 0 < self.pretransform_dim <= embedding_model.dimension:
+                raise ValueError(
+                    f"pretransform_dim ({self.pretransform_dim}) must be between 1 and "
+                    f"the embedding dimension ({embedding_model.dimension})"
+                )
+        
+        uses_pq = self.index_type == "ivf_pq" or self.compression == "pq"
+        if self.pretransform == "opq" and not uses_pq:
+            raise ValueError("pretransform='opq' requires product quantization (compression='pq' or index_type='ivf_pq')")
+        coded_dimension = self.pretransform_dim or embedding_model.dimension
+        if uses_pq and coded_dimension % self.pq_m != 0:
+            raise ValueError(
+                f"pq_m ({self.pq_m}) must divide the encoded vector dimension ({coded_dimension})"
+            )
+        
         self.embedding_model = embedding_model
         self.index_path = index_path
-        self.text_lookup: List[str] = []
+        # Index types that must be trained are staged in a flat index until
+        # there are enough vectors, so their lists and codes are never undersized
+        self._needs_training = not self._new_index(self._factory_string()).is_trained
+        self.meta_path = f"{index_path}.meta.json"
+        self.mmap = settings.faiss_mmap if mmap is None else mmap
         
-        # Initialize cache dictionary for storing query results
-        self._cache = {}
+        # Chunk texts live in a memory-mapped file next to the index
+        self.text_store = TextStore(f"{index_path}.texts")
+        
+        # Full-precision vectors for exact re-ranking, memory-mapped as well
+        self.oversample = oversample or settings.rerank_oversample
+        if self.oversample < 1:
+            raise ValueError("oversample must be at least 1")
+        self.vector_store: Optional[VectorStore] = None
+        if self.oversample > 1:
+            self.vector_store = VectorStore(f"{index_path}.vectors", embedding_model.dimension)
+        
+        # Bounded LRU cache for storing query results
+        self.serve_queries = serve_queries
+        self._cache: Optional[QueryCache] = None
+        self._semantic_cache: Optional[SemanticQueryCache] = None
+        if serve_queries:
+            self._cache = cache if cache is not None else QueryCache()
+            if semantic_cache is None and settings.semantic_cache_enabled:
+                semantic_cache = SemanticQueryCache()
+            self._semantic_cache = semantic_cache
+        
+        # A single worker thread serializes all index access, so searches never
+        # observe a half-applied update
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="faiss-retriever")
+        self._batcher: Optional[MicroBatcher] = None
+        if serve_queries:
+            self._batcher = MicroBatcher(self._process_query_batch, self._executor)
+        
+        # Updates await the database and the worker thread many times; the lock
+        # keeps two of them from computing the same delta or interleaving
+        self._update_lock = asyncio.Lock()
         
         # Initialize or load existing index
+        self._index_mmapped = False
+        self._index_loaded = False
         if os.path.exists(index_path):
+            self.index = self._read_index(mmap=self.mmap)
+            # An index built with other settings (or before ID mapping) cannot be reused
+            if self._index_meta_matches():
+                self._index_loaded = True
+            else:
+                self.index = self._create_index()
+                self._index_mmapped = False
+                self.text_store.clear()
+                if self.vector_store is not None:
+                    self.vector_store.clear()
+            self._apply_search_params()
+        else:
+            self.index = self._create_index()
+        
+        # Chunk IDs deleted from an index that cannot remove vectors (HNSW); their
+        # vectors stay in the index but are excluded from searches until it is compacted
+        self._tombstones: Set[int] = set(self._read_manifest().get("tombstones", [])) if self._index_loaded else set()
+        self._tombstone_selector: Optional["faiss.IDSelector"] = None
+        
+        # Chunk IDs currently present in the index
+        self._indexed_ids: Set[int] = set(_get_index_ids(self.index).tolist()) - self._tombstones
+        
+        # chunk_checksum() of the indexed chunks, or None if it is unknown
+        self._checksum: Optional[int] = self._read_manifest_checksum() if self._index_loaded else 0
+    
+    async def _run_blocking(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run a blocking call (model inference, FAISS) on the retriever's worker thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+    
+    def close(self) -> None:
+        """Stop the query batcher, shut down the worker thread and unmap the stores."""
+        if self._batcher is not None:
+            self._batcher.close()
+        self._executor.shutdown(wait=True)
+        self.text_store.close()
+        if self.vector_store is not None:
+            self.vector_store.close()
+    
+    def _read_index(self, mmap: bool = False) -> "faiss.Index":
+        """
+        Load the saved index, optionally memory-mapped read-only.
+        
+        A mapped index shares the page cache with other processes serving the
+        same file and loads without copying the vectors into RAM.
+        """
+        try:
+            if mmap:
+                # IO_FLAG_MMAP_IFC also maps flat and HNSW storage, not only inverted lists
+                flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+                index = faiss.read_index(self.index_path, flags)
+            else:
+                index = faiss.read_index(self.index_path)
+        except Exception as e:
+            raise RuntimeError(f"Failed to load FAISS index from {self.index_path}: {str(e)}")
+        self._index_mmapped = mmap
+        return index
+    
+    def _ensure_writable(self) -> None:
+        """Replace a memory-mapped index with an in-RAM copy before it is modified."""
+        if self._index_mmapped:
+            self.index = self._read_index()
+            self._apply_search_params()
+    
+    def _index_meta(self) -> Dict[str, object]:
+        """Describe the configured index so a saved index can be matched on reload."""
+        return {
+            "index_type": self.index_type,
+            "metric": self.metric,
+            "dimension": self.embedding_model.dimension,
+            "model_name": self.embedding_model.embedding_name,
+            "compression": self.compression,
+            "pretransform": self.pretransform,
+            "pretransform_dim": self.pretransform_dim,
+        }
+    
+    def _index_meta_matches(self) -> bool:
+        """Check whether the loaded index was written with the current configuration."""
+        if os.path.exists(self.meta_path):
             try:
-                self.index = faiss.read_index(index_path)
-            except Exception as e:
-                raise RuntimeError(f"Failed to load FAISS index from {index_path}: {str(e)}")
+                with open(self.meta_path, "r", encoding="utf-8") as f:
+                    saved = json.load(f)
+            except (OSError, ValueError):
+                return False
         else:
-            self.index = faiss.IndexFlatL2(self.embedding_model.dimension)
+            # Indexes saved before the metadata file existed were ID-mapped flat L2
+            if not hasattr(self.index, "id_map"):
+                return False
+            saved = {"index_type": "flat", "metric": "l2"}
+        
+        expected = self._index_meta()
+        if self.index.d != expected["dimension"]:
+            return False
+        return all(
+            saved.get(key, _LEGACY_META.get(key, value)) == value for key, value in expected.items()
+        )
+    
+    def _manifest(self) -> Dict[str, object]:
+        """Describe the index configuration and the chunks it holds, for warm_start."""
+        return {
+            **self._index_meta(),
+            "chunk_count": len(self._indexed_ids),
+            "max_chunk_id": max(self._indexed_ids, default=0),
+            "checksum": self._checksum,
+            "tombstones": sorted(self._tombstones),
+        }
+    
+    def _read_manifest(self) -> Dict[str, object]:
+        """Read the manifest saved with the index, or an empty dict if there is none."""
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _read_manifest_checksum(self) -> Optional[int]:
+        """
+        Get the chunk checksum recorded with the loaded index.
+        
+        Returns:
+            The checksum, or None if there is no manifest or it does not
+            describe the chunks actually in the index
+        """
+        saved = self._read_manifest()
+        if saved.get("chunk_count") != len(self._indexed_ids):
+            return None
+        if saved.get("max_chunk_id") != max(self._indexed_ids, default=0):
+            return None
+        return saved.get("checksum")
+    
+    def _factory_string(self) -> str:
+        """
+        Build the faiss.index_factory description for the configured index type,
+        compression and pre-transform.
+        """
+        code = {
+            "none": "Flat",
+            "fp16": "SQfp16",
+            "int8": "SQ8",
+            "pq": f"PQ{self.pq_m}x8",
+        }[self.compression]
+        
+        prefix = ""
+        if self.pretransform == "opq":
+            prefix = f"OPQ{self.pq_m}_{self.pretransform_dim},"
+        elif self.pretransform is not None:
+            prefix = f"PCA{self.pretransform_dim},"
+        
+        if self.index_type == "flat":
+            return f"IDMap2,{prefix}{code}"
+        if self.index_type == "hnsw":
+            suffix = "" if self.compression == "none" else f"_{code}"
+            return f"IDMap2,{prefix}HNSW{self.hnsw_m}{suffix}"
+        
+        if self.index_type == "ivf_flat":
+            return f"{prefix}IVF{self.nlist},{code}"
+        return f"{prefix}IVF{self.nlist},PQ{self.pq_m}x8"
+    
+    def _min_train_size(self) -> int:
+        """Number of vectors needed to train the configured index without shrinking it."""
+        size = 1
+        if self.index_type in ("ivf_flat", "ivf_pq"):
+            # FAISS wants at least 39 training points per list
+            size = self.nlist * 39
+        if self.index_type == "ivf_pq" or self.compression == "pq" or self.pretransform == "opq":
+            # One point per centroid of the 8-bit PQ codebooks
+            size = max(size, 256)
+        if self.pretransform is not None:
+            # A full-rank covariance for the PCA/OPQ rotation
+            size = max(size, self.embedding_model.dimension)
+        return size
+    
+    def _new_index(self, factory_string: str) -> "faiss.Index":
+        faiss_metric = faiss.METRIC_INNER_PRODUCT if self.metric == "cosine" else faiss.METRIC_L2
+        index = faiss.index_factory(self.embedding_model.dimension, factory_string, faiss_metric)
+        self._apply_search_params(index)
+        return index
+    
+    def _create_index(self) -> "faiss.Index":
+        """
+        Create an empty index.
+        
+        Index types that must be trained (IVF, PQ, int8, PCA/OPQ) start as an
+        exact flat staging index; _add_vectors() replaces it with the
+        configured index once there are enough vectors to train it on.
+        """
+        if self._needs_training:
+            return self._new_index("IDMap2,Flat")
+        return self._new_index(self._factory_string())
+    
+    @property
+    def _staging(self) -> bool:
+        """Whether the index is still the flat staging index of an index type that needs training."""
+        return self._needs_training and _is_flat(self.index)
+    
+    def _apply_search_params(self, index: Optional["faiss.Index"] = None) -> None:
+        """Set query-time parameters (nprobe, efSearch) that are not tied to the stored index."""
+        index = index or self.index
+        if _is_flat(index):
+            return
+        params = faiss.ParameterSpace()
+        if self.index_type in ("ivf_flat", "ivf_pq"):
+            params.set_index_parameter(index, "nprobe", self.nprobe)
+        elif self.index_type == "hnsw":
+            params.set_index_parameter(index, "efSearch", self.ef_search)
+    
+    def _prepare_vectors(self, vectors: np.ndarray) -> np.ndarray:
+        """Convert vectors to contiguous float32, L2-normalizing them in cosine mode."""
+        vectors = np.array(vectors, dtype=np.float32, order="C")
+        if self.metric == "cosine":
+            faiss.normalize_L2(vectors)
+        return vectors
+    
+    def _add_vectors(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        """
+        Add vectors to the index.
+        
+        Once the flat staging index holds enough vectors, the configured index
+        is trained on them and replaces it.
+        
+        Args:
+            ids: int64 chunk IDs
+            vectors: Embeddings, one row per ID
+        """
+        vectors = self._prepare_vectors(vectors)
+        self._ensure_writable()
+        self.index.add_with_ids(vectors, ids)
+        if self._staging and self.index.ntotal >= self._min_train_size():
+            self._train_from_staging()
+    
+    def _train_from_staging(self) -> None:
+        """Train the configured index on the staged vectors and move them into it."""
+        staged_ids = _get_index_ids(self.index)
+        staged_vectors = self.index.index.reconstruct_n(0, self.index.ntotal)
+        sample = staged_vectors
+        if len(staged_vectors) > settings.faiss_train_sample_size:
+            rows = np.random.default_rng(0).choice(len(staged_vectors), settings.faiss_train_sample_size, replace=False)
+            sample = staged_vectors[rows]
+        index = self._new_index(self._factory_string())
+        index.train(sample)
+        index.add_with_ids(staged_vectors, staged_ids)
+        self.index = index
+    
+    def _remove_vectors(self, ids: np.ndarray) -> None:
+        """Remove vectors from the index by chunk ID, or tombstone them if the index cannot delete (HNSW)."""
+        if self.index_type == "hnsw" and not self._staging:
+            self._tombstones.update(ids.tolist())
+            self._tombstone_selector = None
+            return
+        self._ensure_writable()
+        self.index.remove_ids(ids)
+    
+    def _reset_index(self) -> None:
+        """Replace the index with an empty one, dropping its tombstones."""
+        self.index = self._create_index()
+        self._index_mmapped = False
+        self._tombstones = set()
+        self._tombstone_selector = None
+    
+    def _needs_compaction(self) -> bool:
+        """Check whether tombstones make up more than settings.faiss_hnsw_compact_ratio of the index."""
+        return len(self._tombstones) > settings.faiss_hnsw_compact_ratio * self.index.ntotal
+    
+    async def _compact_index(self, database: BaseDatabase) -> None:
+        """Rebuild the index without its tombstoned vectors, from the stored embeddings."""
+        await self._run_blocking(self._reset_index)
+        self._indexed_ids.clear()
+        self._checksum = 0
+        await self._update_index(database)
+    
+    def _flush_stores(self) -> None:
+        """Write staged changes of the text and vector stores."""
+        self.text_store.flush()
+        if self.vector_store is not None:
+            self.vector_store.flush()
+    
+    def _save_index(self) -> None:
+        """
+        Write the index, its chunk texts and its manifest.
+        
+        Each file is written to a temporary path and atomically renamed, so
+        processes that have the previous files mapped keep a consistent view.
+        """
+        try:
+            self._flush_stores()
+            tmp_path = f"{self.index_path}.tmp"
+            faiss.write_index(self.index, tmp_path)
+            os.replace(tmp_path, self.index_path)
+            tmp_path = f"{self.meta_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._manifest(), f)
+            os.replace(tmp_path, self.meta_path)
+        except Exception as e:
+            raise RuntimeError(f"Failed to save FAISS index to {self.index_path}: {str(e)}")
+        # The saved index and manifest now describe the in-memory index, so
+        # warm_start can reuse it like an index loaded from disk
+        self._index_loaded = True
 
-    async def update_index(self, database: BaseDatabase):
-        """Update the FAISS index with all chunks from the database."""
+    async def embed_chunks(
+        self, database: BaseDatabase, chunks: List[Tuple[int, str]], executor: Optional[Executor] = None
+    ) -> np.ndarray:
+        """
+        Get embeddings for chunks, preferring vectors persisted in the database.
+        
+        Only chunks without a stored vector for the current model are encoded,
+        each distinct text once, and the freshly encoded vectors are written
+        back to the database; the database shares them with identical chunks.
+        Used by update_index, and by callers such as IngestionPipeline that
+        embed chunks themselves before add_chunks().
+        
+        Args:
+            database: Database holding the persisted embeddings
+            chunks: List of (chunk_id, chunk_text) tuples
+            executor: Executor to encode on instead of the retriever's worker
+                thread, so that several callers can encode at the same time
+                without holding up searches and index updates
+        
+        Returns:
+            float32 array of embeddings in the order of chunks
+        """
+        model_name = self.embedding_model.embedding_name
+        embeddings = np.empty((len(chunks), self.embedding_model.dimension), dtype=np.float32)
+        
+        stored_ids, stored_vectors = await database.get_embeddings(
+            model_name, [chunk_id for chunk_id, _ in chunks]
+        )
+        stored = dict(zip(stored_ids, stored_vectors))
+        
+        missing = []
+        for row, (chunk_id, text) in enumerate(chunks):
+            vector = stored.get(chunk_id)
+            if vector is not None and len(vector) == embeddings.shape[1]:
+                embeddings[row] = vector
+            else:
+                missing.append(row)
+        
+        if missing:
+            # First row of each distinct text; repeats are filled from it
+            first_rows: Dict[str, int] = {}
+            for row in missing:
+                first_rows.setdefault(chunks[row][1], row)
+            unique_rows = list(first_rows.values())
+            texts = [chunks[row][1] for row in unique_rows]
+            if executor is None:
+                encoded = await self._run_blocking(self.embedding_model.encode, texts)
+            else:
+                loop = asyncio.get_running_loop()
+                encoded = await loop.run_in_executor(executor, self.embedding_model.encode, texts)
+            embeddings[unique_rows] = encoded
+            embeddings[missing] = embeddings[[first_rows[chunks[row][1]] for row in missing]]
+            await database.add_embeddings(
+                model_name, [chunks[row][0] for row in unique_rows], embeddings[unique_rows]
+            )
+        
+        return embeddings
+    
+    async def update_index(self, database: BaseDatabase, after_id: Optional[int] = None):
+        """
+        Bring the FAISS index in line with the chunks in the database.
+        
+        Chunks are streamed from the database in batches of
+        settings.index_build_batch_size; only chunks whose IDs are not yet
+        indexed are embedded (reusing persisted embeddings when available) and
+        added one batch at a time, so peak memory does not grow with the corpus.
+        Chunks that no longer exist in the database are removed by ID.
+        
+        Args:
+            database: Database to read chunks from
+            after_id: Only stream chunks with a greater ID, for a caller that
+                knows all older chunks are already indexed; nothing is removed
+        """
+        async with self._update_lock:
+            await self._update_index(database, after_id)
+    
+    async def _update_index(self, database: BaseDatabase, after_id: Optional[int] = None):
+        """update_index() for a caller holding the update lock."""
         try:
-            # Clear cache since the underlying data is changing
-            self._cache.clear()
+            seen_ids: Set[int] = set()
+            added = 0
             
-            # Get all chunks
-            chunks = await database.get_chunks()
-            if not chunks:
+            async for batch in database.iter_chunks(batch_size=settings.index_build_batch_size, after_id=after_id):
+                batch_ids = [chunk_id for chunk_id, _ in batch]
+                seen_ids.update(batch_ids)
+                missing = ~self.text_store.contains_many(batch_ids)
+                if missing.any():
+                    self.text_store.add(chunk for chunk, absent in zip(batch, missing) if absent)
+                
+                is_new = np.array([chunk_id not in self._indexed_ids for chunk_id in batch_ids], dtype=bool)
+                # Indexed chunks also need embeddings when the re-rank store lacks their vectors
+                needed = is_new.copy()
+                if self.vector_store is not None:
+                    needed |= ~self.vector_store.contains_many(batch_ids)
+                if not needed.any():
+                    continue
+                
+                new_chunks = [chunk for chunk, new in zip(batch, is_new) if new]
+                ids = np.array([chunk_id for chunk_id, _ in new_chunks], dtype=np.int64)
+                if self._checksum is not None:
+                    self._checksum += chunk_checksum(new_chunks)
+                try:
+                    embeddings = await self.embed_chunks(
+                        database, [chunk for chunk, need in zip(batch, needed) if need]
+                    )
+                    if self.vector_store is not None:
+                        self.vector_store.add(
+                            [chunk_id for chunk_id, need in zip(batch_ids, needed) if need],
+                            self._prepare_vectors(embeddings)
+                        )
+                    embeddings = embeddings[is_new[needed]]
+                    if not len(ids):
+                        continue
+                    await self._run_blocking(self._add_vectors, ids, embeddings)
+                except Exception as e:
+                    raise RuntimeError(f"Failed to generate or add embeddings: {str(e)}")
+                added += len(ids)
+            
+            self._indexed_ids.update(seen_ids)
+            stale_ids = self._indexed_ids - seen_ids if after_id is None else set()
+            if stale_ids:
+                stale_texts = self.text_store.get_many(sorted(stale_ids))
+                if self._checksum is not None and None not in stale_texts:
+                    self._checksum -= chunk_checksum(zip(sorted(stale_ids), stale_texts))
+                else:
+                    self._checksum = None
+                self.text_store.remove(stale_ids)
+                if self.vector_store is not None:
+                    self.vector_store.remove(stale_ids)
+            if not stale_ids and not added:
+                await self._run_blocking(self._flush_stores)
                 return
+            
+            # Clear cache since the underlying data is changing
+            self._clear_caches()
+            
+            if stale_ids:
+                await self._run_blocking(
+                    self._remove_vectors, np.array(sorted(stale_ids), dtype=np.int64)
+                )
+                self._indexed_ids -= stale_ids
+                if self._needs_compaction():
+                    await self._compact_index(database)
+                    return
 
-            # Clear existing index
-            self.index = faiss.IndexFlatL2(self.embedding_model.dimension)
-            self.text_lookup = chunks
-
-            # Create embeddings and add to index
-            try:
-                embeddings = self.embedding_model.encode(chunks)
-                self.index.add(embeddings)
-            except Exception as e:
-                raise RuntimeError(f"Failed to generate or add embeddings: {str(e)}")
-
-            # Save index
-            try:
-                faiss.write_index(self.index, self.index_path)
-            except Exception as e:
-                raise RuntimeError(f"Failed to save FAISS index to {self.index_path}: {str(e)}")
+            await self._run_blocking(self._save_index)
                 
+            # Queries searched before the vectors were removed may have re-cached them
+            self._clear_caches()
+        
         except Exception as e:
             raise RuntimeError(f"Failed to update index: {str(e)}")
+    
+    async def remove_chunks(self, database: BaseDatabase, chunk_ids: Iterable[int]) -> int:
+        """
+        Remove chunks from the index by ID, without rebuilding it.
+        
+        Meant for chunks that were just deleted from the database (see
+        BaseDatabase.delete_document and upsert_document). Their vectors, texts
+        and re-rank vectors are dropped, the manifest checksum is adjusted, and
+        only cached results that contain a removed chunk are invalidated.
+        Index types that cannot delete vectors (HNSW) keep them as tombstones
+        excluded from searches, and are rebuilt from the stored embeddings once
+        tombstones pass settings.faiss_hnsw_compact_ratio of the index.
+        
+        Args:
+            database: Database to rebuild from when the index is compacted
+            chunk_ids: IDs of the chunks to remove; IDs not in the index are ignored
+        
+        Returns:
+            Number of chunks removed
+        """
+        return len(await self.pop_chunks(database, chunk_ids))
+    
+    async def pop_chunks(self, database: BaseDatabase, chunk_ids: Iterable[int]) -> List[str]:
+        """
+        Remove chunks from the index by ID like remove_chunks(), returning their texts.
+        
+        For callers that keep their own result cache, such as ShardedRetriever,
+        and invalidate the results containing the removed chunks.
+        
+        Returns:
+            Texts of the removed chunks
+        """
+        async with self._update_lock:
+            return await self._pop_chunks(database, chunk_ids)
+    
+    async def _pop_chunks(self, database: BaseDatabase, chunk_ids: Iterable[int]) -> List[str]:
+        """pop_chunks() for a caller holding the update lock."""
+        removed_ids = sorted(set(int(chunk_id) for chunk_id in chunk_ids) & self._indexed_ids)
+        if not removed_ids:
+            return []
+        
+        try:
+            removed_texts = self.text_store.get_many(removed_ids)
+            if self._checksum is not None and None not in removed_texts:
+                self._checksum -= chunk_checksum(zip(removed_ids, removed_texts))
+            else:
+                self._checksum = None
+            self.text_store.remove(removed_ids)
+            if self.vector_store is not None:
+                self.vector_store.remove(removed_ids)
+            removed_texts = [text for text in removed_texts if text is not None]
+            self._invalidate_texts(removed_texts)
+            
+            await self._run_blocking(self._remove_vectors, np.array(removed_ids, dtype=np.int64))
+            self._indexed_ids.difference_update(removed_ids)
+            if self._needs_compaction():
+                await self._compact_index(database)
+                return removed_texts
+            
+            await self._run_blocking(self._save_index)
+            
+            # Queries searched before the vectors were removed may have re-cached them
+            self._invalidate_texts(removed_texts)
+            return removed_texts
+        except Exception as e:
+            raise RuntimeError(f"Failed to remove chunks from index: {str(e)}")
+    
+    async def add_chunks(self, chunks: List[Tuple[int, str]], embeddings: np.ndarray) -> int:
+        """
+        Add chunks with precomputed embeddings to the index.
+        
+        For callers that embed chunks themselves, such as IngestionPipeline;
+        chunks that are already indexed are skipped. Changes are searchable
+        immediately and written to disk by save().
+        
+        Args:
+            chunks: (chunk_id, chunk_text) tuples
+            embeddings: Their embeddings, one row per chunk
+        
+        Returns:
+            Number of chunks added
+        """
+        async with self._update_lock:
+            return await self._add_chunks(chunks, embeddings)
+    
+    async def _add_chunks(self, chunks: List[Tuple[int, str]], embeddings: np.ndarray) -> int:
+        """add_chunks() for a caller holding the update lock."""
+        is_new = np.array([chunk_id not in self._indexed_ids for chunk_id, _ in chunks], dtype=bool)
+        if not is_new.any():
+            return 0
+        
+        new_chunks = [chunk for chunk, new in zip(chunks, is_new) if new]
+        ids = np.array([chunk_id for chunk_id, _ in new_chunks], dtype=np.int64)
+        embeddings = np.asarray(embeddings)[is_new]
+        try:
+            self.text_store.add(new_chunks)
+            if self.vector_store is not None:
+                self.vector_store.add(ids, self._prepare_vectors(embeddings))
+            if self._checksum is not None:
+                self._checksum += chunk_checksum(new_chunks)
+            self._indexed_ids.update(ids.tolist())
+            await self._run_blocking(self._add_vectors, ids, embeddings)
+        except Exception as e:
+            raise RuntimeError(f"Failed to add chunks to index: {str(e)}")
+        
+        self._clear_caches()
+        return len(ids)
+    
+    async def save(self) -> None:
+        """Write the index, chunk texts and manifest after add_chunks() calls."""
+        async with self._update_lock:
+            await self._run_blocking(self._save_index)
+    
+    async def rebuild_index(self, database: BaseDatabase):
+        """
+        Discard the current index and rebuild it from the database.
+        
+        Vectors persisted for the current embedding model are reused as-is;
+        only chunks without a stored vector are encoded.
+        """
+        async with self._update_lock:
+            await self._rebuild_index(database)
+    
+    async def _rebuild_index(self, database: BaseDatabase):
+        """rebuild_index() for a caller holding the update lock."""
+        await self._run_blocking(self._reset_index)
+        self._indexed_ids.clear()
+        self._checksum = 0
+        self.text_store.clear()
+        if self.vector_store is not None:
+            self.vector_store.clear()
+        self._clear_caches()
+        await self._update_index(database)
+        # An empty database leaves nothing for update_index to write
+        if not self._indexed_ids:
+            await self._run_blocking(self._save_index)
+    
+    async def warm_start(self, database: BaseDatabase) -> str:
+        """
+        Make a saved index usable at startup with as little work as possible.
+        
+        The manifest saved with the index (model, dimension, chunk count, max
+        chunk ID and checksum) is compared against a single summary query:
+        
+        - "reused": the database holds exactly the indexed chunks, nothing is done
+        - "caught_up": chunks were appended or deleted since the index was saved,
+          and the index was updated incrementally
+        - "rebuilt": there was no usable index or manifest, or indexed chunks
+          changed, so the index was rebuilt (from stored embeddings where possible)
+        
+        Args:
+            database: Database providing get_chunk_summary() and iter_chunks()
+        
+        Returns:
+            "reused", "caught_up" or "rebuilt"
+        """
+        async with self._update_lock:
+            return await self._warm_start(database)
+    
+    async def _warm_start(self, database: BaseDatabase) -> str:
+        """warm_start() for a caller holding the update lock."""
+        try:
+            if not self._index_loaded or self._checksum is None:
+                await self._rebuild_index(database)
+                return "rebuilt"
+            
+            chunk_count = len(self._indexed_ids)
+            max_chunk_id = max(self._indexed_ids, default=0)
+            summary = await database.get_chunk_summary(up_to_id=max_chunk_id)
+            if (summary["chunk_count"] == chunk_count
+                    and summary["max_chunk_id"] == max_chunk_id
+                    and summary["checksum"] == self._checksum):
+                if self.vector_store is not None and len(self.vector_store) != chunk_count:
+                    # Re-ranking was enabled after the index was built; backfill the vectors
+                    await self._update_index(database)
+                    return "caught_up"
+                return "reused"
+            
+            if summary["prefix_count"] == chunk_count:
+                if summary["prefix_checksum"] != self._checksum:
+                    # Same chunk IDs but different texts: vectors are out of date
+                    await self._rebuild_index(database)
+                    return "rebuilt"
+                # Only new chunks past the indexed range
+                await self._update_index(database, after_id=max_chunk_id)
+                return "caught_up"
+            
+            # Chunks were deleted; update_index removes them by ID
+            await self._update_index(database)
+            if self._checksum != summary["checksum"]:
+                await self._rebuild_index(database)
+                return "rebuilt"
+            return "caught_up"
+        except Exception as e:
+            raise RuntimeError(f"Failed to warm start index: {str(e)}")
 
+    def _clear_caches(self) -> None:
+        """Drop all cached query results once the indexed chunks change."""
+        if self._cache is not None:
+            self._cache.clear()
+        if self._semantic_cache is not None:
+            self._semantic_cache.clear()
+    
+    def _invalidate_texts(self, texts: List[str]) -> None:
+        """Drop cached query results that contain any of the given chunk texts."""
+        if self._cache is not None:
+            self._cache.invalidate_texts(texts)
+        if self._semantic_cache is not None:
+            self._semantic_cache.invalidate_texts(texts)
+    
+    def _require_serving(self) -> None:
+        if not self.serve_queries:
+            raise RuntimeError("This retriever was created with serve_queries=False; use search_allowed() or submit_search()")
+    
+    def cache_stats(self) -> Dict[str, object]:
+        """Get hit/miss/eviction statistics of the query result cache."""
+        self._require_serving()
+        return self._cache.stats()
+    
+    def semantic_cache_stats(self) -> Optional[Dict[str, object]]:
+        """Get hit and false-hit statistics of the semantic query cache, or None if it is disabled."""
+        return self._semantic_cache.stats() if self._semantic_cache is not None else None
+    
+    def memory_footprint(self) -> Dict[str, object]:
+        """
+        Report how much memory the index takes, measured as its serialized size.
+        
+        Returns:
+            Dictionary with the number of vectors, index_bytes, bytes_per_vector,
+            the size the same vectors take as raw float32 and the compression ratio
+        """
+        num_vectors = self.index.ntotal
+        index_bytes = int(faiss.serialize_index(self.index).nbytes)
+        float32_bytes = num_vectors * self.embedding_model.dimension * 4
+        return {
+            "vectors": num_vectors,
+            "index_bytes": index_bytes,
+            "bytes_per_vector": index_bytes / num_vectors if num_vectors else 0.0,
+            "float32_bytes": float32_bytes,
+            "compression_ratio": float32_bytes / index_bytes if index_bytes else 0.0,
+        }
+    
+    async def measure_recall(self, database: BaseDatabase, queries: List[str], k: Optional[int] = None) -> float:
+        """
+        Measure recall@k of the index against an exact flat search.
+        
+        The exact baseline is built in memory from the embeddings persisted for
+        the indexed chunks, so this is meant for offline evaluation of the
+        compression and index settings, not for serving.
+        
+        Args:
+            database: Database holding the persisted embeddings
+            queries: Query texts to evaluate with
+            k: Number of neighbours compared per query (defaults to settings.top_k)
+        
+        Returns:
+            Mean fraction of the exact top-k chunk IDs that the index also returns
+        """
+        k = k or settings.top_k
+        try:
+            chunk_ids, vectors = await database.get_embeddings(self.embedding_model.embedding_name)
+            chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+            keep = np.isin(chunk_ids, np.fromiter(self._indexed_ids, dtype=np.int64))
+            chunk_ids, vectors = chunk_ids[keep], vectors[keep]
+            if not len(chunk_ids) or not queries:
+                return 0.0
+            
+            query_vectors = await self._run_blocking(self.embedding_model.encode, queries)
+            return await self._run_blocking(self._compare_with_exact, chunk_ids, vectors, query_vectors, k)
+        except Exception as e:
+            raise RuntimeError(f"Failed to measure recall: {str(e)}")
+    
+    def _compare_with_exact(
+        self, chunk_ids: np.ndarray, vectors: np.ndarray, query_vectors: np.ndarray, k: int
+    ) -> float:
+        """Compute recall@k of the index against exact search over the given vectors."""
+        exact = faiss.IndexFlatIP(vectors.shape[1]) if self.metric == "cosine" else faiss.IndexFlatL2(vectors.shape[1])
+        exact.add(self._prepare_vectors(vectors))
+        k = min(k, len(chunk_ids))
+        _, exact_rows = exact.search(self._prepare_vectors(query_vectors), k)
+        _, found_ids = self._search_vectors(query_vectors, k)
+        
+        hits = [
+            len(set(chunk_ids[rows].tolist()) & set(found.tolist()))
+            for rows, found in zip(exact_rows, found_ids)
+        ]
+        return float(np.mean(hits)) / k
+    
     async def get_relevant_texts(
         self, 
         query: str, 
         database: BaseDatabase,
-        k: int = None
+        k: int = None,
+        chunk_filter: Optional[ChunkFilter] = None
     ) -> Tuple[List[str], List[float]]:
         """
         Get the most relevant chunks for a query.
@@ -81,6 +1003,7 @@ class FAISSRetriever:
             query: The query text
             database: Database instance
             k: Number of results to return (defaults to settings.top_k)
+            chunk_filter: Only return chunks of documents matching this filter
             
         Returns:
             Tuple of (relevant_chunks, distances)
@@ -88,37 +1011,437 @@ class FAISSRetriever:
         Raises:
             RuntimeError: If embedding generation or search fails
         """
+        self._require_serving()
         # Default k
         k = k or settings.top_k
         
-        # Construct cache key from query and k
-        cache_key = (query, k)
+        # Return cached result if available; a cached larger-k result also serves smaller k
+        cache_key = _cache_key(query, chunk_filter)
+        cached = self._cache.get(cache_key, k)
+        if cached is not None:
+            return cached
+        generation = self._cache.generation
         
-        # Return cached result if available
-        if cache_key in self._cache:
-            return self._cache[cache_key]
+        if chunk_filter is None:
+            # Encode and search on the worker thread, sharing the call with concurrent queries
+            result = await self._batcher.submit((query, k))
+        else:
+            result = (await self._filtered_search([query], database, k, chunk_filter))[0]
         
+        # Store result in cache
+        self._cache.put(cache_key, k, result, generation)
+        return result
+    
+    async def get_relevant_texts_batch(
+        self,
+        queries: List[str],
+        database: BaseDatabase,
+        k: int = None,
+        chunk_filter: Optional[ChunkFilter] = None
+    ) -> List[Tuple[List[str], List[float]]]:
+        """
+        Get the most relevant chunks for several queries at once.
+        
+        Cached queries are answered from the cache; the rest are encoded in a
+        single batch and searched with a single matrix search.
+        
+        Args:
+            queries: The query texts
+            database: Database instance
+            k: Number of results to return per query (defaults to settings.top_k)
+            chunk_filter: Only return chunks of documents matching this filter
+        
+        Returns:
+            List of (relevant_chunks, distances) tuples, one per query in input order
+        
+        Raises:
+            RuntimeError: If embedding generation or search fails
+        """
+        self._require_serving()
+        k = k or settings.top_k
+        results: List[Optional[Tuple[List[str], List[float]]]] = [None] * len(queries)
+        
+        # Positions of each uncached query; duplicates are searched once
+        pending: Dict[str, List[int]] = {}
+        for position, query in enumerate(queries):
+            cached = self._cache.get(_cache_key(query, chunk_filter), k)
+            if cached is not None:
+                results[position] = cached
+            else:
+                pending.setdefault(query, []).append(position)
+        
+        if not pending:
+            return results
+        
+        pending_queries = list(pending)
+        generation = self._cache.generation
+        if chunk_filter is None:
+            searched = await self._run_blocking(self._encode_and_search, pending_queries, k)
+        else:
+            searched = await self._filtered_search(pending_queries, database, k, chunk_filter)
+        
+        for query, result in zip(pending_queries, searched):
+            self._cache.put(_cache_key(query, chunk_filter), k, result, generation)
+            for position in pending[query]:
+                results[position] = result
+        return results
+    
+    def _process_query_batch(self, items: List[Tuple[str, int]]) -> List[Tuple[List[str], List[float]]]:
+        """
+        Answer a micro-batch of (query, k) requests with one encode and one search.
+        
+        Runs on the worker thread. The batch is searched with the largest
+        requested k and each result is truncated to its own k.
+        """
+        queries = list(dict.fromkeys(query for query, _ in items))
+        searched = dict(zip(queries, self._encode_and_search(queries, max(k for _, k in items))))
+        return [
+            (searched[query][0][:k], searched[query][1][:k])
+            for query, k in items
+        ]
+    
+    def _encode_queries(self, queries: List[str]) -> np.ndarray:
+        """Encode query texts in one batch, reusing cached vectors of normalized texts."""
         try:
-            # Encode query
-            query_vector = self.embedding_model.encode_single(query)
+            if self._semantic_cache is not None:
+                return self._semantic_cache.encode(queries, self.embedding_model.encode)
+            return self.embedding_model.encode(queries)
         except Exception as e:
             raise RuntimeError(f"Failed to generate query embedding: {str(e)}")
+    
+    async def _filtered_search(
+        self,
+        queries: List[str],
+        database: BaseDatabase,
+        k: int,
+        chunk_filter: ChunkFilter
+    ) -> List[Tuple[List[str], List[float]]]:
+        """
+        Search only the chunks allowed by a filter, resolved in the database.
+        
+        Returns:
+            List of (relevant_chunks, distances) tuples, one per query
+        """
+        query_vectors = await self._run_blocking(self._encode_queries, queries)
+        if self._semantic_cache is None:
+            allowed_ids = await database.get_chunk_ids(chunk_filter)
+            result = await self.search_allowed(query_vectors, k, allowed_ids, database)
+            return _merge_results([result], len(queries), k)
+        
+        # Near-duplicates of earlier queries with the same filter need no search
+        scope = chunk_filter.cache_key()
+        generation = self._semantic_cache.generation
+        results, pending, checks = self._semantic_lookup(query_vectors, k, scope)
+        if pending:
+            allowed_ids = await database.get_chunk_ids(chunk_filter)
+            result = await self.search_allowed(query_vectors[pending], k, allowed_ids, database)
+            searched = _merge_results([result], len(pending), k)
+            self._semantic_store(query_vectors, k, scope, generation, results, pending, checks, searched)
+        return results
+    
+    def _semantic_lookup(
+        self,
+        query_vectors: np.ndarray,
+        k: int,
+        scope: Hashable
+    ) -> Tuple[List[Optional[Tuple[List[str], List[float]]]], List[int], Dict[int, Tuple[List[str], List[float]]]]:
+        """
+        Look up query vectors in the semantic cache.
+        
+        Returns:
+            Tuple of (results, pending, checks): the cached result per query or
+            None, the rows that must be searched, and the cached results of rows
+            searched anyway to verify them
+        """
+        results: List[Optional[Tuple[List[str], List[float]]]] = []
+        pending: List[int] = []
+        checks: Dict[int, Tuple[List[str], List[float]]] = {}
+        for row, vector in enumerate(query_vectors):
+            cached, verify = self._semantic_cache.lookup(vector, k, scope)
+            if cached is not None and verify:
+                checks[row] = cached
+                cached = None
+            results.append(cached)
+            if cached is None:
+                pending.append(row)
+        return results, pending, checks
+    
+    def _semantic_store(
+        self,
+        query_vectors: np.ndarray,
+        k: int,
+        scope: Hashable,
+        generation: int,
+        results: List[Optional[Tuple[List[str], List[float]]]],
+        pending: List[int],
+        checks: Dict[int, Tuple[List[str], List[float]]],
+        searched: List[Tuple[List[str], List[float]]]
+    ) -> None:
+        """Fill in searched results, cache them and verify sampled hits against them."""
+        for row, result in zip(pending, searched):
+            if row in checks:
+                self._semantic_cache.verify(checks[row], result)
+            self._semantic_cache.put(query_vectors[row], k, result, scope, generation)
+            results[row] = result
+    
+    async def search_allowed(
+        self,
+        query_vectors: np.ndarray,
+        k: int,
+        allowed_ids: np.ndarray,
+        database: BaseDatabase
+    ) -> Tuple[np.ndarray, np.ndarray, List[Optional[str]]]:
+        """
+        Search among allowed chunk IDs only.
+        
+        The allowed IDs are applied inside FAISS with an ID selector, so the
+        index still returns k hits however many chunks the filter excludes.
+        When the filter leaves at most settings.filter_brute_force_threshold
+        indexed chunks, their vectors are scored exhaustively instead, which is
+        exact and cheaper than traversing the index for a handful of matches.
+        
+        Args:
+            query_vectors: Query embeddings
+            k: Number of neighbours per query
+            allowed_ids: Chunk IDs the results may contain
+            database: Database holding the persisted embeddings
+        
+        Returns:
+            Tuple of (distances, chunk_ids, texts) as returned by submit_search
+        """
+        allowed_ids = np.array(
+            [chunk_id for chunk_id in np.asarray(allowed_ids).tolist() if chunk_id in self._indexed_ids],
+            dtype=np.int64
+        )
+        if not len(allowed_ids):
+            empty = np.empty((len(np.atleast_2d(query_vectors)), 0))
+            return empty.astype(np.float32), empty.astype(np.int64), []
+        
+        if len(allowed_ids) > settings.filter_brute_force_threshold:
+            return await self._run_blocking(self._search_with_texts, query_vectors, k, allowed_ids)
+        
+        vectors = None
+        if self.vector_store is None:
+            chunk_ids, vectors = await database.get_embeddings(self.embedding_model.embedding_name, allowed_ids.tolist())
+            allowed_ids = np.asarray(chunk_ids, dtype=np.int64)
+        return await self._run_blocking(self._brute_force_with_texts, query_vectors, k, allowed_ids, vectors)
+    
+    def _brute_force_with_texts(
+        self,
+        query_vectors: np.ndarray,
+        k: int,
+        chunk_ids: np.ndarray,
+        vectors: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray, List[Optional[str]]]:
+        """
+        Score queries exactly against the vectors of the given chunks, on the worker thread.
+        
+        Args:
+            query_vectors: Query embeddings
+            k: Number of neighbours per query
+            chunk_ids: Candidate chunk IDs
+            vectors: Their embeddings (defaults to the vectors in the vector store)
+        
+        Returns:
+            Tuple of (distances, chunk_ids, texts) as returned by submit_search
+        """
+        query_vectors = self._prepare_vectors(np.atleast_2d(query_vectors))
+        if vectors is None:
+            vectors, found = self.vector_store.get_many(chunk_ids)
+            chunk_ids, vectors = chunk_ids[found], vectors[found]
+        else:
+            vectors = self._prepare_vectors(vectors)
+        if not len(chunk_ids):
+            empty = np.empty((len(query_vectors), 0))
+            return empty.astype(np.float32), empty.astype(np.int64), []
+        
+        similarities = query_vectors @ vectors.T
+        if self.metric == "cosine":
+            distances = 1.0 - similarities
+        else:
+            distances = (
+                np.einsum("qd,qd->q", query_vectors, query_vectors)[:, None]
+                + np.einsum("cd,cd->c", vectors, vectors)[None, :]
+                - 2.0 * similarities
+            )
+            distances = np.maximum(distances, 0.0)
+        
+        k = min(k, len(chunk_ids))
+        top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        top = np.take_along_axis(top, np.argsort(np.take_along_axis(distances, top, axis=1), axis=1), axis=1)
+        indices = chunk_ids[top]
+        return (
+            np.take_along_axis(distances, top, axis=1).astype(np.float32),
+            indices,
+            self.text_store.get_many(indices.ravel().tolist()),
+        )
+    
+    def _encode_and_search(self, queries: List[str], k: int) -> List[Tuple[List[str], List[float]]]:
+        """
+        Encode queries in one batch and search them with one matrix search.
+        
+        Returns:
+            List of (relevant_chunks, distances) tuples, one per query
+        
+        Raises:
+            RuntimeError: If embedding generation or search fails
+        """
+        query_vectors = self._encode_queries(queries)
+        if self._semantic_cache is None:
+            distances, indices = self._search_vectors(query_vectors, k)
+            return [
+                self._collect_results(indices[row], distances[row])
+                for row in range(len(queries))
+            ]
+        
+        # Near-duplicates of earlier queries need no search
+        generation = self._semantic_cache.generation
+        results, pending, checks = self._semantic_lookup(query_vectors, k, None)
+        if pending:
+            distances, indices = self._search_vectors(query_vectors[pending], k)
+            searched = [self._collect_results(indices[row], distances[row]) for row in range(len(pending))]
+            self._semantic_store(query_vectors, k, None, generation, results, pending, checks, searched)
+        return results
+    
+    def _search_vectors(
+        self, query_vectors: np.ndarray, k: int, allowed_ids: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Search the index with a matrix of query vectors.
+        
+        Args:
+            query_vectors: Array of shape (num_queries, dimension)
+            k: Number of neighbours per query
+            allowed_ids: Restrict results to these chunk IDs with a FAISS ID selector
+        
+        Returns:
+            Tuple of (distances, chunk_ids) arrays of shape (num_queries, k);
+            missing neighbours have chunk ID -1
+        
+        Raises:
+            RuntimeError: If the search fails
+        """
+        query_vectors = self._prepare_vectors(np.atleast_2d(query_vectors))
+        if self.index.ntotal == 0:
+            empty = np.empty((len(query_vectors), 0))
+            return empty.astype(np.float32), empty.astype(np.int64)
         
         try:
-            # Search index
-            distances, indices = self.index.search(query_vector, k)
+            # Search index, over-fetching candidates when they are re-ranked
+            fetch_k = k * self.oversample if self.vector_store is not None else k
+            params = None
+            if allowed_ids is not None:
+                selector = faiss.IDSelectorBatch(allowed_ids)
+                params = self._search_parameters(selector)
+            elif self._tombstones:
+                params = self._search_parameters(self._get_tombstone_selector())
+            distances, indices = self.index.search(query_vectors, fetch_k, params=params)
         except Exception as e:
             raise RuntimeError(f"Failed to search FAISS index: {str(e)}")
+        if self.vector_store is not None:
+            distances, indices = self._rerank(query_vectors, distances, indices, k)
+        
+        if self.metric == "cosine":
+            # Report cosine distance so lower still means more relevant
+            distances = 1.0 - distances
+        return distances, indices
+    
+    def _get_tombstone_selector(self) -> "faiss.IDSelector":
+        """Get an ID selector excluding the tombstoned chunk IDs, built once per set of tombstones."""
+        if self._tombstone_selector is None:
+            tombstoned = faiss.IDSelectorBatch(np.array(sorted(self._tombstones), dtype=np.int64))
+            self._tombstone_selector = faiss.IDSelectorNot(tombstoned)
+            # IDSelectorNot does not own the selector it wraps
+            self._tombstone_selector.referenced_objects = [tombstoned]
+        return self._tombstone_selector
+    
+    def _search_parameters(self, selector: "faiss.IDSelector") -> "faiss.SearchParameters":
+        """Build per-query search parameters carrying an ID selector and the query-time settings."""
+        if _is_flat(self.index):
+            return faiss.SearchParameters(sel=selector)
+        if self.index_type in ("ivf_flat", "ivf_pq"):
+            return faiss.SearchParametersIVF(sel=selector, nprobe=self.nprobe)
+        if self.index_type == "hnsw":
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=self.ef_search)
+        return faiss.SearchParameters(sel=selector)
+    
+    def submit_search(
+        self, query_vectors: np.ndarray, k: int
+    ) -> "Future[Tuple[np.ndarray, np.ndarray, List[Optional[str]]]]":
+        """
+        Start a search for encoded queries on the worker thread, without blocking.
+        
+        For callers that search several retrievers at once from another
+        thread, such as ShardedRetriever; the search stays serialized with
+        this retriever's updates.
+        
+        Args:
+            query_vectors: Query embeddings
+            k: Number of neighbours per query
+        
+        Returns:
+            Future of (distances, chunk_ids, texts), with texts flattened row by
+            row and None for missing neighbours
+        """
+        return self._executor.submit(self._search_with_texts, query_vectors, k)
+    
+    def _search_with_texts(
+        self, query_vectors: np.ndarray, k: int, allowed_ids: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray, List[Optional[str]]]:
+        """
+        Search the index and look up the texts of the hits, on the worker thread.
         
-        # Get corresponding chunks and their distances
+        Returns:
+            Tuple of (distances, chunk_ids, texts), with texts flattened row by row
+            and None for missing neighbours
+        """
+        distances, indices = self._search_vectors(query_vectors, k, allowed_ids)
+        return distances, indices, self.text_store.get_many(indices.ravel().tolist())
+    
+    def _rerank(
+        self, query_vectors: np.ndarray, distances: np.ndarray, indices: np.ndarray, k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Re-score index candidates exactly against full-precision vectors and keep the top k.
+        
+        Args:
+            query_vectors: Prepared query vectors, shape (num_queries, dimension)
+            distances: Approximate index distances, shape (num_queries, num_candidates)
+            indices: Candidate chunk IDs with -1 padding, same shape
+            k: Number of results to keep per query
+        
+        Returns:
+            Tuple of (distances, chunk_ids) arrays of shape (num_queries, k), in the
+            same convention as the index (squared L2, or inner product in cosine mode)
+        """
+        num_queries, num_candidates = indices.shape
+        vectors, found = self.vector_store.get_many(indices.ravel())
+        vectors = vectors.reshape(num_queries, num_candidates, -1)
+        found = found.reshape(num_queries, num_candidates) & (indices >= 0)
+        
+        if self.metric == "cosine":
+            exact = np.einsum("qcd,qd->qc", vectors, query_vectors)
+        else:
+            difference = vectors - query_vectors[:, None, :]
+            exact = np.einsum("qcd,qcd->qc", difference, difference)
+        # Candidates without a stored vector keep their approximate score
+        exact = np.where(found, exact, distances).astype(np.float32)
+        
+        # Larger inner products and smaller L2 distances rank first
+        order_key = -exact if self.metric == "cosine" else exact
+        order_key = np.where(indices >= 0, order_key, np.inf)
+        k = min(k, num_candidates)
+        top = np.argsort(order_key, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(exact, top, axis=1), np.take_along_axis(indices, top, axis=1)
+        
+    def _collect_results(self, chunk_ids: np.ndarray, distances: np.ndarray) -> Tuple[List[str], List[float]]:
+        """Map one row of search results to (chunks, distances), skipping unknown IDs."""
+        # Get corresponding chunks and their distances; indices are chunk IDs
         relevant_chunks = []
         relevant_distances = []
-        for idx, dist in zip(indices[0], distances[0]):
-            if 0 <= idx < len(self.text_lookup):
-                relevant_chunks.append(self.text_lookup[idx])
+        texts = self.text_store.get_many(chunk_ids.tolist())
+        for text, dist in zip(texts, distances):
+            if text is not None:
+                relevant_chunks.append(text)
                 relevant_distances.append(dist)
-        
-        # Store result in cache
-        result = (relevant_chunks, relevant_distances)
-        self._cache[cache_key] = result
-        return result 
\ No newline at end of file
+        return relevant_chunks, relevant_distances
\ No newline at end of file
@@ -0,0 +1,205 @@
+"""
+Sentence segmentation backends for text chunking.
+"""
+from typing import Iterable, Iterator, List, Protocol
+import itertools
+import multiprocessing
+import os
+import re
+import threading
+
+class SentenceSplitter(Protocol):
+    """Protocol for sentence segmentation backends."""
+    def split(self, text: str) -> List[str]:
+        """Split a text into stripped sentences."""
+        ...
+    
+    def split_many(self, texts: Iterable[str], n_process: int = 1, batch_size: int = 64) -> Iterator[List[str]]:
+        """Split many texts, yielding the sentences of each text in input order."""
+        ...
+
+class SpacySentenceSplitter:
+    """
+    Sentence splitter backed by a spaCy pipeline with only the senter pipe enabled.
+    The pipeline is loaded on first use, and again in each process the
+    splitter is pickled to.
+    """
+    
+    def __init__(self, model: str = "en_core_web_sm"):
+        """
+        Initialize the splitter.
+        
+        Args:
+            model: spaCy model to use for sentence detection
+        """
+        self.model = model
+        self._nlp = None
+        self._lock = threading.Lock()
+    
+    def __getstate__(self):
+        return {"model": self.model}
+    
+    def __setstate__(self, state):
+        self.__init__(state["model"])
+    
+    @property
+    def nlp(self):
+        """Get the spaCy pipeline, loading it on first access."""
+        if self._nlp is None:
+            with self._lock:
+                if self._nlp is None:
+                    import spacy
+                    nlp = spacy.load(self.model, disable=["ner", "tagger", "parser", "attribute_ruler", "lemmatizer"])
+                    # Only enable sentence segmentation for better performance
+                    nlp.enable_pipe("senter")
+                    self._nlp = nlp
+        return self._nlp
+    
+    def split(self, text: str) -> List[str]:
+        """Split a text into stripped sentences."""
+        return [sent.text.strip() for sent in self.nlp(text).sents]
+    
+    def split_many(self, texts: Iterable[str], n_process: int = 1, batch_size: int = 64) -> Iterator[List[str]]:
+        """
+        Split many texts with nlp.pipe.
+        
+        Args:
+            texts: Iterable of input texts
+            n_process: Number of worker processes (-1 uses all CPU cores)
+            batch_size: Number of texts sent to a worker at a time
+        
+        Yields:
+            List of sentences for each input text, in input order
+        """
+        for doc in self.nlp.pipe(texts, n_process=n_process, batch_size=batch_size):
+            yield [sent.text.strip() for sent in doc.sents]
+
+# Lower-cased tokens that end with a period without ending a sentence
+ABBREVIATIONS = frozenset({
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "mt", "rev", "gen", "col", "lt", "sgt", "capt",
+    "vs", "etc", "e.g", "i.e", "cf", "al", "approx", "ca", "no", "nos", "vol", "fig", "figs", "p", "pp",
+    "inc", "ltd", "co", "corp", "dept", "est", "u.s", "u.k", "e.u", "a.m", "p.m",
+    "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+})
+
+# Candidate boundaries: terminal punctuation (plus closing quotes/brackets) before whitespace, or a newline
+_CANDIDATE = re.compile(r'[.!?]+["\'”’)\]]*(?=\s)|\n')
+_WORD_BEFORE = re.compile(r'(\S+?)[.!?]+["\'”’)\]]*$')
+_NEXT_CHAR = re.compile(r'\s*(\S)')
+_LAST_CHAR = re.compile(r'(\S)[ \t]*$')
+
+class RegexSentenceSplitter:
+    """
+    Fast, dependency-free sentence splitter based on regular expressions.
+    
+    A period, question mark or exclamation mark followed by whitespace ends a
+    sentence unless it closes a known abbreviation or a single-letter initial,
+    or the next word starts in lower case. A line break ends a sentence when
+    the next line starts with an upper-case letter or digit and the previous
+    line does not end mid-clause, which keeps headings separate while joining
+    hard-wrapped prose.
+    """
+    
+    def __init__(self, abbreviations: Iterable[str] = ABBREVIATIONS):
+        """
+        Initialize the splitter.
+        
+        Args:
+            abbreviations: Lower-cased abbreviations (without the final period)
+                that do not end a sentence
+        """
+        self.abbreviations = frozenset(abbreviations)
+    
+    def _is_boundary(self, text: str, match: "re.Match") -> bool:
+        """Decide whether a candidate match ends a sentence."""
+        following = _NEXT_CHAR.match(text, match.end())
+        if not following:
+            return False
+        next_char = following.group(1)
+        # Only look at a short window before the match to keep splitting linear
+        window = text[max(0, match.start() - 64):match.end()]
+        
+        if match.group() == "\n":
+            last = _LAST_CHAR.search(window, 0, len(window) - 1)
+            return bool(last) and last.group(1) not in ",;:-(" and (next_char.isupper() or next_char.isdigit())
+        
+        if next_char.islower():
+            return False
+        if match.group()[0] == ".":
+            word = _WORD_BEFORE.search(window)
+            if word:
+                token = word.group(1).lower().lstrip("(\"'“‘")
+                if token in self.abbreviations or (len(token) == 1 and token.isalpha()):
+                    return False
+        return True
+    
+    def split(self, text: str) -> List[str]:
+        """Split a text into stripped, non-empty sentences."""
+        sentences = []
+        start = 0
+        for match in _CANDIDATE.finditer(text):
+            if self._is_boundary(text, match):
+                end = match.start() if match.group() == "\n" else match.end()
+                sentence = text[start:end].strip()
+                if sentence:
+                    sentences.append(sentence)
+                start = match.end()
+        
+        sentence = text[start:].strip()
+        if sentence:
+            sentences.append(sentence)
+        return sentences
+    
+    def split_many(self, texts: Iterable[str], n_process: int = 1, batch_size: int = 64) -> Iterator[List[str]]:
+        """
+        Split many texts, optionally across worker processes.
+        
+        With several processes, at most two windows of n_process * batch_size
+        texts are read ahead of the consumer, so streaming input keeps
+        bounded memory.
+        
+        Args:
+            texts: Iterable of input texts
+            n_process: Number of worker processes (-1 uses all CPU cores)
+            batch_size: Number of texts sent to a worker at a time
+        
+        Yields:
+            List of sentences for each input text, in input order
+        """
+        if n_process == -1:
+            n_process = os.cpu_count() or 1
+        if n_process <= 1:
+            for text in texts:
+                yield self.split(text)
+            return
+        
+        # Pool.imap would read the whole input up front; submit bounded windows
+        # instead, keeping the next window in flight while one is yielded
+        texts = iter(texts)
+        window = n_process * batch_size
+        with multiprocessing.Pool(n_process) as pool:
+            pending = pool.map_async(self.split, list(itertools.islice(texts, window)), chunksize=batch_size)
+            while True:
+                batch = list(itertools.islice(texts, window))
+                following = pool.map_async(self.split, batch, chunksize=batch_size) if batch else None
+                yield from pending.get()
+                if following is None:
+                    return
+                pending = following
+
+def create_splitter(backend: str, model: str = "en_core_web_sm") -> SentenceSplitter:
+    """
+    Create a sentence splitter by backend name.
+    
+    Args:
+        backend: "spacy" or "regex"
+        model: spaCy model to use when backend is "spacy"
+    
+    Returns:
+        SentenceSplitter instance
+    """
+    if backend == "spacy":
+        return SpacySentenceSplitter(model)
+    if backend == "regex":
+        return RegexSentenceSplitter()
+    raise ValueError(f"Unknown sentence splitter backend {backend!r}; expected 'spacy' or 'regex'")
\ No newline at end of file
@@ -0,0 +1,316 @@
+"""
+Sharded FAISS retrieval with parallel scatter-gather search.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+import asyncio
+import functools
+from ..database.base import BaseDatabase, ChunkFilter
+from .batching import MicroBatcher
+from .cache import QueryCache
+from .embeddings import EmbeddingModel
+from .retrieval import FAISSRetriever, _cache_key, _merge_results
+from ..config import settings
+
+class _ShardView:
+    """
+    Database proxy that restricts chunk streaming and summaries to one shard.
+    
+    Everything else (embedding storage in particular) is passed through, so a
+    FAISSRetriever can maintain a shard exactly like a whole index.
+    """
+    
+    def __init__(self, database: BaseDatabase, shard_number: int, num_shards: int):
+        self._database = database
+        self.shard = (shard_number, num_shards)
+    
+    def iter_chunks(self, batch_size: int = 1000, after_id: Optional[int] = None) -> AsyncIterator[List[Tuple[int, str]]]:
+        return self._database.iter_chunks(batch_size=batch_size, after_id=after_id, shard=self.shard)
+    
+    async def get_chunk_summary(self, up_to_id: Optional[int] = None) -> Dict[str, int]:
+        return await self._database.get_chunk_summary(up_to_id=up_to_id, shard=self.shard)
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._database, name)
+
+class ShardedRetriever:
+    """
+    Retriever that partitions chunks into several independent FAISS indexes.
+    
+    Chunks are assigned to shards by a hash of their document ID. Every shard
+    is a FAISSRetriever with its own files (``<index_path>.shard<i>``) and
+    worker thread, so shards are built, updated and searched in parallel. A
+    query is encoded once, searched on all shards concurrently, and the
+    per-shard top-k lists are merged into the global top-k.
+    """
+    
+    def __init__(
+        self,
+        embedding_model: EmbeddingModel,
+        index_path: str,
+        num_shards: Optional[int] = None,
+        cache: Optional[QueryCache] = None,
+        **retriever_options: Any
+    ):
+        """
+        Initialize the sharded retriever.
+        
+        Args:
+            embedding_model: The embedding model to use
+            index_path: Base path for the shard indexes
+            num_shards: Number of shards (defaults to settings.faiss_num_shards)
+            cache: Query result cache (defaults to a QueryCache configured from settings)
+            **retriever_options: Index options passed to every shard's FAISSRetriever
+                (index_type, metric, compression, oversample, ...)
+        """
+        if not index_path:
+            raise ValueError("index_path must be provided for FAISS index storage")
+        self.num_shards = num_shards or settings.faiss_num_shards
+        if self.num_shards < 1:
+            raise ValueError("num_shards must be at least 1")
+        
+        self.embedding_model = embedding_model
+        self.index_path = index_path
+        self.shards = [
+            FAISSRetriever(embedding_model, f"{index_path}.shard{shard_number}", serve_queries=False, **retriever_options)
+            for shard_number in range(self.num_shards)
+        ]
+        self.metric = self.shards[0].metric
+        
+        self._cache = cache if cache is not None else QueryCache()
+        
+        # Encoding and merging run here; each shard searches on its own worker thread
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="faiss-sharded")
+        self._batcher = MicroBatcher(self._process_query_batch, self._executor)
+    
+    async def _run_blocking(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run a blocking call (model inference, merging) on the retriever's worker thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+    
+    def close(self) -> None:
+        """Stop the query batcher and shut down all worker threads."""
+        self._batcher.close()
+        self._executor.shutdown(wait=True)
+        for shard in self.shards:
+            shard.close()
+    
+    def _view(self, database: BaseDatabase, shard_number: int) -> _ShardView:
+        return _ShardView(database, shard_number, self.num_shards)
+    
+    async def update_index(self, database: BaseDatabase, after_id: Optional[int] = None):
+        """
+        Bring all shards in line with the database, updating them in parallel.
+        
+        Args:
+            database: Database to read chunks from
+            after_id: Only index chunks with a greater ID (see FAISSRetriever.update_index)
+        """
+        await asyncio.gather(*(
+            shard.update_index(self._view(database, shard_number), after_id=after_id)
+            for shard_number, shard in enumerate(self.shards)
+        ))
+        self._cache.clear()
+    
+    async def remove_chunks(self, database: BaseDatabase, chunk_ids: Iterable[int]) -> int:
+        """
+        Remove chunks by ID from whichever shards hold them (see FAISSRetriever.remove_chunks).
+        
+        Returns:
+            Number of chunks removed
+        """
+        chunk_ids = list(chunk_ids)
+        removed = await asyncio.gather(*(
+            shard.pop_chunks(self._view(database, shard_number), chunk_ids)
+            for shard_number, shard in enumerate(self.shards)
+        ))
+        removed_texts = [text for shard_texts in removed for text in shard_texts]
+        self._cache.invalidate_texts(removed_texts)
+        return len(removed_texts)
+    
+    async def rebuild_index(self, database: BaseDatabase):
+        """Rebuild all shards in parallel, reusing persisted embeddings."""
+        await asyncio.gather(*(
+            shard.rebuild_index(self._view(database, shard_number))
+            for shard_number, shard in enumerate(self.shards)
+        ))
+        self._cache.clear()
+    
+    async def rebuild_shard(self, database: BaseDatabase, shard_number: int):
+        """
+        Rebuild a single shard, leaving the others untouched.
+        
+        Args:
+            database: Database to read chunks from
+            shard_number: Index of the shard to rebuild
+        """
+        if not 0 <= shard_number < self.num_shards:
+            raise ValueError(f"Shard {shard_number} out of range for {self.num_shards} shards")
+        await self.shards[shard_number].rebuild_index(self._view(database, shard_number))
+        self._cache.clear()
+    
+    async def warm_start(self, database: BaseDatabase) -> List[str]:
+        """
+        Warm-start every shard in parallel (see FAISSRetriever.warm_start).
+        
+        Returns:
+            The outcome for each shard: "reused", "caught_up" or "rebuilt"
+        """
+        statuses = await asyncio.gather(*(
+            shard.warm_start(self._view(database, shard_number))
+            for shard_number, shard in enumerate(self.shards)
+        ))
+        if any(status != "reused" for status in statuses):
+            self._cache.clear()
+        return list(statuses)
+    
+    def cache_stats(self) -> Dict[str, object]:
+        """Get hit/miss/eviction statistics of the query result cache."""
+        return self._cache.stats()
+    
+    def memory_footprint(self) -> Dict[str, object]:
+        """Report the combined memory footprint of all shards (see FAISSRetriever.memory_footprint)."""
+        footprints = [shard.memory_footprint() for shard in self.shards]
+        num_vectors = sum(footprint["vectors"] for footprint in footprints)
+        index_bytes = sum(footprint["index_bytes"] for footprint in footprints)
+        float32_bytes = sum(footprint["float32_bytes"] for footprint in footprints)
+        return {
+            "vectors": num_vectors,
+            "index_bytes": index_bytes,
+            "bytes_per_vector": index_bytes / num_vectors if num_vectors else 0.0,
+            "float32_bytes": float32_bytes,
+            "compression_ratio": float32_bytes / index_bytes if index_bytes else 0.0,
+            "shards": footprints,
+        }
+    
+    async def get_relevant_texts(
+        self,
+        query: str,
+        database: BaseDatabase,
+        k: Optional[int] = None,
+        chunk_filter: Optional[ChunkFilter] = None
+    ) -> Tuple[List[str], List[float]]:
+        """
+        Get relevant texts for a query from all shards.
+        
+        Args:
+            query: The query text
+            database: Database instance (used to resolve chunk_filter)
+            k: Number of results to return (defaults to settings.top_k)
+            chunk_filter: Only return chunks of documents matching this filter
+        
+        Returns:
+            Tuple of (relevant_chunks, distances) across all shards
+        """
+        k = k or settings.top_k
+        
+        cache_key = _cache_key(query, chunk_filter)
+        cached = self._cache.get(cache_key, k)
+        if cached is not None:
+            return cached
+        generation = self._cache.generation
+        
+        if chunk_filter is None:
+            result = await self._batcher.submit((query, k))
+        else:
+            result = (await self._filtered_search([query], database, k, chunk_filter))[0]
+        self._cache.put(cache_key, k, result, generation)
+        return result
+    
+    async def get_relevant_texts_batch(
+        self,
+        queries: List[str],
+        database: BaseDatabase,
+        k: Optional[int] = None,
+        chunk_filter: Optional[ChunkFilter] = None
+    ) -> List[Tuple[List[str], List[float]]]:
+        """
+        Get relevant texts for several queries, searching every shard once for all of them.
+        
+        Args:
+            queries: The query texts
+            database: Database instance (used to resolve chunk_filter)
+            k: Number of results to return per query (defaults to settings.top_k)
+            chunk_filter: Only return chunks of documents matching this filter
+        
+        Returns:
+            List of (relevant_chunks, distances) tuples, one per query, in input order
+        """
+        k = k or settings.top_k
+        
+        results: Dict[str, Tuple[List[str], List[float]]] = {}
+        pending: List[str] = []
+        # Duplicates are looked up and searched once
+        seen: Set[str] = set()
+        for query in queries:
+            if query in seen:
+                continue
+            seen.add(query)
+            cached = self._cache.get(_cache_key(query, chunk_filter), k)
+            if cached is not None:
+                results[query] = cached
+            else:
+                pending.append(query)
+        
+        if pending:
+            generation = self._cache.generation
+            if chunk_filter is None:
+                searched = await self._run_blocking(self._encode_and_search, pending, k)
+            else:
+                searched = await self._filtered_search(pending, database, k, chunk_filter)
+            for query, result in zip(pending, searched):
+                self._cache.put(_cache_key(query, chunk_filter), k, result, generation)
+                results[query] = result
+        
+        return [results[query] for query in queries]
+    
+    def _process_query_batch(self, items: List[Tuple[str, int]]) -> List[Tuple[List[str], List[float]]]:
+        """Micro-batch handler: encode and search a batch of (query, k) items together, each distinct query once."""
+        queries = list(dict.fromkeys(query for query, _ in items))
+        searched = dict(zip(queries, self._encode_and_search(queries, max(k for _, k in items))))
+        return [
+            (searched[query][0][:k], searched[query][1][:k])
+            for query, k in items
+        ]
+    
+    async def _filtered_search(
+        self,
+        queries: List[str],
+        database: BaseDatabase,
+        k: int,
+        chunk_filter: ChunkFilter
+    ) -> List[Tuple[List[str], List[float]]]:
+        """
+        Resolve a filter once, then search the allowed chunks on all shards concurrently.
+        
+        Returns:
+            List of (relevant_chunks, distances) tuples, one per query
+        """
+        allowed_ids = await database.get_chunk_ids(chunk_filter)
+        query_vectors = await self._run_blocking(self._encode_queries, queries)
+        shard_results = await asyncio.gather(*(
+            shard.search_allowed(query_vectors, k, allowed_ids, database)
+            for shard in self.shards
+        ))
+        return _merge_results(list(shard_results), len(queries), k)
+    
+    def _encode_queries(self, queries: List[str]) -> np.ndarray:
+        """Encode query texts in one batch."""
+        try:
+            return self.embedding_model.encode(queries)
+        except Exception as e:
+            raise RuntimeError(f"Failed to generate query embeddings: {str(e)}")
+    
+    def _encode_and_search(self, queries: List[str], k: int) -> List[Tuple[List[str], List[float]]]:
+        """
+        Encode queries once, scatter the search to all shards and gather the global top-k.
+        
+        Each shard is searched on its own worker thread, which keeps searches
+        serialized with that shard's updates while the shards run concurrently.
+        """
+        query_vectors = self._encode_queries(queries)
+        
+        futures = [shard.submit_search(query_vectors, k) for shard in self.shards]
+        shard_results = [future.result() for future in futures]
+        return _merge_results(shard_results, len(queries), k)
\ No newline at end of file
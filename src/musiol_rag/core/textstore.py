@@ -0,0 +1,323 @@
+"""
+Compact, memory-mapped on-disk store for chunk texts.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import mmap
+import os
+import struct
+import threading
+import numpy as np
+
+_MAGIC = b"MRTXT001"
+_HEADER = struct.Struct("<8sQ")
+
+def _settle_staged(staged: Dict[int, Any], staged_removed: Set[int], written: Dict[int, Any], written_removed: Set[int]) -> None:
+    """
+    Drop staged changes that a flush has written, keeping those made during it.
+    
+    Args:
+        staged: Current staged entries, updated in place
+        staged_removed: Current staged removals, updated in place
+        written: Staged entries snapshotted by the flush
+        written_removed: Staged removals snapshotted by the flush
+    """
+    for chunk_id, value in written.items():
+        if staged.get(chunk_id) is value:
+            del staged[chunk_id]
+        elif chunk_id not in staged:
+            # Removed (or cleared) during the flush, but now in the file
+            staged_removed.add(chunk_id)
+    # The file no longer holds these; IDs re-added since are staged entries
+    staged_removed.difference_update(written_removed)
+
+class TextStore:
+    """
+    Chunk texts keyed by chunk ID, persisted as a single offsets + UTF-8 blob file.
+    
+    File layout: an 8-byte magic and the entry count ``n``, then ``n`` sorted
+    int64 chunk IDs, ``n + 1`` int64 byte offsets, and the concatenated UTF-8
+    texts. The file is memory-mapped read-only, so lookups decode only the
+    requested texts and several processes share one page-cache copy.
+    
+    Changes are staged in memory and written by flush(), which rewrites the
+    file to a temporary path and atomically replaces it; readers that still
+    map the previous file keep a consistent view.
+    
+    The store is thread-safe: a retriever flushes it on its worker thread
+    while the event loop keeps staging changes and reading texts. Changes
+    staged during a flush are kept for the next one.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Initialize the store, mapping the file at path if it exists.
+        
+        Args:
+            path: Path of the store file
+        """
+        self.path = path
+        # _lock guards the staged changes and the mapping; _flush_lock serializes
+        # rewrites, which run without _lock so reads and staging are not blocked
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[int, str] = {}
+        self._removed: Set[int] = set()
+        self._file = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._ids = np.empty(0, dtype=np.int64)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._blob_start = 0
+        self._stat = None
+        self.refresh()
+    
+    def refresh(self) -> bool:
+        """
+        Re-map the file if it was replaced since it was last opened.
+        
+        Returns:
+            True if the mapping changed
+        """
+        with self._flush_lock, self._lock:
+            return self._refresh()
+    
+    def _refresh(self) -> bool:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        if self._stat is not None and (stat.st_ino, stat.st_mtime_ns) == self._stat:
+            return False
+        
+        self._close_mapping()
+        self._file = open(self.path, "rb")
+        if stat.st_size == 0:
+            raise RuntimeError(f"Text store {self.path} is empty")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        magic, count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC:
+            raise RuntimeError(f"{self.path} is not a text store file")
+        ids_start = _HEADER.size
+        offsets_start = ids_start + 8 * count
+        self._ids = np.frombuffer(self._mmap, dtype="<i8", count=count, offset=ids_start)
+        self._offsets = np.frombuffer(self._mmap, dtype="<i8", count=count + 1, offset=offsets_start)
+        self._blob_start = offsets_start + 8 * (count + 1)
+        self._stat = (stat.st_ino, stat.st_mtime_ns)
+        return True
+    
+    def _close_mapping(self) -> None:
+        # numpy views must be dropped before the mmap can be closed
+        self._ids = np.empty(0, dtype=np.int64)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Still referenced elsewhere; it is released with the last view
+                pass
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def close(self) -> None:
+        """Release the file mapping. Unflushed changes are kept in memory."""
+        with self._flush_lock, self._lock:
+            self._close_mapping()
+            self._stat = None
+    
+    def _positions(self, chunk_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Find positions of chunk IDs in the mapped table and whether they are present."""
+        positions = np.searchsorted(self._ids, chunk_ids)
+        found = positions < len(self._ids)
+        found[found] = self._ids[positions[found]] == chunk_ids[found]
+        return positions, found
+    
+    def _read(self, position: int) -> str:
+        start = self._blob_start + int(self._offsets[position])
+        end = self._blob_start + int(self._offsets[position + 1])
+        return self._mmap[start:end].decode("utf-8")
+    
+    def get(self, chunk_id: int, default: Optional[str] = None) -> Optional[str]:
+        """
+        Get the text of a chunk.
+        
+        Args:
+            chunk_id: ID of the chunk
+            default: Value returned when the chunk is unknown
+        
+        Returns:
+            The chunk text, or default
+        """
+        text = self.get_many([chunk_id])[0]
+        return default if text is None else text
+    
+    def get_many(self, chunk_ids: Iterable[int]) -> List[Optional[str]]:
+        """
+        Get the texts of several chunks.
+        
+        Args:
+            chunk_ids: IDs of the chunks
+        
+        Returns:
+            List of texts in input order, with None for unknown IDs
+        """
+        chunk_ids = np.asarray(list(chunk_ids), dtype=np.int64)
+        with self._lock:
+            positions, found = self._positions(chunk_ids)
+        
+            texts: List[Optional[str]] = []
+            for chunk_id, position, present in zip(chunk_ids.tolist(), positions.tolist(), found.tolist()):
+                if chunk_id in self._pending:
+                    texts.append(self._pending[chunk_id])
+                elif present and chunk_id not in self._removed:
+                    texts.append(self._read(position))
+                else:
+                    texts.append(None)
+            return texts
+    
+    def contains_many(self, chunk_ids: Iterable[int]) -> np.ndarray:
+        """
+        Check which chunk IDs have a stored text.
+        
+        Args:
+            chunk_ids: IDs of the chunks
+        
+        Returns:
+            Boolean array, one entry per ID
+        """
+        chunk_ids = np.asarray(list(chunk_ids), dtype=np.int64)
+        with self._lock:
+            _, found = self._positions(chunk_ids)
+            if self._removed:
+                found &= ~np.isin(chunk_ids, np.fromiter(self._removed, dtype=np.int64))
+            if self._pending:
+                found |= np.isin(chunk_ids, np.fromiter(self._pending, dtype=np.int64))
+            return found
+    
+    def __contains__(self, chunk_id: int) -> bool:
+        return bool(self.contains_many([chunk_id])[0])
+    
+    def __len__(self) -> int:
+        with self._lock:
+            staged = np.fromiter(set(self._pending) | self._removed, dtype=np.int64)
+            _, mapped = self._positions(staged)
+            return len(self._ids) - int(mapped.sum()) + len(self._pending)
+    
+    def add(self, chunks: Iterable[Tuple[int, str]]) -> None:
+        """
+        Stage chunk texts for the next flush.
+        
+        Args:
+            chunks: (chunk_id, chunk_text) tuples
+        """
+        chunks = [(int(chunk_id), text) for chunk_id, text in chunks]
+        with self._lock:
+            for chunk_id, text in chunks:
+                self._pending[chunk_id] = text
+                self._removed.discard(chunk_id)
+    
+    def remove(self, chunk_ids: Iterable[int]) -> None:
+        """
+        Stage removal of chunk texts for the next flush.
+        
+        Args:
+            chunk_ids: IDs of the chunks to remove
+        """
+        chunk_ids = [int(chunk_id) for chunk_id in chunk_ids]
+        with self._lock:
+            for chunk_id in chunk_ids:
+                self._pending.pop(chunk_id, None)
+                self._removed.add(chunk_id)
+    
+    def clear(self) -> None:
+        """Stage removal of every text."""
+        with self._lock:
+            self._pending.clear()
+            self._removed = set(self._ids.tolist())
+    
+    @property
+    def dirty(self) -> bool:
+        """Whether there are staged changes that flush() would write."""
+        with self._lock:
+            return bool(self._pending or self._removed)
+    
+    def flush(self) -> None:
+        """
+        Write staged changes by rewriting the store file atomically.
+        
+        The staged changes are snapshotted and the file is rewritten without
+        blocking readers; changes staged meanwhile stay staged.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self.dirty and os.path.exists(self.path):
+                    return
+                pending = dict(self._pending)
+                removed = set(self._removed)
+            
+            tmp_path = self._write(pending, removed)
+            
+            with self._lock:
+                os.replace(tmp_path, self.path)
+                _settle_staged(self._pending, self._removed, pending, removed)
+                self._stat = None
+                self._refresh()
+    
+    def _write(self, pending: Dict[int, str], removed: Set[int]) -> str:
+        """
+        Write the mapped entries merged with a snapshot of staged changes to a temporary file.
+        
+        Only flush() replaces the mapping, under _flush_lock, so it can be
+        read here without _lock.
+        
+        Returns:
+            Path of the temporary file
+        """
+        # Surviving mapped entries, then staged entries, merged in ID order
+        drop = set(pending) | removed
+        keep = ~np.isin(self._ids, np.fromiter(drop, dtype=np.int64)) if drop else np.ones(len(self._ids), dtype=bool)
+        kept_positions = np.nonzero(keep)[0]
+        kept_lengths = self._offsets[kept_positions + 1] - self._offsets[kept_positions]
+        
+        new_ids = np.array(sorted(pending), dtype=np.int64)
+        new_texts = [pending[chunk_id].encode("utf-8") for chunk_id in new_ids.tolist()]
+        new_lengths = np.array([len(text) for text in new_texts], dtype=np.int64)
+        
+        all_ids = np.concatenate([self._ids[kept_positions], new_ids])
+        order = np.argsort(all_ids, kind="stable")
+        lengths = np.concatenate([kept_lengths, new_lengths])[order]
+        offsets = np.zeros(len(order) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, len(order)))
+            f.write(all_ids[order].astype("<i8").tobytes())
+            f.write(offsets.astype("<i8").tobytes())
+            
+            # Copy mapped texts in contiguous runs rather than one slice per chunk
+            run_start = run_end = None
+            num_kept = len(kept_positions)
+            for item in order.tolist():
+                if item < num_kept:
+                    position = int(kept_positions[item])
+                    start = self._blob_start + int(self._offsets[position])
+                    end = self._blob_start + int(self._offsets[position + 1])
+                    if run_end == start:
+                        run_end = end
+                        continue
+                    if run_start is not None:
+                        f.write(self._mmap[run_start:run_end])
+                    run_start, run_end = start, end
+                else:
+                    if run_start is not None:
+                        f.write(self._mmap[run_start:run_end])
+                        run_start = run_end = None
+                    f.write(new_texts[item - num_kept])
+            if run_start is not None:
+                f.write(self._mmap[run_start:run_end])
+            f.flush()
+            os.fsync(f.fileno())
+        return tmp_path
+        
\ No newline at end of file
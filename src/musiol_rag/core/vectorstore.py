@@ -0,0 +1,273 @@
+"""
+Memory-mapped on-disk store for full-precision chunk vectors.
+"""
+from typing import Dict, Iterable, Optional, Set, Tuple
+import mmap
+import os
+import struct
+import threading
+import numpy as np
+from .textstore import _settle_staged
+
+_MAGIC = b"MRVEC001"
+_HEADER = struct.Struct("<8sQQ")
+
+# Rows copied per write when rewriting the store
+_FLUSH_BLOCK_ROWS = 65536
+
+class VectorStore:
+    """
+    float32 vectors keyed by chunk ID, persisted as one memory-mapped matrix.
+    
+    File layout: an 8-byte magic, the row count ``n`` and the dimension ``d``,
+    then ``n`` sorted int64 chunk IDs and the ``n x d`` float32 matrix in the
+    same order. Lookups copy only the requested rows, so the vectors stay off
+    the Python heap and are shared through the page cache.
+    
+    Like TextStore, changes are staged in memory and written by flush(),
+    which rewrites the file to a temporary path and atomically replaces it,
+    and the store is thread-safe.
+    """
+    
+    def __init__(self, path: str, dimension: int):
+        """
+        Initialize the store, mapping the file at path if it exists.
+        
+        Args:
+            path: Path of the store file
+            dimension: Vector dimension; a file with another dimension is discarded
+        """
+        self.path = path
+        self.dimension = dimension
+        # _lock guards the staged changes and the mapping; _flush_lock serializes
+        # rewrites, which run without _lock so reads and staging are not blocked
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[int, np.ndarray] = {}
+        self._removed: Set[int] = set()
+        self._file = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._ids = np.empty(0, dtype=np.int64)
+        self._matrix = np.empty((0, dimension), dtype=np.float32)
+        self._stat = None
+        self.refresh()
+    
+    def refresh(self) -> bool:
+        """
+        Re-map the file if it was replaced since it was last opened.
+        
+        Returns:
+            True if the mapping changed
+        """
+        with self._flush_lock, self._lock:
+            return self._refresh()
+    
+    def _refresh(self) -> bool:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        if self._stat is not None and (stat.st_ino, stat.st_mtime_ns) == self._stat:
+            return False
+        
+        self._close_mapping()
+        self._file = open(self.path, "rb")
+        if stat.st_size == 0:
+            raise RuntimeError(f"Vector store {self.path} is empty")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        magic, count, dimension = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC:
+            raise RuntimeError(f"{self.path} is not a vector store file")
+        self._stat = (stat.st_ino, stat.st_mtime_ns)
+        if dimension != self.dimension:
+            # Vectors of another model; stage their removal so the next flush drops them
+            self._ids = np.frombuffer(self._mmap, dtype="<i8", count=count, offset=_HEADER.size)
+            self._matrix = np.empty((0, self.dimension), dtype=np.float32)
+            self._removed = set(self._ids.tolist())
+            return True
+        
+        ids_start = _HEADER.size
+        matrix_start = ids_start + 8 * count
+        self._ids = np.frombuffer(self._mmap, dtype="<i8", count=count, offset=ids_start)
+        self._matrix = np.frombuffer(
+            self._mmap, dtype="<f4", count=count * dimension, offset=matrix_start
+        ).reshape(count, dimension)
+        return True
+    
+    def _close_mapping(self) -> None:
+        # numpy views must be dropped before the mmap can be closed
+        self._ids = np.empty(0, dtype=np.int64)
+        self._matrix = np.empty((0, self.dimension), dtype=np.float32)
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Still referenced elsewhere; it is released with the last view
+                pass
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def close(self) -> None:
+        """Release the file mapping. Unflushed changes are kept in memory."""
+        with self._flush_lock, self._lock:
+            self._close_mapping()
+            self._stat = None
+    
+    def _positions(self, chunk_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Find positions of chunk IDs in the mapped matrix and whether they are present."""
+        positions = np.searchsorted(self._ids, chunk_ids)
+        found = positions < len(self._matrix)
+        found[found] = self._ids[positions[found]] == chunk_ids[found]
+        return positions, found
+    
+    def get_many(self, chunk_ids: Iterable[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the vectors of several chunks.
+        
+        Args:
+            chunk_ids: IDs of the chunks
+        
+        Returns:
+            Tuple of (vectors, found): a float32 array with one row per ID (zeros
+            for unknown IDs) and a boolean array marking the IDs that were found
+        """
+        if not isinstance(chunk_ids, np.ndarray):
+            chunk_ids = list(chunk_ids)
+        chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+        with self._lock:
+            positions, found = self._positions(chunk_ids)
+            if self._removed:
+                found &= ~np.isin(chunk_ids, np.fromiter(self._removed, dtype=np.int64))
+        
+            vectors = np.zeros((len(chunk_ids), self.dimension), dtype=np.float32)
+            vectors[found] = self._matrix[positions[found]]
+            if self._pending:
+                for row, chunk_id in enumerate(chunk_ids.tolist()):
+                    vector = self._pending.get(chunk_id)
+                    if vector is not None:
+                        vectors[row] = vector
+                        found[row] = True
+            return vectors, found
+    
+    def contains_many(self, chunk_ids: Iterable[int]) -> np.ndarray:
+        """
+        Check which chunk IDs have a stored vector.
+        
+        Args:
+            chunk_ids: IDs of the chunks
+        
+        Returns:
+            Boolean array, one entry per ID
+        """
+        chunk_ids = np.asarray(list(chunk_ids), dtype=np.int64)
+        with self._lock:
+            _, found = self._positions(chunk_ids)
+            if self._removed:
+                found &= ~np.isin(chunk_ids, np.fromiter(self._removed, dtype=np.int64))
+            if self._pending:
+                found |= np.isin(chunk_ids, np.fromiter(self._pending, dtype=np.int64))
+            return found
+    
+    def __len__(self) -> int:
+        with self._lock:
+            staged = np.fromiter(set(self._pending) | self._removed, dtype=np.int64)
+            _, mapped = self._positions(staged)
+            return len(self._matrix) - int(mapped.sum()) + len(self._pending)
+    
+    def add(self, chunk_ids: Iterable[int], vectors: np.ndarray) -> None:
+        """
+        Stage vectors for the next flush.
+        
+        Args:
+            chunk_ids: IDs of the chunks
+            vectors: Array of shape (len(chunk_ids), dimension)
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            for chunk_id, vector in zip(chunk_ids, vectors):
+                chunk_id = int(chunk_id)
+                self._pending[chunk_id] = vector
+                self._removed.discard(chunk_id)
+    
+    def remove(self, chunk_ids: Iterable[int]) -> None:
+        """
+        Stage removal of vectors for the next flush.
+        
+        Args:
+            chunk_ids: IDs of the chunks to remove
+        """
+        chunk_ids = [int(chunk_id) for chunk_id in chunk_ids]
+        with self._lock:
+            for chunk_id in chunk_ids:
+                self._pending.pop(chunk_id, None)
+                self._removed.add(chunk_id)
+    
+    def clear(self) -> None:
+        """Stage removal of every vector."""
+        with self._lock:
+            self._pending.clear()
+            self._removed = set(self._ids.tolist())
+    
+    @property
+    def dirty(self) -> bool:
+        """Whether there are staged changes that flush() would write."""
+        with self._lock:
+            return bool(self._pending or self._removed)
+    
+    def flush(self) -> None:
+        """
+        Write staged changes by rewriting the store file atomically.
+        
+        As in TextStore.flush, the file is rewritten from a snapshot of the
+        staged changes without blocking readers.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self.dirty and os.path.exists(self.path):
+                    return
+                pending = dict(self._pending)
+                removed = set(self._removed)
+            
+            tmp_path = self._write(pending, removed)
+            
+            with self._lock:
+                os.replace(tmp_path, self.path)
+                _settle_staged(self._pending, self._removed, pending, removed)
+                self._stat = None
+                self._refresh()
+    
+    def _write(self, pending: Dict[int, np.ndarray], removed: Set[int]) -> str:
+        """Write the mapped rows merged with a snapshot of staged changes to a temporary file."""
+        # Surviving mapped rows, then staged rows, merged in ID order
+        drop = set(pending) | removed
+        num_mapped = len(self._matrix)
+        keep = ~np.isin(self._ids[:num_mapped], np.fromiter(drop, dtype=np.int64)) if drop else np.ones(num_mapped, dtype=bool)
+        kept_positions = np.nonzero(keep)[0]
+        
+        new_ids = np.array(sorted(pending), dtype=np.int64)
+        new_matrix = np.array([pending[chunk_id] for chunk_id in new_ids.tolist()], dtype=np.float32)
+        new_matrix = new_matrix.reshape(len(new_ids), self.dimension)
+        
+        all_ids = np.concatenate([self._ids[kept_positions], new_ids])
+        order = np.argsort(all_ids, kind="stable")
+        num_kept = len(kept_positions)
+        
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, len(order), self.dimension))
+            f.write(all_ids[order].astype("<i8").tobytes())
+            
+            # Copy rows in blocks so peak memory stays bounded for large stores
+            for start in range(0, len(order), _FLUSH_BLOCK_ROWS):
+                items = order[start:start + _FLUSH_BLOCK_ROWS]
+                from_mapped = items < num_kept
+                rows = np.empty((len(items), self.dimension), dtype="<f4")
+                rows[from_mapped] = self._matrix[kept_positions[items[from_mapped]]]
+                rows[~from_mapped] = new_matrix[items[~from_mapped] - num_kept]
+                f.write(rows.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        return tmp_path
\ No newline at end of file
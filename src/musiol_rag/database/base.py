@@ -2,7 +2,86 @@
 Base database interface for RAG system.
 """
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from datetime import datetime
+from typing import Iterable, List, Dict, Any, Optional, Tuple
+import hashlib
+import json
+
+def chunk_checksum(chunks: Iterable[Tuple[int, str]]) -> int:
+    """
+    Order-independent checksum of (chunk_id, chunk_text) pairs.
+    
+    Each chunk contributes the first 60 bits of md5("<id>:<text>") and the
+    contributions are summed, so the checksum can be updated incrementally
+    as chunks are added or removed and computed by an aggregate in SQL.
+    
+    Args:
+        chunks: (chunk_id, chunk_text) tuples
+    
+    Returns:
+        The checksum
+    """
+    return sum(
+        int(hashlib.md5(f"{chunk_id}:{text}".encode("utf-8")).hexdigest()[:15], 16)
+        for chunk_id, text in chunks
+    )
+
+def content_hash(text: str) -> str:
+    """
+    Hex SHA-256 of a text's UTF-8 bytes, used to detect identical documents and chunks.
+    
+    Matches encode(sha256(convert_to(text, 'UTF8')), 'hex') in PostgreSQL.
+    
+    Args:
+        text: The text to hash
+    
+    Returns:
+        64-character hex digest
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class ChunkFilter:
+    """
+    Restricts retrieval to the chunks of matching documents.
+    
+    Conditions that are left unset do not filter; the others must all hold.
+    """
+    
+    def __init__(
+        self,
+        document_ids: Optional[Iterable[int]] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Initialize the filter.
+        
+        Args:
+            document_ids: Only chunks of these documents
+            created_after: Only documents created at or after this time
+            created_before: Only documents created before this time
+            metadata: Only documents whose metadata contains these key/value pairs
+        """
+        self.document_ids = frozenset(int(document_id) for document_id in document_ids) if document_ids is not None else None
+        self.created_after = created_after
+        self.created_before = created_before
+        self.metadata = metadata
+    
+    def cache_key(self) -> Tuple:
+        """Get a hashable key identifying the filter, for caching query results."""
+        return (
+            tuple(sorted(self.document_ids)) if self.document_ids is not None else None,
+            self.created_after.isoformat() if self.created_after is not None else None,
+            self.created_before.isoformat() if self.created_before is not None else None,
+            json.dumps(self.metadata, sort_keys=True) if self.metadata is not None else None,
+        )
+    
+    def __repr__(self) -> str:
+        return (
+            f"ChunkFilter(document_ids={self.document_ids!r}, created_after={self.created_after!r}, "
+            f"created_before={self.created_before!r}, metadata={self.metadata!r})"
+        )
 
 class BaseDatabase(ABC):
     """
@@ -20,6 +99,60 @@ class BaseDatabase(ABC):
         """
         pass
         
+    @abstractmethod
+    async def add_texts_bulk(self, documents: List[Tuple[str, Optional[List[str]]]]) -> List[int]:
+        """
+        Add many documents, each with optional chunks, in one operation.
+        
+        Args:
+            documents: List of (text, chunks) or (text, chunks, metadata) tuples;
+                chunks and metadata may be None
+            
+        Returns:
+            The IDs of the inserted documents, in input order
+        """
+        pass
+        
+    @abstractmethod
+    async def delete_document(self, document_id: int) -> List[int]:
+        """
+        Delete a document together with its chunks and their embeddings.
+        
+        Args:
+            document_id: ID of the document to delete
+        
+        Returns:
+            The IDs of the deleted chunks
+        
+        Raises:
+            ValueError: If the document does not exist
+        """
+        pass
+    
+    @abstractmethod
+    async def upsert_document(
+        self,
+        document_id: int,
+        text: str,
+        chunks: Optional[List[str]] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Tuple[List[int], List[int]]:
+        """
+        Insert a document under a given ID, or replace its text and chunks.
+        
+        Previous chunks whose text is unchanged keep their IDs.
+        
+        Args:
+            document_id: ID of the document
+            text: The full document text
+            chunks: The document's chunks, replacing any previous chunks
+            metadata: New metadata (defaults to keeping the existing metadata)
+        
+        Returns:
+            Tuple of (removed_chunk_ids, added_chunk_ids)
+        """
+        pass
+    
     @abstractmethod
     async def get_texts(self) -> List[str]:
         """
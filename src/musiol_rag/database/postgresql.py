@@ -1,13 +1,23 @@
 """
 PostgreSQL database implementation for RAG system.
 """
-from typing import List, Dict, Any, Optional, Tuple
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 import asyncpg
-from .base import BaseDatabase
+import json
+import numpy as np
+from .base import BaseDatabase, ChunkFilter, content_hash
 
 class PostgreSQLDatabase(BaseDatabase):
     def __init__(self, pool: asyncpg.Pool):
         self.pool = pool
+        
+        # Ingest counters, see ingest_stats()
+        self.documents_added = 0
+        self.documents_skipped = 0
+        self.chunks_added = 0
+        self.chunks_deduplicated = 0
+        self.embeddings_stored = 0
+        self.embeddings_shared = 0
     
     @classmethod
     async def from_connection_string(cls, connection_string: str) -> 'PostgreSQLDatabase':
@@ -25,6 +35,36 @@ class PostgreSQLDatabase(BaseDatabase):
                 )
             ''')
             
+            # Arbitrary document metadata for filtered retrieval; added to existing tables too
+            await conn.execute(
+                "ALTER TABLE documents ADD COLUMN IF NOT EXISTS metadata JSONB NOT NULL DEFAULT '{}'::jsonb"
+            )
+            await conn.execute(
+                'CREATE INDEX IF NOT EXISTS documents_metadata_idx ON documents USING GIN (metadata jsonb_path_ops)'
+            )
+            await conn.execute(
+                'CREATE INDEX IF NOT EXISTS documents_created_at_idx ON documents (created_at)'
+            )
+            
+            # Content hash for skipping identical documents. Existing rows are hashed
+            # once; later copies of a document keep a NULL hash so the index can be unique.
+            await conn.execute('ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash TEXT')
+            await conn.execute('''
+                UPDATE documents d SET content_hash = hashed.content_hash
+                FROM (
+                    SELECT id, content_hash, row_number() OVER (PARTITION BY content_hash ORDER BY id) AS copy
+                    FROM (
+                        SELECT id, encode(sha256(convert_to(text, 'UTF8')), 'hex') AS content_hash
+                        FROM documents WHERE content_hash IS NULL
+                    ) unhashed
+                ) hashed
+                WHERE d.id = hashed.id AND hashed.copy = 1
+                AND NOT EXISTS (SELECT 1 FROM documents other WHERE other.content_hash = hashed.content_hash)
+            ''')
+            await conn.execute(
+                'CREATE UNIQUE INDEX IF NOT EXISTS documents_content_hash_idx ON documents (content_hash)'
+            )
+            
             # Create chunks table with reference to source document
             await conn.execute('''
                 CREATE TABLE IF NOT EXISTS chunks (
@@ -36,38 +76,409 @@ class PostgreSQLDatabase(BaseDatabase):
                     UNIQUE(document_id, chunk_index)
                 )
             ''')
+            
+            # Chunk content hash, the key under which embeddings are stored
+            await conn.execute('ALTER TABLE chunks ADD COLUMN IF NOT EXISTS content_hash TEXT')
+            await conn.execute('''
+                UPDATE chunks SET content_hash = encode(sha256(convert_to(chunk_text, 'UTF8')), 'hex')
+                WHERE content_hash IS NULL
+            ''')
+            await conn.execute(
+                'CREATE INDEX IF NOT EXISTS chunks_content_hash_idx ON chunks (content_hash)'
+            )
+            
+            # Create embeddings table holding packed float32 vectors per chunk content and
+            # model, so chunks with identical text share one vector
+            await conn.execute('''
+                CREATE TABLE IF NOT EXISTS content_embeddings (
+                    content_hash TEXT NOT NULL,
+                    model_name TEXT NOT NULL,
+                    dimension INTEGER NOT NULL,
+                    embedding BYTEA NOT NULL,
+                    PRIMARY KEY (content_hash, model_name)
+                )
+            ''')
+            
+            # Move vectors from the former per-chunk embeddings table
+            if await conn.fetchval("SELECT to_regclass('chunk_embeddings') IS NOT NULL"):
+                async with conn.transaction():
+                    await conn.execute('''
+                        INSERT INTO content_embeddings (content_hash, model_name, dimension, embedding)
+                        SELECT DISTINCT ON (c.content_hash, e.model_name)
+                            c.content_hash, e.model_name, e.dimension, e.embedding
+                        FROM chunk_embeddings e JOIN chunks c ON c.id = e.chunk_id
+                        ORDER BY c.content_hash, e.model_name, e.chunk_id
+                        ON CONFLICT DO NOTHING
+                    ''')
+                    await conn.execute('DROP TABLE chunk_embeddings')
         
         return cls(pool)
     
-    async def add_text(self, text: str, chunks: List[str] = None) -> int:
+    async def add_text(self, text: str, chunks: List[str] = None, metadata: Optional[Dict[str, Any]] = None) -> int:
         """
         Add a document and optionally its chunks to the database.
         
+        A document identical to one already stored is skipped.
+        
         Args:
             text: The full document text
             chunks: Optional list of text chunks
+            metadata: Optional JSON-serializable metadata to filter retrieval by
             
         Returns:
-            document_id: The ID of the inserted document
+            document_id: The ID of the inserted document, or of the existing identical document
         """
+        document_hash = content_hash(text)
         async with self.pool.acquire() as conn:
             async with conn.transaction():
-                # Insert the full document
+                # Insert the full document unless its content is already stored
                 document_id = await conn.fetchval(
-                    'INSERT INTO documents (text) VALUES ($1) RETURNING id',
-                    text
+                    '''
+                    INSERT INTO documents (text, metadata, content_hash) VALUES ($1, $2::jsonb, $3)
+                    ON CONFLICT (content_hash) DO NOTHING
+                    RETURNING id
+                    ''',
+                    text, json.dumps(metadata or {}), document_hash
                 )
+                if document_id is None:
+                    self.documents_skipped += 1
+                    return await conn.fetchval(
+                        'SELECT id FROM documents WHERE content_hash = $1', document_hash
+                    )
+                self.documents_added += 1
                 
-                # If chunks are provided, insert them
+                # If chunks are provided, insert them in one COPY
                 if chunks:
-                    for i, chunk in enumerate(chunks):
-                        await conn.execute(
-                            'INSERT INTO chunks (document_id, chunk_text, chunk_index) VALUES ($1, $2, $3)',
-                            document_id, chunk, i
-                        )
+                    await self._copy_chunks(
+                        conn, [(document_id, chunk, i) for i, chunk in enumerate(chunks)]
+                    )
                 
                 return document_id
     
+    async def _copy_chunks(
+        self, conn: asyncpg.Connection, records: List[Tuple[int, str, int]]
+    ) -> List[Tuple[int, str]]:
+        """
+        COPY (document_id, chunk_text, chunk_index) records into chunks with their content hashes.
+        
+        Chunk IDs are reserved from the sequence so they can be returned
+        despite COPY. Chunks whose text is already stored, or repeated within
+        records, are counted as deduplicated, and those whose text already has
+        a stored embedding as shared.
+        
+        Returns:
+            (chunk_id, chunk_text) tuples of the inserted chunks, in record order
+        """
+        hashes = [content_hash(chunk) for _, chunk, _ in records]
+        rows = await conn.fetch(
+            'SELECT DISTINCT content_hash FROM chunks WHERE content_hash = ANY($1::text[])',
+            list(set(hashes))
+        )
+        seen = {row['content_hash'] for row in rows}
+        for chunk_hash in hashes:
+            if chunk_hash in seen:
+                self.chunks_deduplicated += 1
+            seen.add(chunk_hash)
+        await self._count_shared_embeddings(conn, hashes)
+        
+        ids = await conn.fetch(
+            "SELECT nextval(pg_get_serial_sequence('chunks', 'id')) AS id FROM generate_series(1, $1)",
+            len(records)
+        )
+        chunk_ids = [row['id'] for row in ids]
+        await conn.copy_records_to_table(
+            'chunks',
+            records=[
+                (chunk_id,) + record + (chunk_hash,)
+                for chunk_id, record, chunk_hash in zip(chunk_ids, records, hashes)
+            ],
+            columns=['id', 'document_id', 'chunk_text', 'chunk_index', 'content_hash']
+        )
+        self.chunks_added += len(records)
+        return [(chunk_id, record[1]) for chunk_id, record in zip(chunk_ids, records)]
+    
+    async def _count_shared_embeddings(self, conn: asyncpg.Connection, hashes: List[str]) -> None:
+        """Count new chunks whose content hash already has a stored embedding, which they share."""
+        rows = await conn.fetch(
+            'SELECT DISTINCT content_hash FROM content_embeddings WHERE content_hash = ANY($1::text[])',
+            list(set(hashes))
+        )
+        embedded = {row['content_hash'] for row in rows}
+        self.embeddings_shared += sum(chunk_hash in embedded for chunk_hash in hashes)
+    
+    async def add_texts_bulk(
+        self,
+        documents: List[Tuple[str, Optional[List[str]]]],
+        batch_size: int = 1000
+    ) -> List[int]:
+        """
+        Add many documents and their chunks in a single transaction.
+        
+        Document IDs are reserved from the sequence up front so documents can
+        be written with one multi-row INSERT and chunks with COPY, costing a
+        few round trips per batch instead of one per row. Documents identical
+        to a stored document or to an earlier one in the input are skipped,
+        chunks included, also when a concurrent transaction stores them first.
+        
+        Args:
+            documents: List of (text, chunks) or (text, chunks, metadata) tuples;
+                chunks and metadata may be None
+            batch_size: Number of documents written per batch
+        
+        Returns:
+            document_ids: The IDs of the inserted documents, in input order; a
+                skipped document gets the ID of the identical stored document
+        """
+        document_ids, _ = await self.add_texts_bulk_with_chunks(documents, batch_size=batch_size)
+        return document_ids
+    
+    async def add_texts_bulk_with_chunks(
+        self,
+        documents: List[Tuple[str, Optional[List[str]]]],
+        batch_size: int = 1000
+    ) -> Tuple[List[int], List[Tuple[int, str]]]:
+        """
+        Add many documents like add_texts_bulk, also returning the inserted chunks.
+        
+        Lets a caller embed and index new chunks directly instead of reading
+        them back from the database.
+        
+        Args:
+            documents: List of (text, chunks) or (text, chunks, metadata) tuples;
+                chunks and metadata may be None
+            batch_size: Number of documents written per batch
+        
+        Returns:
+            Tuple of (document_ids, chunks): the document IDs as returned by
+            add_texts_bulk and (chunk_id, chunk_text) tuples of the chunks that
+            were inserted (none for skipped duplicate documents)
+        """
+        document_ids = []
+        inserted_chunks = []
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                for start in range(0, len(documents), batch_size):
+                    batch = documents[start:start + batch_size]
+                    hashes = [content_hash(document[0]) for document in batch]
+                    
+                    # Map hashes of already stored documents to their IDs
+                    rows = await conn.fetch(
+                        'SELECT content_hash, id FROM documents WHERE content_hash = ANY($1::text[])',
+                        list(set(hashes))
+                    )
+                    known = {row['content_hash']: row['id'] for row in rows}
+                    new_rows = []
+                    for row, document_hash in enumerate(hashes):
+                        if document_hash in known:
+                            continue
+                        known[document_hash] = None
+                        new_rows.append(row)
+                    self.documents_skipped += len(batch) - len(new_rows)
+                    
+                    ids = await conn.fetch(
+                        "SELECT nextval(pg_get_serial_sequence('documents', 'id')) AS id FROM generate_series(1, $1)",
+                        len(new_rows)
+                    )
+                    new_ids = [row['id'] for row in ids]
+                    for row, document_id in zip(new_rows, new_ids):
+                        known[hashes[row]] = document_id
+                    
+                    if new_rows:
+                        inserted = await conn.fetch(
+                            '''
+                            INSERT INTO documents (id, text, metadata, content_hash)
+                            SELECT * FROM unnest($1::int[], $2::text[], $3::jsonb[], $4::text[])
+                            ON CONFLICT (content_hash) DO NOTHING
+                            RETURNING id
+                            ''',
+                            new_ids,
+                            [batch[row][0] for row in new_rows],
+                            [
+                                json.dumps((batch[row][2] if len(batch[row]) > 2 else None) or {})
+                                for row in new_rows
+                            ],
+                            [hashes[row] for row in new_rows]
+                        )
+                        
+                        # A concurrent transaction stored some of these first; use its IDs
+                        inserted_ids = {row['id'] for row in inserted}
+                        lost = [hashes[row] for row, document_id in zip(new_rows, new_ids) if document_id not in inserted_ids]
+                        if lost:
+                            rows = await conn.fetch(
+                                'SELECT content_hash, id FROM documents WHERE content_hash = ANY($1::text[])',
+                                lost
+                            )
+                            known.update((row['content_hash'], row['id']) for row in rows)
+                            stored = [
+                                (row, document_id) for row, document_id in zip(new_rows, new_ids)
+                                if document_id in inserted_ids
+                            ]
+                            new_rows = [row for row, _ in stored]
+                            new_ids = [document_id for _, document_id in stored]
+                        self.documents_added += len(new_rows)
+                        self.documents_skipped += len(lost)
+                    
+                    chunk_records = [
+                        (document_id, chunk, i)
+                        for row, document_id in zip(new_rows, new_ids)
+                        for i, chunk in enumerate(batch[row][1] or [])
+                    ]
+                    if chunk_records:
+                        inserted_chunks.extend(await self._copy_chunks(conn, chunk_records))
+                
+                    document_ids.extend(known[document_hash] for document_hash in hashes)
+        
+        return document_ids, inserted_chunks
+    
+    async def delete_document(self, document_id: int) -> List[int]:
+        """
+        Delete a document; its chunks and embeddings are removed by CASCADE.
+        
+        Args:
+            document_id: ID of the document to delete
+        
+        Returns:
+            The IDs of the deleted chunks, for removal from the index
+        
+        Raises:
+            ValueError: If the document does not exist
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                rows = await conn.fetch(
+                    'DELETE FROM chunks WHERE document_id = $1 RETURNING id, content_hash',
+                    document_id
+                )
+                deleted = await conn.fetchval(
+                    'DELETE FROM documents WHERE id = $1 RETURNING id',
+                    document_id
+                )
+                if deleted is None:
+                    raise ValueError(f"Document ID {document_id} not found")
+                await self._delete_unused_embeddings(conn, [row['content_hash'] for row in rows])
+                return sorted(row['id'] for row in rows)
+    
+    @staticmethod
+    async def _delete_unused_embeddings(conn: asyncpg.Connection, content_hashes: List[str]) -> None:
+        """Delete stored vectors of the given chunk contents that no chunk uses any more."""
+        if content_hashes:
+            await conn.execute(
+                '''
+                DELETE FROM content_embeddings e
+                WHERE e.content_hash = ANY($1::text[])
+                AND NOT EXISTS (SELECT 1 FROM chunks c WHERE c.content_hash = e.content_hash)
+                ''',
+                list(set(content_hashes))
+            )
+    
+    async def upsert_document(
+        self,
+        document_id: int,
+        text: str,
+        chunks: Optional[List[str]] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Tuple[List[int], List[int]]:
+        """
+        Insert a document under a given ID, or replace its text and chunks.
+        
+        Previous chunks whose text reappears in chunks keep their row and ID
+        (renumbered to their new position); the other previous chunks are
+        deleted and the remaining new chunks get fresh IDs. Callers can then
+        remove and add exactly those IDs in the index instead of rebuilding
+        it. Use TextChunker.rechunk to produce chunks that keep the
+        boundaries of unchanged regions.
+        
+        Args:
+            document_id: ID of the document
+            text: The full document text
+            chunks: The document's chunks, replacing any previous chunks
+            metadata: New metadata (defaults to keeping the existing metadata)
+        
+        Returns:
+            Tuple of (removed_chunk_ids, added_chunk_ids)
+        """
+        metadata_json = json.dumps(metadata) if metadata is not None else None
+        document_hash = content_hash(text)
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                duplicate_id = await conn.fetchval(
+                    'SELECT id FROM documents WHERE content_hash = $1 AND id <> $2',
+                    document_hash, document_id
+                )
+                if duplicate_id is not None:
+                    raise ValueError(f"Document {document_id} would duplicate document {duplicate_id}")
+                
+                inserted = await conn.fetchval('''
+                    INSERT INTO documents (id, text, metadata, content_hash)
+                    VALUES ($1, $2, COALESCE($3::jsonb, '{}'::jsonb), $4)
+                    ON CONFLICT (id) DO UPDATE
+                    SET text = EXCLUDED.text, metadata = COALESCE($3::jsonb, documents.metadata),
+                        content_hash = EXCLUDED.content_hash
+                    RETURNING xmax = 0
+                ''', document_id, text, metadata_json, document_hash)
+                if inserted:
+                    # Keep the ID sequence ahead of explicitly chosen IDs
+                    await conn.execute('''
+                        SELECT setval(
+                            pg_get_serial_sequence('documents', 'id'),
+                            GREATEST($1, COALESCE(pg_sequence_last_value(pg_get_serial_sequence('documents', 'id')::regclass), 1))
+                        )
+                    ''', document_id)
+                
+                # Match previous chunks to new positions by text, in document order
+                previous = await conn.fetch(
+                    'SELECT id, chunk_text FROM chunks WHERE document_id = $1 ORDER BY chunk_index',
+                    document_id
+                )
+                available: Dict[str, List[int]] = {}
+                for row in reversed(previous):
+                    available.setdefault(row['chunk_text'], []).append(row['id'])
+                kept_ids, kept_indexes, new_texts, new_indexes = [], [], [], []
+                for chunk_index, chunk in enumerate(chunks or []):
+                    if available.get(chunk):
+                        kept_ids.append(available[chunk].pop())
+                        kept_indexes.append(chunk_index)
+                    else:
+                        new_texts.append(chunk)
+                        new_indexes.append(chunk_index)
+                
+                removed = await conn.fetch(
+                    '''
+                    DELETE FROM chunks WHERE document_id = $1 AND NOT (id = ANY($2::int[]))
+                    RETURNING id, content_hash
+                    ''',
+                    document_id, kept_ids
+                )
+                if kept_ids:
+                    # Move kept chunks out of the way first; (document_id, chunk_index) is unique
+                    await conn.execute(
+                        'UPDATE chunks SET chunk_index = -1 - chunk_index WHERE document_id = $1',
+                        document_id
+                    )
+                    await conn.execute(
+                        '''
+                        UPDATE chunks c SET chunk_index = t.chunk_index
+                        FROM unnest($1::int[], $2::int[]) AS t(id, chunk_index)
+                        WHERE c.id = t.id
+                        ''',
+                        kept_ids, kept_indexes
+                    )
+                added = []
+                if new_texts:
+                    await self._count_shared_embeddings(conn, [content_hash(chunk) for chunk in new_texts])
+                    added = await conn.fetch('''
+                        INSERT INTO chunks (document_id, chunk_text, chunk_index, content_hash)
+                        SELECT $1, chunk_text, chunk_index, encode(sha256(convert_to(chunk_text, 'UTF8')), 'hex')
+                        FROM unnest($2::text[], $3::int[]) AS t(chunk_text, chunk_index)
+                        RETURNING id
+                    ''', document_id, new_texts, new_indexes)
+                    self.chunks_added += len(added)
+                
+                # After inserting, so vectors of unchanged chunk texts are kept for reuse
+                await self._delete_unused_embeddings(conn, [row['content_hash'] for row in removed])
+                
+                return sorted(row['id'] for row in removed), sorted(row['id'] for row in added)
+    
     async def get_texts(self) -> List[str]:
         """Get all full document texts."""
         async with self.pool.acquire() as conn:
@@ -80,6 +491,225 @@ class PostgreSQLDatabase(BaseDatabase):
             rows = await conn.fetch('SELECT chunk_text FROM chunks ORDER BY document_id, chunk_index')
             return [row['chunk_text'] for row in rows]
     
+    async def get_chunks_with_ids(self) -> List[Tuple[int, str]]:
+        """
+        Get all chunks together with their primary keys.
+        
+        Returns:
+            List of (chunk_id, chunk_text) tuples ordered by chunk ID
+        """
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch('SELECT id, chunk_text FROM chunks ORDER BY id')
+            return [(row['id'], row['chunk_text']) for row in rows]
+    
+    @staticmethod
+    def _shard_filter(shard: Optional[Tuple[int, int]], first_param: int) -> Tuple[str, list]:
+        """
+        Build a SQL condition selecting the chunks of one shard.
+        
+        Chunks are partitioned by a hash of their document ID, so all chunks
+        of a document land in the same shard.
+        
+        Args:
+            shard: (shard_number, num_shards), or None for all chunks
+            first_param: Number of the first query parameter the condition may use
+        
+        Returns:
+            Tuple of (condition, parameters); the condition is "TRUE" without a shard
+        """
+        if shard is None:
+            return "TRUE", []
+        shard_number, num_shards = shard
+        if not 0 <= shard_number < num_shards:
+            raise ValueError(f"Shard {shard_number} out of range for {num_shards} shards")
+        condition = f"(hashint4(document_id) & 2147483647) % ${first_param + 1} = ${first_param}"
+        return condition, [shard_number, num_shards]
+    
+    async def iter_chunks(
+        self,
+        batch_size: int = 1000,
+        after_id: Optional[int] = None,
+        shard: Optional[Tuple[int, int]] = None
+    ) -> AsyncIterator[List[Tuple[int, str]]]:
+        """
+        Stream all chunks in batches through a server-side cursor.
+        
+        Only one batch is held in memory at a time, so callers can process
+        arbitrarily large corpora with bounded memory.
+        
+        Args:
+            batch_size: Number of chunks fetched per round trip
+            after_id: Only stream chunks with an ID greater than this
+            shard: Only stream the chunks of shard (shard_number, num_shards)
+        
+        Yields:
+            Lists of (chunk_id, chunk_text) tuples, ordered by chunk ID
+        """
+        async with self.pool.acquire() as conn:
+            # Cursors only live inside a transaction
+            async with conn.transaction():
+                condition, shard_args = self._shard_filter(shard, 2)
+                cursor = await conn.cursor(
+                    f'SELECT id, chunk_text FROM chunks WHERE id > $1 AND {condition} ORDER BY id',
+                    after_id if after_id is not None else 0, *shard_args
+                )
+                while True:
+                    rows = await cursor.fetch(batch_size)
+                    if not rows:
+                        break
+                    yield [(row['id'], row['chunk_text']) for row in rows]
+    
+    async def get_chunk_summary(
+        self,
+        up_to_id: Optional[int] = None,
+        shard: Optional[Tuple[int, int]] = None
+    ) -> Dict[str, int]:
+        """
+        Summarize the chunks table in a single scan, to validate a saved index.
+        
+        The checksum is the same as chunk_checksum() computes over
+        (chunk_id, chunk_text) pairs. The prefix fields cover only chunks with
+        an ID up to up_to_id, so a caller can tell whether chunks were merely
+        appended since it last looked.
+        
+        Args:
+            up_to_id: Upper bound (inclusive) of the chunk IDs in the prefix
+                (defaults to all chunks)
+            shard: Only summarize the chunks of shard (shard_number, num_shards)
+        
+        Returns:
+            Dictionary with chunk_count, max_chunk_id, checksum, prefix_count
+            and prefix_checksum
+        """
+        condition, shard_args = self._shard_filter(shard, 2)
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(
+                f'''
+                SELECT COUNT(*) AS chunk_count,
+                       COALESCE(MAX(id), 0) AS max_chunk_id,
+                       COALESCE(SUM(hash), 0) AS checksum,
+                       COUNT(*) FILTER (WHERE id <= $1::bigint) AS prefix_count,
+                       COALESCE(SUM(hash) FILTER (WHERE id <= $1::bigint), 0) AS prefix_checksum
+                FROM (
+                    SELECT id, ('x' || substr(md5(id::text || ':' || chunk_text), 1, 15))::bit(60)::bigint AS hash
+                    FROM chunks
+                    WHERE {condition}
+                ) AS hashed
+                ''',
+                up_to_id if up_to_id is not None else 2**63 - 1, *shard_args
+            )
+        return {key: int(value) for key, value in row.items()}
+    
+    async def get_chunk_ids(self, chunk_filter: ChunkFilter) -> np.ndarray:
+        """
+        Resolve a filter to the IDs of the chunks it allows.
+        
+        Args:
+            chunk_filter: Conditions on the chunks' documents
+        
+        Returns:
+            Sorted int64 array of chunk IDs
+        """
+        conditions = []
+        args: List[Any] = []
+        if chunk_filter.document_ids is not None:
+            args.append(sorted(chunk_filter.document_ids))
+            conditions.append(f'c.document_id = ANY(${len(args)}::int[])')
+        if chunk_filter.created_after is not None:
+            args.append(chunk_filter.created_after)
+            conditions.append(f'd.created_at >= ${len(args)}')
+        if chunk_filter.created_before is not None:
+            args.append(chunk_filter.created_before)
+            conditions.append(f'd.created_at < ${len(args)}')
+        if chunk_filter.metadata:
+            args.append(json.dumps(chunk_filter.metadata))
+            conditions.append(f'd.metadata @> ${len(args)}::jsonb')
+        
+        where = ' AND '.join(conditions) or 'TRUE'
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                f'SELECT c.id FROM chunks c JOIN documents d ON d.id = c.document_id WHERE {where} ORDER BY c.id',
+                *args
+            )
+        return np.array([row['id'] for row in rows], dtype=np.int64)
+    
+    async def add_embeddings(self, model_name: str, chunk_ids: List[int], embeddings: np.ndarray) -> None:
+        """
+        Store chunk embeddings for a model, replacing any existing vectors.
+        
+        Vectors are stored per chunk content, so they also serve every other
+        chunk with identical text.
+        
+        Args:
+            model_name: Name of the embedding model that produced the vectors
+            chunk_ids: IDs of the chunks, one per embedding row
+            embeddings: Array of shape (len(chunk_ids), dimension)
+        """
+        embeddings = np.asarray(embeddings, dtype='<f4')
+        if len(chunk_ids) != len(embeddings):
+            raise ValueError("chunk_ids and embeddings must have the same length")
+        if not chunk_ids:
+            return
+        
+        dimension = embeddings.shape[1]
+        records = [
+            (int(chunk_id), model_name, dimension, vector.tobytes())
+            for chunk_id, vector in zip(chunk_ids, embeddings)
+        ]
+        async with self.pool.acquire() as conn:
+            self.embeddings_stored += len(records)
+            await conn.executemany(
+                '''
+                INSERT INTO content_embeddings (content_hash, model_name, dimension, embedding)
+                SELECT content_hash, $2, $3, $4 FROM chunks WHERE id = $1
+                ON CONFLICT (content_hash, model_name)
+                DO UPDATE SET dimension = EXCLUDED.dimension, embedding = EXCLUDED.embedding
+                ''',
+                records
+            )
+    
+    async def get_embeddings(
+        self,
+        model_name: str,
+        chunk_ids: Optional[List[int]] = None
+    ) -> Tuple[List[int], np.ndarray]:
+        """
+        Get stored chunk embeddings for a model.
+        
+        Chunks with identical content share one stored vector, so repeated
+        chunks are encoded only once.
+        
+        Args:
+            model_name: Name of the embedding model
+            chunk_ids: Optional chunk IDs to restrict the lookup to (defaults to all chunks)
+        
+        Returns:
+            Tuple of (chunk_ids, embeddings) for the chunks that have a stored vector,
+            ordered by chunk ID, with embeddings as a float32 array
+        """
+        query = '''
+            SELECT c.id AS chunk_id, c.content_hash, e.dimension, e.embedding
+            FROM chunks c
+            JOIN content_embeddings e ON e.content_hash = c.content_hash AND e.model_name = $1
+            {where}
+            ORDER BY c.id
+        '''
+        async with self.pool.acquire() as conn:
+            if chunk_ids is None:
+                rows = await conn.fetch(query.format(where=''), model_name)
+            else:
+                rows = await conn.fetch(
+                    query.format(where='WHERE c.id = ANY($2::int[])'),
+                    model_name, [int(chunk_id) for chunk_id in chunk_ids]
+                )
+        
+        if not rows:
+            return [], np.empty((0, 0), dtype=np.float32)
+        
+        dimension = rows[0]['dimension']
+        embeddings = np.frombuffer(b''.join(row['embedding'] for row in rows), dtype='<f4')
+        return [row['chunk_id'] for row in rows], embeddings.reshape(len(rows), dimension).astype(np.float32)
+    
     async def get_document_with_chunks(self, document_id: int) -> Tuple[str, List[str]]:
         """
         Get a document and its chunks.
@@ -108,7 +738,26 @@ class PostgreSQLDatabase(BaseDatabase):
         """Clear all documents and chunks."""
         async with self.pool.acquire() as conn:
             # Chunks will be automatically deleted due to CASCADE
-            await conn.execute('TRUNCATE documents CASCADE')
+            await conn.execute('TRUNCATE documents, content_embeddings CASCADE')
+    
+    def ingest_stats(self) -> Dict[str, int]:
+        """
+        Get counters of the work saved by content-hash deduplication.
+        
+        Returns:
+            Dictionary with documents added and skipped as duplicates, chunks
+            added and how many of them repeat stored content, embeddings stored,
+            and chunks added whose content already had a stored embedding, so
+            they were not re-encoded
+        """
+        return {
+            "documents_added": self.documents_added,
+            "documents_skipped": self.documents_skipped,
+            "chunks_added": self.chunks_added,
+            "chunks_deduplicated": self.chunks_deduplicated,
+            "embeddings_stored": self.embeddings_stored,
+            "embeddings_shared": self.embeddings_shared,
+        }
     
     async def get_metadata(self) -> Dict[str, Any]:
         async with self.pool.acquire() as conn:
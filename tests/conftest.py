@@ -0,0 +1,234 @@
+"""
+Shared fixtures: a deterministic stub embedding model and an in-memory database.
+"""
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import hashlib
+import os
+import sys
+
+os.environ.setdefault("DATABASE_URL", "postgresql://test@localhost/test")
+os.environ.setdefault("SEMANTIC_CACHE_ENABLED", "false")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import numpy as np
+import pytest
+
+from musiol_rag.database.base import BaseDatabase, ChunkFilter, chunk_checksum
+
+DIMENSION = 16
+
+class StubEmbeddingModel:
+    """
+    Embedding model returning a fixed pseudo-random unit vector per text.
+    
+    A query equal to a chunk's text is encoded to the chunk's vector, so it
+    is that chunk's exact nearest neighbour.
+    """
+    
+    def __init__(self, model_name: str = "stub-model"):
+        self.model_name = model_name
+        self.embedding_name = model_name
+        self.dimension = DIMENSION
+        self.texts_encoded = 0
+    
+    @staticmethod
+    def vector(text: str) -> np.ndarray:
+        seed = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+        vector = np.random.default_rng(seed).standard_normal(DIMENSION).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+    
+    def encode(self, texts: List[str]) -> np.ndarray:
+        self.texts_encoded += len(texts)
+        if not texts:
+            return np.empty((0, DIMENSION), dtype=np.float32)
+        return np.stack([self.vector(text) for text in texts])
+    
+    def encode_single(self, text: str) -> np.ndarray:
+        return self.encode([text])[0]
+    
+    def stats(self) -> Dict[str, object]:
+        return {"texts_encoded": self.texts_encoded}
+
+class InMemoryDatabase(BaseDatabase):
+    """
+    Dict-backed database implementing what FAISSRetriever and RAGWrapper use.
+    
+    Chunk IDs come from one increasing counter like the PostgreSQL sequence,
+    and a document's shard is its ID modulo the number of shards.
+    """
+    
+    def __init__(self):
+        self.documents: Dict[int, Dict[str, Any]] = {}
+        self.chunks: Dict[int, Tuple[int, str]] = {}
+        self.embeddings: Dict[Tuple[str, str], np.ndarray] = {}
+        self._next_document_id = 1
+        self._next_chunk_id = 1
+    
+    def _add_chunks(self, document_id: int, chunks: List[str]) -> List[int]:
+        chunk_ids = []
+        for chunk in chunks:
+            self.chunks[self._next_chunk_id] = (document_id, chunk)
+            chunk_ids.append(self._next_chunk_id)
+            self._next_chunk_id += 1
+        return chunk_ids
+    
+    def _insert_document(self, document_id: int, text: str, metadata: Optional[dict]) -> None:
+        self.documents[document_id] = {
+            "text": text,
+            "metadata": metadata or {},
+            "created_at": datetime.now(timezone.utc),
+        }
+        self._next_document_id = max(self._next_document_id, document_id + 1)
+    
+    async def add_text(self, text: str, metadata: Optional[dict] = None) -> None:
+        await self.add_texts_bulk([(text, None, metadata)])
+    
+    async def add_texts_bulk(self, documents: List[Tuple]) -> List[int]:
+        document_ids, _ = await self.add_texts_bulk_with_chunks(documents)
+        return document_ids
+    
+    async def add_texts_bulk_with_chunks(self, documents: List[Tuple]) -> Tuple[List[int], List[Tuple[int, str]]]:
+        document_ids = []
+        inserted_chunks = []
+        for text, chunks, *rest in documents:
+            document_id = self._next_document_id
+            self._insert_document(document_id, text, rest[0] if rest else None)
+            chunks = chunks if chunks is not None else [text]
+            inserted_chunks.extend(zip(self._add_chunks(document_id, chunks), chunks))
+            document_ids.append(document_id)
+        return document_ids, inserted_chunks
+    
+    async def delete_document(self, document_id: int) -> List[int]:
+        if document_id not in self.documents:
+            raise ValueError(f"Document {document_id} does not exist")
+        del self.documents[document_id]
+        removed = sorted(chunk_id for chunk_id, (owner, _) in self.chunks.items() if owner == document_id)
+        for chunk_id in removed:
+            del self.chunks[chunk_id]
+        return removed
+    
+    async def upsert_document(
+        self,
+        document_id: int,
+        text: str,
+        chunks: Optional[List[str]] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Tuple[List[int], List[int]]:
+        previous = self.documents.get(document_id)
+        self._insert_document(document_id, text, metadata if metadata is not None else (previous or {}).get("metadata"))
+        
+        # Previous chunks with a text that reappears keep their ID, as in PostgreSQL
+        available: Dict[str, List[int]] = {}
+        for chunk_id, (owner, chunk) in sorted(self.chunks.items(), reverse=True):
+            if owner == document_id:
+                available.setdefault(chunk, []).append(chunk_id)
+        new_chunks = []
+        for chunk in chunks or []:
+            if available.get(chunk):
+                available[chunk].pop()
+            else:
+                new_chunks.append(chunk)
+        
+        removed = sorted(chunk_id for chunk_ids in available.values() for chunk_id in chunk_ids)
+        for chunk_id in removed:
+            del self.chunks[chunk_id]
+        return removed, self._add_chunks(document_id, new_chunks)
+    
+    async def get_texts(self) -> List[str]:
+        return [document["text"] for _, document in sorted(self.documents.items())]
+    
+    async def clear(self) -> None:
+        self.__init__()
+    
+    @classmethod
+    async def from_connection_string(cls, connection_string: str) -> "InMemoryDatabase":
+        return cls()
+    
+    async def get_metadata(self) -> Dict[str, Any]:
+        return {"documents": len(self.documents), "chunks": len(self.chunks)}
+    
+    async def get_text_by_id(self, text_id: int) -> Optional[str]:
+        document = self.documents.get(text_id)
+        return document["text"] if document is not None else None
+    
+    def _select(self, after_id: Optional[int] = None, shard: Optional[Tuple[int, int]] = None) -> List[Tuple[int, str]]:
+        return [
+            (chunk_id, chunk)
+            for chunk_id, (document_id, chunk) in sorted(self.chunks.items())
+            if (after_id is None or chunk_id > after_id)
+            and (shard is None or document_id % shard[1] == shard[0])
+        ]
+    
+    async def iter_chunks(
+        self,
+        batch_size: int = 1000,
+        after_id: Optional[int] = None,
+        shard: Optional[Tuple[int, int]] = None
+    ) -> AsyncIterator[List[Tuple[int, str]]]:
+        chunks = self._select(after_id, shard)
+        for start in range(0, len(chunks), batch_size):
+            yield chunks[start:start + batch_size]
+    
+    async def get_chunk_summary(
+        self,
+        up_to_id: Optional[int] = None,
+        shard: Optional[Tuple[int, int]] = None
+    ) -> Dict[str, int]:
+        chunks = self._select(shard=shard)
+        prefix = [chunk for chunk in chunks if up_to_id is None or chunk[0] <= up_to_id]
+        return {
+            "chunk_count": len(chunks),
+            "max_chunk_id": max((chunk_id for chunk_id, _ in chunks), default=0),
+            "checksum": chunk_checksum(chunks),
+            "prefix_count": len(prefix),
+            "prefix_checksum": chunk_checksum(prefix),
+        }
+    
+    async def get_chunk_ids(self, chunk_filter: ChunkFilter) -> np.ndarray:
+        chunk_ids = []
+        for chunk_id, (document_id, _) in sorted(self.chunks.items()):
+            document = self.documents[document_id]
+            if chunk_filter.document_ids is not None and document_id not in chunk_filter.document_ids:
+                continue
+            if chunk_filter.created_after is not None and document["created_at"] < chunk_filter.created_after:
+                continue
+            if chunk_filter.created_before is not None and document["created_at"] >= chunk_filter.created_before:
+                continue
+            if chunk_filter.metadata and any(
+                document["metadata"].get(key) != value for key, value in chunk_filter.metadata.items()
+            ):
+                continue
+            chunk_ids.append(chunk_id)
+        return np.array(chunk_ids, dtype=np.int64)
+    
+    async def add_embeddings(self, model_name: str, chunk_ids: List[int], embeddings: np.ndarray) -> None:
+        for chunk_id, vector in zip(chunk_ids, embeddings):
+            self.embeddings[(self.chunks[int(chunk_id)][1], model_name)] = np.asarray(vector, dtype=np.float32)
+    
+    async def get_embeddings(
+        self,
+        model_name: str,
+        chunk_ids: Optional[List[int]] = None
+    ) -> Tuple[List[int], np.ndarray]:
+        wanted = set(int(chunk_id) for chunk_id in chunk_ids) if chunk_ids is not None else None
+        found = [
+            (chunk_id, self.embeddings[(chunk, model_name)])
+            for chunk_id, (_, chunk) in sorted(self.chunks.items())
+            if (wanted is None or chunk_id in wanted) and (chunk, model_name) in self.embeddings
+        ]
+        if not found:
+            return [], np.empty((0, 0), dtype=np.float32)
+        return [chunk_id for chunk_id, _ in found], np.stack([vector for _, vector in found])
+
+@pytest.fixture
+def embedding_model() -> StubEmbeddingModel:
+    return StubEmbeddingModel()
+
+@pytest.fixture
+def database() -> InMemoryDatabase:
+    return InMemoryDatabase()
+
+@pytest.fixture
+def index_path(tmp_path) -> str:
+    return str(tmp_path / "index.faiss")
\ No newline at end of file
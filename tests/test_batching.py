@@ -0,0 +1,98 @@
+"""
+Tests for MicroBatcher request coalescing and shutdown.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+
+import pytest
+
+from musiol_rag.core.batching import MicroBatcher
+
+class BlockingDoubler:
+    """Doubles items; the first batch blocks until released, so later requests queue up."""
+    
+    def __init__(self):
+        self.batches = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+    
+    def __call__(self, items):
+        self.batches.append(list(items))
+        self.started.set()
+        self.release.wait(5)
+        return [item * 2 for item in items]
+
+def test_requests_arriving_during_a_batch_share_the_next_batch():
+    async def run():
+        process = BlockingDoubler()
+        executor = ThreadPoolExecutor(max_workers=1)
+        batcher = MicroBatcher(process, executor, max_batch_size=10, max_wait_ms=0)
+        try:
+            first = asyncio.ensure_future(batcher.submit(1))
+            await asyncio.get_running_loop().run_in_executor(None, process.started.wait, 5)
+            rest = [asyncio.ensure_future(batcher.submit(item)) for item in range(2, 7)]
+            await asyncio.sleep(0)
+            process.release.set()
+            
+            assert await first == 2
+            assert await asyncio.gather(*rest) == [4, 6, 8, 10, 12]
+            assert process.batches == [[1], [2, 3, 4, 5, 6]]
+            assert (batcher.batches, batcher.items) == (2, 6)
+        finally:
+            batcher.close()
+            executor.shutdown(wait=True)
+    
+    asyncio.run(run())
+
+def test_batch_size_is_capped():
+    async def run():
+        batches = []
+        
+        def process(items):
+            batches.append(len(items))
+            return items
+        
+        batcher = MicroBatcher(process, max_batch_size=3, max_wait_ms=50)
+        try:
+            assert await asyncio.gather(*(batcher.submit(item) for item in range(7))) == list(range(7))
+            assert max(batches) <= 3 and sum(batches) == 7
+        finally:
+            batcher.close()
+    
+    asyncio.run(run())
+
+def test_a_failing_batch_fails_all_of_its_requests():
+    async def run():
+        def process(items):
+            raise ValueError("encoder failed")
+        
+        batcher = MicroBatcher(process, max_batch_size=10, max_wait_ms=20)
+        try:
+            results = await asyncio.gather(*(batcher.submit(item) for item in range(3)), return_exceptions=True)
+            assert all(isinstance(result, ValueError) for result in results)
+        finally:
+            batcher.close()
+    
+    asyncio.run(run())
+
+def test_close_fails_queued_and_in_flight_requests():
+    async def run():
+        process = BlockingDoubler()
+        executor = ThreadPoolExecutor(max_workers=1)
+        batcher = MicroBatcher(process, executor, max_batch_size=10, max_wait_ms=0)
+        try:
+            in_flight = asyncio.ensure_future(batcher.submit(1))
+            await asyncio.get_running_loop().run_in_executor(None, process.started.wait, 5)
+            queued = [asyncio.ensure_future(batcher.submit(item)) for item in (2, 3)]
+            await asyncio.sleep(0)
+            
+            batcher.close()
+            for future in [in_flight, *queued]:
+                with pytest.raises(RuntimeError, match="closed"):
+                    await asyncio.wait_for(future, 1)
+        finally:
+            process.release.set()
+            executor.shutdown(wait=True)
+    
+    asyncio.run(run())
\ No newline at end of file
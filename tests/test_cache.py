@@ -0,0 +1,208 @@
+"""
+Tests for query result caching.
+"""
+import asyncio
+
+import numpy as np
+
+from musiol_rag.core.cache import QueryCache, SemanticQueryCache
+from musiol_rag.core.rag import RAGWrapper
+from musiol_rag.core.retrieval import FAISSRetriever
+
+def make_cache(**options) -> QueryCache:
+    options.setdefault("max_entries", 10)
+    options.setdefault("max_bytes", None)
+    options.setdefault("ttl", None)
+    return QueryCache(**options)
+
+def test_larger_k_result_serves_smaller_k():
+    cache = make_cache()
+    cache.put("query", 3, (["a", "b", "c"], [0.1, 0.2, 0.3]))
+    
+    assert cache.get("query", 2) == (["a", "b"], [0.1, 0.2])
+    assert cache.get("query", 5) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_least_recently_used_entry_is_evicted():
+    cache = make_cache(max_entries=2)
+    cache.put("first", 1, (["a"], [0.1]))
+    cache.put("second", 1, (["b"], [0.1]))
+    cache.get("first", 1)
+    cache.put("third", 1, (["c"], [0.1]))
+    
+    assert cache.get("second", 1) is None
+    assert cache.get("first", 1) == (["a"], [0.1])
+    assert cache.get("third", 1) == (["c"], [0.1])
+    assert cache.evictions == 1
+
+def test_byte_limit_evicts_entries():
+    cache = make_cache(max_bytes=1000)
+    for i in range(20):
+        cache.put(f"query {i}", 1, ([f"chunk {i}" * 5], [0.1]))
+    
+    assert cache.stats()["bytes"] <= 1000
+    assert 0 < len(cache) < 20
+    assert cache.get("query 19", 1) is not None
+
+def test_entries_expire_after_ttl():
+    now = [0.0]
+    cache = make_cache(ttl=10.0, clock=lambda: now[0])
+    cache.put("query", 1, (["a"], [0.1]))
+    
+    now[0] = 9.0
+    assert cache.get("query", 1) == (["a"], [0.1])
+    now[0] = 10.0
+    assert cache.get("query", 1) is None
+    assert cache.expirations == 1
+
+def test_put_skips_results_searched_before_a_clear():
+    cache = make_cache()
+    
+    generation = cache.generation
+    cache.clear()
+    cache.put("query", 1, (["a"], [0.1]), generation)
+    assert cache.get("query", 1) is None
+    
+    cache.put("query", 1, (["a"], [0.1]), cache.generation)
+    assert cache.get("query", 1) == (["a"], [0.1])
+
+def test_update_index_clears_cached_results(embedding_model, database, index_path):
+    async def run():
+        retriever = FAISSRetriever(embedding_model, index_path, index_type="flat", metric="l2", oversample=1)
+        try:
+            await database.add_texts_bulk([("doc", ["first chunk"])])
+            await retriever.update_index(database)
+            assert (await retriever.get_relevant_texts("second chunk", database, k=1))[0] == ["first chunk"]
+            assert retriever.cache_stats()["entries"] == 1
+            
+            await database.add_texts_bulk([("other doc", ["second chunk"])])
+            await retriever.update_index(database)
+            assert (await retriever.get_relevant_texts("second chunk", database, k=1))[0] == ["second chunk"]
+        finally:
+            retriever.close()
+    
+    asyncio.run(run())
+
+def test_deleting_a_document_invalidates_cached_results(embedding_model, database, index_path):
+    async def run():
+        retriever = FAISSRetriever(embedding_model, index_path, index_type="flat", metric="l2", oversample=1)
+        rag = RAGWrapper(embedding_model, database, retriever)
+        try:
+            await database.add_texts_bulk([
+                ("doc one", ["alpha chunk", "beta chunk"]),
+                ("doc two", ["gamma chunk", "delta chunk"]),
+            ])
+            await retriever.update_index(database)
+            
+            chunks, _ = await retriever.get_relevant_texts("alpha chunk", database, k=1)
+            assert chunks == ["alpha chunk"]
+            kept, _ = await retriever.get_relevant_texts("gamma chunk", database, k=1)
+            assert len(retriever._cache) == 2
+            
+            await rag.delete_document(1)
+            
+            # Only the result that contained a removed chunk is dropped
+            assert len(retriever._cache) == 1
+            chunks, _ = await retriever.get_relevant_texts("alpha chunk", database, k=4)
+            assert "alpha chunk" not in chunks and "beta chunk" not in chunks
+            assert sorted(chunks) == ["delta chunk", "gamma chunk"]
+            assert (await retriever.get_relevant_texts("gamma chunk", database, k=1))[0] == kept
+        finally:
+            retriever.close()
+    
+    asyncio.run(run())
+
+def rotated(similarity: float) -> np.ndarray:
+    """Unit vector with the given cosine similarity to the first axis."""
+    return np.array([similarity, np.sqrt(1.0 - similarity ** 2), 0.0, 0.0], dtype=np.float32)
+
+def make_semantic_cache(**options) -> SemanticQueryCache:
+    options.setdefault("threshold", 0.95)
+    options.setdefault("max_entries", 4)
+    options.setdefault("verify_rate", 0.0)
+    return SemanticQueryCache(**options)
+
+def test_similar_query_hits_and_dissimilar_query_misses():
+    cache = make_semantic_cache()
+    cache.put(rotated(1.0), 3, (["a", "b", "c"], [0.1, 0.2, 0.3]))
+    
+    assert cache.lookup(rotated(0.97), 2) == ((["a", "b"], [0.1, 0.2]), False)
+    # A near miss just below the threshold must not be answered from the cache
+    assert cache.lookup(rotated(0.93), 2) == (None, False)
+    # Neither may a larger k or another filter scope
+    assert cache.lookup(rotated(0.97), 5) == (None, False)
+    assert cache.lookup(rotated(0.97), 2, scope="filtered") == (None, False)
+    assert (cache.hits, cache.misses) == (1, 3)
+
+def test_invalidation_drops_results_with_removed_chunks():
+    cache = make_semantic_cache()
+    cache.put(rotated(1.0), 2, (["a", "b"], [0.1, 0.2]))
+    cache.put(rotated(0.0), 2, (["c", "d"], [0.1, 0.2]))
+    
+    generation = cache.generation
+    assert cache.invalidate_texts(["b"]) == 1
+    assert cache.lookup(rotated(0.99), 2) == (None, False)
+    assert cache.lookup(rotated(0.0), 2)[0] == (["c", "d"], [0.1, 0.2])
+    
+    # A result searched before the invalidation is not stored
+    cache.put(rotated(1.0), 2, (["a", "b"], [0.1, 0.2]), generation=generation)
+    assert cache.lookup(rotated(1.0), 2) == (None, False)
+    
+    cache.clear()
+    assert cache.stats()["entries"] == 0
+
+def test_verified_hits_count_false_hits():
+    cache = make_semantic_cache(threshold=0.5, verify_rate=1.0)
+    cache.put(rotated(1.0), 2, (["a", "b"], [0.1, 0.2]))
+    
+    cached, verify = cache.lookup(rotated(0.6), 2)
+    assert verify
+    assert not cache.verify(cached, (["a", "c"], [0.1, 0.3]))
+    assert cache.verify(cached, (["b", "a"], [0.1, 0.2]))
+    assert (cache.stats()["verified"], cache.stats()["false_hits"]) == (2, 1)
+
+def test_spelling_variants_are_encoded_once():
+    cache = make_semantic_cache()
+    encoded = []
+    
+    def encode(texts):
+        encoded.extend(texts)
+        return np.stack([rotated(1.0) for _ in texts])
+    
+    cache.encode(["What is RAG?", "what  is   rag"], encode)
+    cache.encode(["WHAT IS RAG."], encode)
+    assert encoded == ["What is RAG?"]
+    assert (cache.stats()["vector_hits"], cache.stats()["vector_misses"]) == (1, 2)
+
+def test_retriever_answers_reworded_query_from_semantic_cache(embedding_model, database, index_path):
+    async def run():
+        retriever = FAISSRetriever(
+            embedding_model, index_path, index_type="flat", metric="l2", oversample=1,
+            semantic_cache=make_semantic_cache(threshold=0.99, max_entries=16)
+        )
+        rag = RAGWrapper(embedding_model, database, retriever)
+        try:
+            await database.add_texts_bulk([
+                ("doc one", ["alpha chunk", "beta chunk"]),
+                ("doc two", ["gamma chunk"]),
+            ])
+            await retriever.update_index(database)
+            
+            first = await retriever.get_relevant_texts("alpha chunk", database, k=2)
+            encoded = embedding_model.texts_encoded
+            assert await retriever.get_relevant_texts("Alpha  chunk?", database, k=1) == (first[0][:1], first[1][:1])
+            assert embedding_model.texts_encoded == encoded
+            assert retriever.semantic_cache_stats()["hits"] == 1
+            
+            # An unrelated query is searched
+            assert (await retriever.get_relevant_texts("gamma chunk", database, k=1))[0] == ["gamma chunk"]
+            assert retriever.semantic_cache_stats()["hits"] == 1
+            
+            # Deleting a chunk in the cached result invalidates it
+            await rag.delete_document(1)
+            assert "alpha chunk" not in (await retriever.get_relevant_texts("ALPHA chunk", database, k=1))[0]
+            assert retriever.semantic_cache_stats()["hits"] == 1
+        finally:
+            retriever.close()
+    
+    asyncio.run(run())
\ No newline at end of file
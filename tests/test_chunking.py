@@ -0,0 +1,49 @@
+"""
+Tests for incremental re-chunking of edited documents.
+"""
+from musiol_rag.core.chunking import TextChunker
+
+SENTENCES = [f"Sentence number {word} is here." for word in ["one", "two", "three", "four", "five", "six", "seven", "eight"]]
+TEXT = " ".join(SENTENCES)
+
+def make_chunker() -> TextChunker:
+    return TextChunker(max_chunk_size=60, backend="regex")
+
+def test_unchanged_text_keeps_every_chunk():
+    chunker = make_chunker()
+    previous = chunker.create_chunks(TEXT)
+    diff = chunker.rechunk(TEXT, previous)
+    
+    assert diff.chunks == previous
+    assert diff.kept == [(index, index) for index in range(len(previous))]
+    assert (diff.added, diff.removed) == ([], [])
+
+def test_inserted_sentence_does_not_shift_later_chunks():
+    chunker = make_chunker()
+    previous = chunker.create_chunks(TEXT)
+    edited = "A brand new opening line. " + TEXT
+    # Chunking from scratch moves every boundary after the insertion
+    assert chunker.create_chunks(edited)[1] not in previous
+    
+    diff = chunker.rechunk(edited, previous)
+    assert diff.chunks == ["A brand new opening line."] + previous
+    assert diff.kept == [(index, index + 1) for index in range(len(previous))]
+    assert (diff.added, diff.removed) == ([0], [])
+
+def test_edited_sentence_replaces_only_its_chunk():
+    chunker = make_chunker()
+    previous = chunker.create_chunks(TEXT)
+    diff = chunker.rechunk(TEXT.replace("five", "5"), previous)
+    
+    assert diff.chunks == previous[:2] + ["Sentence number four is here. Sentence number 5 is here."] + previous[3:]
+    assert diff.kept == [(0, 0), (1, 1), (3, 3), (4, 4)]
+    assert (diff.added, diff.removed) == ([2], [2])
+
+def test_deleted_sentences_remove_their_chunk():
+    chunker = make_chunker()
+    previous = chunker.create_chunks(TEXT)
+    diff = chunker.rechunk(" ".join(SENTENCES[:3] + SENTENCES[5:]), previous)
+    
+    assert diff.chunks == previous[:2] + previous[3:]
+    assert (diff.added, diff.removed) == ([], [2])
+    assert chunker.rechunk("", previous).removed == list(range(len(previous)))
\ No newline at end of file
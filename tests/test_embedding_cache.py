@@ -0,0 +1,104 @@
+"""
+Tests for the persistent embedding cache.
+"""
+import numpy as np
+import pytest
+
+from musiol_rag.core import embedding_cache
+from musiol_rag.core.embedding_cache import CachedEmbeddingProvider, EmbeddingCache, text_key
+
+from conftest import StubEmbeddingModel
+
+def keys(*texts):
+    return [text_key("model", text) for text in texts]
+
+def vectors(*texts):
+    return np.stack([StubEmbeddingModel.vector(text) for text in texts])
+
+def test_provider_encodes_each_distinct_miss_once(tmp_path):
+    model = StubEmbeddingModel()
+    provider = CachedEmbeddingProvider(model, cache_dir=str(tmp_path))
+    try:
+        np.testing.assert_array_equal(provider.encode(["a", "b", "a"]), vectors("a", "b", "a"))
+        assert model.texts_encoded == 2
+        
+        np.testing.assert_array_equal(provider.encode(["b", "c"]), vectors("b", "c"))
+        assert model.texts_encoded == 3
+        np.testing.assert_array_equal(provider.encode_single("a"), vectors("a"))
+        assert model.texts_encoded == 3
+        assert provider.cache_stats()["entries"] == 3
+        
+        # Other attributes are the wrapped model's
+        assert provider.dimension == model.dimension
+    finally:
+        provider.close()
+
+def test_cache_is_reused_across_instances(tmp_path):
+    provider = CachedEmbeddingProvider(StubEmbeddingModel(), cache_dir=str(tmp_path))
+    provider.encode(["a", "b"])
+    provider.close()
+    
+    model = StubEmbeddingModel()
+    provider = CachedEmbeddingProvider(model, cache_dir=str(tmp_path))
+    try:
+        np.testing.assert_array_equal(provider.encode(["b", "a"]), vectors("b", "a"))
+        assert model.texts_encoded == 0
+        assert provider.cache_stats()["hits"] == 2
+    finally:
+        provider.close()
+    
+    # Another model gets its own cache file
+    other = StubEmbeddingModel("other-model")
+    provider = CachedEmbeddingProvider(other, cache_dir=str(tmp_path))
+    try:
+        provider.encode(["a"])
+        assert other.texts_encoded == 1
+    finally:
+        provider.close()
+
+def test_appends_are_visible_to_other_open_caches(tmp_path):
+    path = str(tmp_path / "cache.emb")
+    writer, reader = EmbeddingCache(path), EmbeddingCache(path)
+    try:
+        assert reader.get_many(keys("a"))[0] is None
+        writer.add(keys("a", "b"), vectors("a", "b"))
+        found_vectors, found = reader.get_many(keys("b", "c", "a"))
+        assert found.tolist() == [True, False, True]
+        np.testing.assert_array_equal(found_vectors[[0, 2]], vectors("b", "a"))
+        
+        with pytest.raises(ValueError):
+            writer.add(keys("d"), np.zeros((1, 3), dtype=np.float32))
+    finally:
+        writer.close()
+        reader.close()
+
+def test_compaction_keeps_recently_used_entries(tmp_path):
+    path = str(tmp_path / "cache.emb")
+    cache, other = EmbeddingCache(path, max_entries=4), EmbeddingCache(path, max_entries=4)
+    try:
+        cache.add(keys("a", "b", "c", "d"), vectors("a", "b", "c", "d"))
+        cache.get_many(keys("a"))
+        
+        # Over max_entries: three quarters are kept, including the new entry
+        cache.add(keys("e"), vectors("e"))
+        assert cache.get_many(keys("a", "b", "c", "d", "e"))[1].tolist() == [True, False, False, True, True]
+        assert cache.stats()["evictions"] == 2
+        
+        # The replaced file is reloaded by other instances
+        found_vectors, found = other.get_many(keys("a", "b", "e"))
+        assert found.tolist() == [True, False, True]
+        np.testing.assert_array_equal(found_vectors[[0, 2]], vectors("a", "e"))
+    finally:
+        cache.close()
+        other.close()
+
+def test_cache_works_without_fcntl(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "fcntl", None)
+    path = str(tmp_path / "cache.emb")
+    cache = EmbeddingCache(path)
+    try:
+        cache.add(keys("a"), vectors("a"))
+        np.testing.assert_array_equal(cache.get_many(keys("a"))[0], vectors("a"))
+        assert not (tmp_path / "cache.emb.lock").exists()
+    finally:
+        cache.close()
\ No newline at end of file
@@ -0,0 +1,17 @@
+"""
+Runs the import-time check, so an eager heavy import fails the test suite.
+"""
+import importlib.util
+import os
+
+CHECK_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples", "check_import_time.py")
+
+def test_modules_import_without_heavy_dependencies(monkeypatch):
+    spec = importlib.util.spec_from_file_location("check_import_time", CHECK_PATH)
+    check = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(check)
+    # Only the eager-import check; timing is left to the script on a quiet machine
+    monkeypatch.setattr(check, "BUDGET_SECONDS", 60.0)
+    monkeypatch.setenv("PYTHONPATH", os.path.join(os.path.dirname(CHECK_PATH), "..", "src"))
+    
+    assert check.main() == 0
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""
+Tests for ONNXEncoder pooling, using a stub tokenizer and inference session.
+"""
+from typing import Dict, List
+import zlib
+
+import numpy as np
+import pytest
+
+from musiol_rag.core.onnx_backend import ONNXEncoder
+
+DIMENSION = 8
+VOCABULARY = 50
+
+class StubTokenizer:
+    """Whitespace tokenizer padding to the longest text like a Hugging Face tokenizer."""
+    
+    def __call__(self, texts: List[str], padding: bool, truncation: bool, max_length: int, return_tensors: str) -> Dict[str, np.ndarray]:
+        tokens = [[zlib.crc32(word.encode()) % (VOCABULARY - 1) + 1 for word in text.split()][:max_length] for text in texts]
+        length = max(len(text_tokens) for text_tokens in tokens)
+        input_ids = np.zeros((len(texts), length), dtype=np.int32)
+        attention_mask = np.zeros((len(texts), length), dtype=np.int32)
+        for row, text_tokens in enumerate(tokens):
+            input_ids[row, :len(text_tokens)] = text_tokens
+            attention_mask[row, :len(text_tokens)] = 1
+        return {"input_ids": input_ids, "attention_mask": attention_mask}
+
+class StubSession:
+    """Looks token embeddings up in a fixed table; padding positions get large values."""
+    
+    def __init__(self):
+        self.table = np.random.default_rng(0).standard_normal((VOCABULARY, DIMENSION)).astype(np.float32)
+        self.table[0] = 1000.0
+    
+    def run(self, output_names, feeds: Dict[str, np.ndarray]) -> List[np.ndarray]:
+        assert all(feed.dtype == np.int64 for feed in feeds.values())
+        return [self.table[feeds["input_ids"]]]
+
+def make_encoder(normalize: bool = True, max_seq_length: int = 16) -> ONNXEncoder:
+    encoder = object.__new__(ONNXEncoder)
+    encoder.dimension = DIMENSION
+    encoder.max_seq_length = max_seq_length
+    encoder.normalize = normalize
+    encoder.input_names = ["input_ids", "attention_mask"]
+    encoder.session = StubSession()
+    encoder.tokenizer = StubTokenizer()
+    return encoder
+
+def reference_embedding(encoder: ONNXEncoder, text: str) -> np.ndarray:
+    """Mean of the text's own token embeddings, as SentenceTransformer pooling computes it."""
+    encoded = encoder.tokenizer([text], padding=True, truncation=True, max_length=encoder.max_seq_length, return_tensors="np")
+    pooled = encoder.session.table[encoded["input_ids"][0]].mean(axis=0)
+    if encoder.normalize:
+        pooled = pooled / np.linalg.norm(pooled)
+    return pooled
+
+TEXTS = ["short", "a somewhat longer text", "the longest text of all in this batch by far", "two words"]
+
+@pytest.mark.parametrize("normalize", [True, False])
+def test_mean_pooling_ignores_padding(normalize):
+    encoder = make_encoder(normalize=normalize)
+    embeddings = encoder.encode(TEXTS, batch_size=len(TEXTS))
+    
+    assert embeddings.shape == (len(TEXTS), DIMENSION)
+    assert embeddings.dtype == np.float32
+    expected = np.stack([reference_embedding(encoder, text) for text in TEXTS])
+    np.testing.assert_allclose(embeddings, expected, rtol=1e-5, atol=1e-6)
+    if normalize:
+        np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, rtol=1e-5)
+
+def test_batch_size_does_not_change_embeddings():
+    encoder = make_encoder()
+    np.testing.assert_allclose(
+        encoder.encode(TEXTS, batch_size=1), encoder.encode(TEXTS, batch_size=3), rtol=1e-5, atol=1e-6
+    )
+
+def test_single_text_returns_a_vector():
+    encoder = make_encoder()
+    embedding = encoder.encode("two words")
+    assert embedding.shape == (DIMENSION,)
+    np.testing.assert_allclose(embedding, encoder.encode(TEXTS)[3], rtol=1e-5, atol=1e-6)
+
+def test_texts_are_truncated_to_max_seq_length():
+    encoder = make_encoder(max_seq_length=2)
+    np.testing.assert_allclose(
+        encoder.encode(["one two three four"]), encoder.encode(["one two"]), rtol=1e-5, atol=1e-6
+    )
\ No newline at end of file
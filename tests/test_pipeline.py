@@ -0,0 +1,83 @@
+"""
+Tests for the concurrent ingestion pipeline.
+"""
+import asyncio
+import threading
+
+from musiol_rag.core.chunking import TextChunker
+from musiol_rag.core.pipeline import IngestionPipeline
+from musiol_rag.core.retrieval import FAISSRetriever
+
+def make_pipeline(embedding_model, database, index_path, **options):
+    chunker = TextChunker(max_chunk_size=60, backend="regex")
+    retriever = FAISSRetriever(embedding_model, index_path, index_type="flat", metric="l2", oversample=1)
+    return IngestionPipeline(chunker, database, retriever, **options), retriever
+
+def test_pipeline_stores_embeds_and_indexes_every_chunk(embedding_model, database, index_path):
+    encoding_threads = set()
+    encode = embedding_model.encode
+    
+    def record_thread(texts):
+        encoding_threads.add(threading.current_thread().name)
+        return encode(texts)
+    
+    embedding_model.encode = record_thread
+    items = [
+        (f"Document {i} starts here. Its second sentence is {i}. A third one closes document {i}.", {"group": i % 2})
+        for i in range(30)
+    ]
+    
+    async def run():
+        pipeline, retriever = make_pipeline(
+            embedding_model, database, index_path,
+            workers={"store": 2, "embed": 3},
+            batch_sizes={"chunk": 4, "store": 5, "embed": 7},
+            queue_size=4
+        )
+        try:
+            stats = await pipeline.run(items)
+            
+            assert stats["documents"] == 30
+            assert stats["stages"]["chunk"]["items"] == 30
+            assert stats["stages"]["index"]["items"] == len(database.chunks) == 60
+            assert all(stage["max_queue_depth"] <= 4 for stage in stats["stages"].values())
+            assert [document["metadata"] for _, document in sorted(database.documents.items())] == [
+                metadata for _, metadata in items
+            ]
+            
+            # Every chunk was encoded once, off the retriever's worker thread, and stored
+            assert embedding_model.texts_encoded == 60
+            assert encoding_threads and all(name.startswith("ingest-embed") for name in encoding_threads)
+            assert len(database.embeddings) == 60
+            
+            assert retriever.index.ntotal == 60
+            assert (await retriever.get_relevant_texts("A third one closes document 7.", database, k=1))[0] == [
+                "A third one closes document 7."
+            ]
+            # The index was saved with its manifest
+            assert await retriever.warm_start(database) == "reused"
+        finally:
+            retriever.close()
+    
+    asyncio.run(run())
+
+def test_pipeline_reads_files_from_a_directory(embedding_model, database, index_path, tmp_path):
+    directory = tmp_path / "texts"
+    directory.mkdir()
+    for name in ("b", "a", "c"):
+        (directory / f"{name}.txt").write_text(f"File {name} has one sentence.", encoding="utf-8")
+    (directory / "skipped.md").write_text("Not matched by the pattern.", encoding="utf-8")
+    
+    async def run():
+        pipeline, retriever = make_pipeline(embedding_model, database, index_path)
+        try:
+            stats = await pipeline.run(directory)
+            assert stats["documents"] == 3
+            assert [document["metadata"]["source"] for _, document in sorted(database.documents.items())] == [
+                str(directory / f"{name}.txt") for name in ("a", "b", "c")
+            ]
+            assert retriever.index.ntotal == 3
+        finally:
+            retriever.close()
+    
+    asyncio.run(run())
\ No newline at end of file
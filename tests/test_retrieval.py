@@ -0,0 +1,284 @@
+"""
+Tests for FAISSRetriever index updates.
+"""
+import asyncio
+
+import faiss
+import pytest
+
+from musiol_rag.config import settings
+from musiol_rag.core.rag import RAGWrapper
+from musiol_rag.core.retrieval import FAISSRetriever
+from musiol_rag.database.base import ChunkFilter
+
+def make_retriever(embedding_model, index_path, **options) -> FAISSRetriever:
+    options.setdefault("index_type", "flat")
+    return FAISSRetriever(embedding_model, index_path, metric="l2", oversample=1, **options)
+
+def test_update_index_only_embeds_new_chunks(embedding_model, database, index_path):
+    async def run():
+        retriever = make_retriever(embedding_model, index_path)
+        try:
+            await database.add_texts_bulk([("doc one", ["alpha chunk", "beta chunk"])])
+            await retriever.update_index(database)
+            assert embedding_model.texts_encoded == 2
+            
+            await database.add_texts_bulk([("doc two", ["gamma chunk"])])
+            await retriever.update_index(database)
+            assert embedding_model.texts_encoded == 3
+            assert retriever.index.ntotal == 3
+            assert (await retriever.get_relevant_texts("gamma chunk", database, k=1))[0] == ["gamma chunk"]
+        finally:
+            retriever.close()
+    
+    asyncio.run(run())
+
+def test_concurrent_updates_index_each_chunk_once(embedding_model, database, index_path):
+    async def run():
+        await database.add_texts_bulk([("doc", [f"chunk {i}" for i in range(50)])])
+        retriever = make_retriever(embedding_model, index_path)
+        try:
+            await asyncio.gather(*(retriever.update_index(database) for _ in range(3)))
+            assert retriever.index.ntotal == 50
+        finally:
+            retriever.close()
+    
+    asyncio.run(run())
+def test_ivf_index_stays_flat_until_it_can_be_fully_trained(embedding_model, database, index_path):
+    async def run():
+        retriever = make_retriever(embedding_model, index_path, index_type="ivf_flat", nlist=4)
+        try:
+            await database.add_texts_bulk([("small doc", [f"first {i}" for i in range(20)])])
+            await retriever.update_index(database)
+            assert faiss.try_extract_index_ivf(retriever.index) is None
+            assert (await retriever.get_relevant_texts("first 3", database, k=1))[0] == ["first 3"]
+        finally:
+            retriever.close()
+        
+        # A reloaded staging index keeps staging until enough vectors arrive
+        retriever = make_retriever(embedding_model, index_path, index_type="ivf_flat", nlist=4)
+        try:
+            assert await retriever.warm_start(database) == "reused"
+            await database.add_texts_bulk([("large doc", [f"second {i}" for i in range(300)])])
+            await retriever.update_index(database)
+            ivf = faiss.try_extract_index_ivf(retriever.index)
+            assert ivf is not None and ivf.nlist == 4
+            assert retriever.index.ntotal == 320
+            assert (await retriever.get_relevant_texts("first 3", database, k=1))[0] == ["first 3"]
+        finally:
+            retriever.close()
+    
+    asyncio.run(run())
+
+async def build(embedding_model, database, index_path) -> None:
+    await database.add_texts_bulk([
+        ("doc one", ["alpha chunk", "beta chunk"]),
+        ("doc two", ["gamma chunk", "delta chunk"]),
+    ])
+    retriever = make_retriever(embedding_model, index_path)
+    try:
+        await retriever.update_index(database)
+    finally:
+        retriever.close()
+
+async def warm_start(embedding_model, database, index_path) -> str:
+    retriever = make_retriever(embedding_model, index_path)
+    try:
+        status = await retriever.warm_start(database)
+        assert retriever.index.ntotal == len(database.chunks)
+        for _, chunk in database.chunks.values():
+            assert (await retriever.get_relevant_texts(chunk, database, k=1))[0] == [chunk]
+        return status
+    finally:
+        retriever.close()
+
+def test_warm_start_without_saved_index_rebuilds(embedding_model, database, index_path):
+    async def run():
+        await database.add_texts_bulk([("doc", ["only chunk"])])
+        assert await warm_start(embedding_model, database, index_path) == "rebuilt"
+    
+    asyncio.run(run())
+
+def test_warm_start_reuses_unchanged_index(embedding_model, database, index_path):
+    async def run():
+        await build(embedding_model, database, index_path)
+        encoded = embedding_model.texts_encoded
+        assert await warm_start(embedding_model, database, index_path) == "reused"
+        # Only the verification queries were encoded
+        assert embedding_model.texts_encoded == encoded + len(database.chunks)
+    
+    asyncio.run(run())
+
+def test_warm_start_catches_up_with_appended_chunks(embedding_model, database, index_path):
+    async def run():
+        await build(embedding_model, database, index_path)
+        await database.add_texts_bulk([("doc three", ["epsilon chunk"])])
+        assert await warm_start(embedding_model, database, index_path) == "caught_up"
+    
+    asyncio.run(run())
+
+def test_warm_start_catches_up_with_deleted_chunks(embedding_model, database, index_path):
+    async def run():
+        await build(embedding_model, database, index_path)
+        await database.delete_document(1)
+        assert await warm_start(embedding_model, database, index_path) == "caught_up"
+    
+    asyncio.run(run())
+
+def test_warm_start_rebuilds_when_indexed_texts_changed(embedding_model, database, index_path):
+    async def run():
+        await build(embedding_model, database, index_path)
+        document_id, _ = database.chunks[1]
+        database.chunks[1] = (document_id, "rewritten chunk")
+        assert await warm_start(embedding_model, database, index_path) == "rebuilt"
+    
+    asyncio.run(run())
+
+def test_warm_start_reuses_index_built_in_process(embedding_model, database, index_path):
+    async def run():
+        await database.add_texts_bulk([("doc", ["first chunk", "second chunk"])])
+        retriever = make_retriever(embedding_model, index_path)
+        try:
+            await retriever.update_index(database)
+            assert await retriever.warm_start(database) == "reused"
+        finally:
+            retriever.close()
+    
+    asyncio.run(run())
+
+def test_warm_start_rebuilds_index_saved_with_other_settings(embedding_model, database, index_path):
+    async def run():
+        await build(embedding_model, database, index_path)
+        retriever = FAISSRetriever(embedding_model, index_path, index_type="flat", metric="cosine", oversample=1)
+        try:
+            assert await retriever.warm_start(database) == "rebuilt"
+            assert retriever.index.ntotal == len(database.chunks)
+        finally:
+            retriever.close()
+    
+    asyncio.run(run())
+
+FILTER_DOCUMENTS = [
+    (f"doc {document}", [f"doc {document} chunk {chunk}" for chunk in range(4)], {"group": document % 2})
+    for document in range(1, 9)
+]
+
+@pytest.mark.parametrize("brute_force_threshold", [0, 1000])
+def test_filtered_search_only_returns_matching_documents(
+    embedding_model, database, index_path, monkeypatch, brute_force_threshold
+):
+    # 0 searches the index with an ID selector, 1000 scores the allowed vectors exhaustively
+    monkeypatch.setattr(settings, "filter_brute_force_threshold", brute_force_threshold)
+    
+    async def run():
+        await database.add_texts_bulk(FILTER_DOCUMENTS)
+        retriever = make_retriever(embedding_model, index_path)
+        try:
+            await retriever.update_index(database)
+            
+            chunks, distances = await retriever.get_relevant_texts(
+                "doc 1 chunk 0", database, k=32, chunk_filter=ChunkFilter(metadata={"group": 0})
+            )
+            assert sorted(chunks) == sorted(
+                chunk for _, document_chunks, metadata in FILTER_DOCUMENTS if metadata["group"] == 0
+                for chunk in document_chunks
+            )
+            assert distances == sorted(distances)
+            
+            results = await retriever.get_relevant_texts_batch(
+                ["doc 2 chunk 3", "doc 7 chunk 0"], database, k=1, chunk_filter=ChunkFilter(document_ids=[2, 7])
+            )
+            assert [chunks for chunks, _ in results] == [["doc 2 chunk 3"], ["doc 7 chunk 0"]]
+            
+            # A filtered result is cached apart from the unfiltered one
+            chunks, _ = await retriever.get_relevant_texts(
+                "doc 3 chunk 1", database, k=1, chunk_filter=ChunkFilter(document_ids=[4])
+            )
+            assert chunks[0].startswith("doc 4 ")
+            assert (await retriever.get_relevant_texts("doc 3 chunk 1", database, k=1))[0] == ["doc 3 chunk 1"]
+            
+            assert await retriever.get_relevant_texts(
+                "doc 1 chunk 0", database, k=3, chunk_filter=ChunkFilter(metadata={"group": 5})
+            ) == ([], [])
+        finally:
+            retriever.close()
+    
+    asyncio.run(run())
+
+def test_upsert_reindexes_only_changed_chunks(embedding_model, database, index_path):
+    async def run():
+        retriever = make_retriever(embedding_model, index_path)
+        rag = RAGWrapper(embedding_model, database, retriever)
+        try:
+            await database.add_texts_bulk([
+                ("doc one", ["alpha chunk", "beta chunk"]),
+                ("doc two", ["gamma chunk"]),
+            ])
+            await retriever.update_index(database)
+            assert (await retriever.get_relevant_texts("beta chunk", database, k=1))[0] == ["beta chunk"]
+            encoded = embedding_model.texts_encoded
+            
+            await rag.upsert_document(1, "doc one, revised", chunks=["alpha chunk", "omega chunk"])
+            
+            # Only the new chunk was encoded; the unchanged chunk kept its ID and vector
+            assert embedding_model.texts_encoded == encoded + 1
+            assert retriever.index.ntotal == 3
+            assert sorted(chunk for _, chunk in database.chunks.values()) == [
+                "alpha chunk", "gamma chunk", "omega chunk"
+            ]
+            assert (await retriever.get_relevant_texts("omega chunk", database, k=1))[0] == ["omega chunk"]
+            chunks, _ = await retriever.get_relevant_texts("beta chunk", database, k=3)
+            assert "beta chunk" not in chunks
+            
+            # The incrementally updated index is reused as is on the next start
+            assert await retriever.warm_start(database) == "reused"
+        finally:
+            retriever.close()
+    
+    asyncio.run(run())
+
+def test_hnsw_deletes_are_tombstoned_until_compaction(embedding_model, database, index_path, monkeypatch):
+    monkeypatch.setattr(settings, "faiss_hnsw_compact_ratio", 0.3)
+    
+    async def run():
+        await database.add_texts_bulk([
+            (f"doc {document}", [f"doc {document} chunk {chunk}" for chunk in range(2)]) for document in range(1, 11)
+        ])
+        retriever = make_retriever(embedding_model, index_path, index_type="hnsw")
+        try:
+            await retriever.update_index(database)
+            encoded = embedding_model.texts_encoded
+            
+            # The vectors stay in the index but are no longer found
+            assert await retriever.remove_chunks(database, await database.delete_document(1)) == 2
+            assert retriever.index.ntotal == 20
+            chunks, _ = await retriever.get_relevant_texts("doc 1 chunk 0", database, k=20)
+            assert len(chunks) == 18
+            assert not any(chunk.startswith("doc 1 ") for chunk in chunks)
+        finally:
+            retriever.close()
+        
+        # Tombstones are saved with the index
+        retriever = make_retriever(embedding_model, index_path, index_type="hnsw")
+        try:
+            assert await retriever.warm_start(database) == "reused"
+            chunks, _ = await retriever.get_relevant_texts("doc 1 chunk 1", database, k=20)
+            assert len(chunks) == 18
+            assert not any(chunk.startswith("doc 1 ") for chunk in chunks)
+            
+            for document_id in (2, 3):
+                await retriever.remove_chunks(database, await database.delete_document(document_id))
+            assert retriever.index.ntotal == 20
+            
+            # Passing the compaction ratio rebuilds the index from the stored embeddings
+            await retriever.remove_chunks(database, await database.delete_document(4))
+            assert retriever.index.ntotal == 12
+            assert embedding_model.texts_encoded == encoded + 2
+            assert await retriever.warm_start(database) == "reused"
+            assert sorted((await retriever.get_relevant_texts("doc 5 chunk 0", database, k=20))[0]) == sorted(
+                chunk for _, chunk in database.chunks.values()
+            )
+        finally:
+            retriever.close()
+    
+    asyncio.run(run())
\ No newline at end of file
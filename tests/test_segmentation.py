@@ -0,0 +1,50 @@
+"""
+Tests for the rule-based sentence splitter.
+"""
+import pytest
+
+from musiol_rag.core.segmentation import RegexSentenceSplitter, create_splitter
+
+@pytest.mark.parametrize("text, sentences", [
+    ("Dr. Smith arrived at 3 p.m. on Monday. He left early!",
+     ["Dr. Smith arrived at 3 p.m. on Monday.", "He left early!"]),
+    ("It costs 3.5 dollars. Really? Yes.", ["It costs 3.5 dollars.", "Really?", "Yes."]),
+    ("J. R. R. Tolkien wrote it. e.g. this one.", ["J. R. R. Tolkien wrote it. e.g. this one."]),
+    ('He said "Stop." Then he left.', ['He said "Stop."', "Then he left."]),
+    ("Introduction\nThis text was\nhard-wrapped across lines. It ends here.",
+     ["Introduction", "This text was\nhard-wrapped across lines.", "It ends here."]),
+    ("A list:\nItem one", ["A list:\nItem one"]),
+    ("  \n ", []),
+])
+def test_split(text, sentences):
+    assert RegexSentenceSplitter().split(text) == sentences
+
+def test_custom_abbreviations():
+    splitter = RegexSentenceSplitter(abbreviations={"approx"})
+    assert splitter.split("Dr. Who. It is approx. Two hours.") == ["Dr.", "Who.", "It is approx. Two hours."]
+
+def test_split_many_matches_split_across_processes():
+    splitter = RegexSentenceSplitter()
+    texts = [f"Text {i} starts here. It has {i} words? Yes!" for i in range(50)]
+    
+    assert list(splitter.split_many(texts, n_process=1)) == [splitter.split(text) for text in texts]
+    assert list(splitter.split_many(texts, n_process=2, batch_size=4)) == [splitter.split(text) for text in texts]
+
+def test_split_many_reads_input_in_bounded_windows():
+    consumed = []
+    
+    def texts():
+        for i in range(1000):
+            consumed.append(i)
+            yield f"Sentence {i}. Another one."
+    
+    results = RegexSentenceSplitter().split_many(texts(), n_process=2, batch_size=5)
+    assert next(results) == ["Sentence 0.", "Another one."]
+    # The window being yielded plus the one in flight
+    assert len(consumed) <= 2 * 2 * 5
+    results.close()
+
+def test_create_splitter():
+    assert isinstance(create_splitter("regex"), RegexSentenceSplitter)
+    with pytest.raises(ValueError):
+        create_splitter("unknown")
\ No newline at end of file
@@ -0,0 +1,102 @@
+"""
+Tests for ShardedRetriever scatter-gather search.
+"""
+import asyncio
+
+from musiol_rag.core.sharding import ShardedRetriever
+from musiol_rag.database.base import ChunkFilter
+
+DOCUMENTS = [
+    (f"doc {document}", [f"doc {document} chunk {chunk}" for chunk in range(3)], {"group": document % 2})
+    for document in range(1, 7)
+]
+
+def make_retriever(embedding_model, index_path) -> ShardedRetriever:
+    return ShardedRetriever(
+        embedding_model, index_path, num_shards=3, index_type="flat", metric="l2", oversample=1
+    )
+
+def test_documents_are_partitioned_across_shards(embedding_model, database, index_path):
+    async def run():
+        await database.add_texts_bulk(DOCUMENTS)
+        retriever = make_retriever(embedding_model, index_path)
+        try:
+            await retriever.update_index(database)
+            assert [shard.index.ntotal for shard in retriever.shards] == [6, 6, 6]
+            chunks, distances = await retriever.get_relevant_texts("doc 5 chunk 1", database, k=4)
+            assert chunks[0] == "doc 5 chunk 1"
+            assert distances == sorted(distances)
+        finally:
+            retriever.close()
+    
+    asyncio.run(run())
+
+def test_batch_searches_duplicate_queries_once(embedding_model, database, index_path):
+    async def run():
+        await database.add_texts_bulk(DOCUMENTS)
+        retriever = make_retriever(embedding_model, index_path)
+        try:
+            await retriever.update_index(database)
+            encoded = embedding_model.texts_encoded
+            
+            queries = ["doc 1 chunk 1", "doc 2 chunk 2", "doc 1 chunk 1"]
+            results = await retriever.get_relevant_texts_batch(queries, database, k=1)
+            assert [chunks for chunks, _ in results] == [["doc 1 chunk 1"], ["doc 2 chunk 2"], ["doc 1 chunk 1"]]
+            assert embedding_model.texts_encoded == encoded + 2
+            
+            # Concurrent duplicates in one micro-batch are encoded once as well
+            encoded = embedding_model.texts_encoded
+            items = [("doc 3 chunk 0", 2), ("doc 3 chunk 0", 1), ("doc 4 chunk 0", 1)]
+            results = retriever._process_query_batch(items)
+            assert results[0][0][0] == "doc 3 chunk 0" and len(results[0][0]) == 2
+            assert [chunks for chunks, _ in results[1:]] == [["doc 3 chunk 0"], ["doc 4 chunk 0"]]
+            assert embedding_model.texts_encoded == encoded + 2
+        finally:
+            retriever.close()
+    
+    asyncio.run(run())
+
+def test_filtered_search_only_returns_matching_documents(embedding_model, database, index_path):
+    async def run():
+        await database.add_texts_bulk(DOCUMENTS)
+        retriever = make_retriever(embedding_model, index_path)
+        try:
+            await retriever.update_index(database)
+            
+            chunks, _ = await retriever.get_relevant_texts(
+                "doc 1 chunk 0", database, k=20, chunk_filter=ChunkFilter(metadata={"group": 0})
+            )
+            assert sorted(chunks) == sorted(
+                chunk for _, document_chunks, metadata in DOCUMENTS if metadata["group"] == 0
+                for chunk in document_chunks
+            )
+            
+            results = await retriever.get_relevant_texts_batch(
+                ["doc 2 chunk 2", "doc 6 chunk 0"], database, k=1, chunk_filter=ChunkFilter(document_ids=[2, 6])
+            )
+            assert [chunks for chunks, _ in results] == [["doc 2 chunk 2"], ["doc 6 chunk 0"]]
+        finally:
+            retriever.close()
+    
+    asyncio.run(run())
+
+def test_remove_chunks_drops_them_from_their_shard(embedding_model, database, index_path):
+    async def run():
+        await database.add_texts_bulk(DOCUMENTS)
+        retriever = make_retriever(embedding_model, index_path)
+        try:
+            await retriever.update_index(database)
+            assert (await retriever.get_relevant_texts("doc 4 chunk 1", database, k=1))[0] == ["doc 4 chunk 1"]
+            
+            removed_ids = await database.delete_document(4)
+            assert await retriever.remove_chunks(database, removed_ids) == 3
+            assert sum(shard.index.ntotal for shard in retriever.shards) == 15
+            
+            chunks, _ = await retriever.get_relevant_texts("doc 4 chunk 1", database, k=18)
+            assert len(chunks) == 15
+            assert not any(chunk.startswith("doc 4 ") for chunk in chunks)
+            assert await retriever.warm_start(database) == ["reused", "reused", "reused"]
+        finally:
+            retriever.close()
+    
+    asyncio.run(run())
\ No newline at end of file